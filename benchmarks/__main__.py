@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the OAuth dances and resource requests of every provider against a local stub server
+
+    python -m benchmarks --save .benchmarks/baseline.json
+    python -m benchmarks --compare .benchmarks/baseline.json --threshold 0.25
+
+"""
+from __future__ import unicode_literals, absolute_import, print_function
+
+import io
+import os
+import sys
+import json
+import argparse
+
+from .suite import PROVIDERS, STAGES, run, compare
+
+REUSE_LABELS = {True: "reuse", False: "no reuse", None: "-"}
+ROW = "{provider:<10} {stage:<22} {reuse:<9} {throughput:>10} {p50:>9} {p95:>9} {p99:>9}"
+
+
+def format_results(results):
+    lines = [ROW.format(provider="provider", stage="stage", reuse="conn", throughput="ops/s", p50="p50 ms", p95="p95 ms", p99="p99 ms")]
+    for result in results:
+        lines.append(ROW.format(provider=result["provider"], stage=result["stage"], reuse=REUSE_LABELS[result["reuse"]],
+                                throughput="{0:.0f}".format(result["throughput"] or 0),
+                                p50="{0:.3f}".format(result["p50"]), p95="{0:.3f}".format(result["p95"]), p99="{0:.3f}".format(result["p99"])))
+    return "\n".join(lines)
+
+
+def save(results, path):
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with io.open(path, "w", encoding="utf-8") as fp:
+        fp.write(json.dumps({"python": sys.version.split()[0], "results": results}, indent=2, sort_keys=True))
+
+
+def load(path):
+    with io.open(path, encoding="utf-8") as fp:
+        return json.loads(fp.read())["results"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--provider", action="append", choices=list(PROVIDERS), help="provider to benchmark (default: all)")
+    parser.add_argument("--stage", action="append", choices=[stage[0] for stage in STAGES], help="stage to benchmark (default: all)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--no-reuse-only", action="store_true", help="only run network stages without connection reuse")
+    parser.add_argument("--reuse-only", action="store_true", help="only run network stages with connection reuse")
+    parser.add_argument("--save", metavar="PATH", help="save results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="fail when a p50 latency regressed compared to the baseline at PATH")
+    parser.add_argument("--threshold", type=float, default=0.25, help="tolerated p50 regression ratio (default: 0.25)")
+    args = parser.parse_args(argv)
+    if args.compare and not os.path.exists(args.compare):
+        parser.error("no baseline at {0} (save one with --save, or run benchmarks/compare.sh)".format(args.compare))
+
+    reuse = (True,) if args.reuse_only else (False,) if args.no_reuse_only else (True, False)
+    results = run(providers=args.provider, stages=args.stage, iterations=args.iterations, warmup=args.warmup, reuse=reuse)
+    print(format_results(results))
+
+    if args.save:
+        save(results, args.save)
+
+    if args.compare:
+        regressions = compare(results, load(args.compare), threshold=args.threshold)
+        for result, reference in regressions:
+            print("REGRESSION {provider} {stage} ({reuse}): p50 {0:.3f}ms -> {1:.3f}ms".format(
+                reference["p50"], result["p50"], provider=result["provider"], stage=result["stage"], reuse=REUSE_LABELS[result["reuse"]]))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+#!/bin/sh
+# Benchmark HEAD and compare it to the merge-base of HEAD and a reference branch (default: origin/master)
+#
+#     sh benchmarks/compare.sh [origin/master] [--iterations 100 ...]
+#
+# The merge-base is checked out in a temporary worktree and measured with its own benchmarks on this machine, saved
+# to .benchmarks/baseline.json, then HEAD is measured (.benchmarks/latest.json) and fails on p50 regressions of the
+# stages both versions have. The comparison is skipped when the merge-base has no benchmarks or they fail to run.
+set -e
+
+ref=${1:-origin/master}
+[ $# -gt 0 ] && shift
+directory=$(pwd)/.benchmarks
+mkdir -p "$directory"
+rm -f "$directory/baseline.json"
+
+git fetch --quiet origin "${ref#origin/}" 2>/dev/null || true
+base=$(git merge-base HEAD "$ref")
+if [ "$base" = "$(git rev-parse HEAD)" ]; then
+    base=$(git rev-parse HEAD~1)
+fi
+
+tree=$(mktemp -d)
+trap 'git worktree remove --force "$tree"' EXIT
+git worktree add --quiet --detach "$tree" "$base"
+
+echo "Baseline of $(git log -1 --format='%h %s' "$base")"
+if [ ! -f "$tree/benchmarks/__main__.py" ]; then
+    echo "No benchmarks at the merge-base, skipping the comparison"
+elif ! (cd "$tree" && python -m benchmarks --save "$directory/baseline.json" "$@"); then
+    echo "Benchmarks of the merge-base failed, skipping the comparison"
+    rm -f "$directory/baseline.json"
+fi
+
+if [ -f "$directory/baseline.json" ]; then
+    python -m benchmarks --save "$directory/latest.json" --compare "$directory/baseline.json" "$@"
+else
+    python -m benchmarks --save "$directory/latest.json" "$@"
+fi
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import six
+import threading
+from six.moves import BaseHTTPServer, socketserver
+from oauthlib.common import urlparse
+
+__all__ = ["StubProviderServer", "localize"]
+
+URL_ATTRIBUTES = ("request_token_url", "authorization_url", "access_token_url", "profile_url")
+
+
+class StubRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    # headers and body in a single segment, otherwise delayed ACKs add ~40ms to keep-alive requests
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        route = self.server.routes.get(urlparse.urlparse(self.path).path)
+        status, content_type, body = route if route is not None else (404, "text/plain", "Not Found")
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = handle_request
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+
+
+class StubProviderServer(object):
+    """
+    Local stand-in for the providers, answering canned responses over keep-alive HTTP
+
+    Requests for https://<host>/<path> are expected at <base_url>/<host>/<path> (see localize).
+
+    :routes: {"/<host>/<path>": (status, content_type, body)}
+
+    """
+
+    def __init__(self, routes=None, host="127.0.0.1", port=0):
+        self.httpd = ThreadingHTTPServer((host, port), StubRequestHandler)
+        self.httpd.routes = dict(routes or {})
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return "http://{0}:{1}".format(*self.httpd.server_address[:2])
+
+    def add_route(self, url, status, content_type, body):
+        parsed = urlparse.urlparse(url)
+        self.httpd.routes["/{0}{1}".format(parsed.netloc, parsed.path)] = (status, content_type, body)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def local_url(base_url, url):
+    parsed = urlparse.urlparse(url)
+    return "{0}/{1}{2}".format(base_url, parsed.netloc, url[url.index(parsed.netloc) + len(parsed.netloc):])
+
+
+def localize(consumer_class, base_url):
+    """
+    Subclass of consumer_class sending every request to the stub server at base_url
+
+    """
+    attrs = {"name": consumer_class.name, "verbose_name": consumer_class.verbose_name}
+    for attribute in URL_ATTRIBUTES:
+        url = getattr(consumer_class, attribute, None)
+        if isinstance(url, six.string_types):
+            attrs[attribute] = local_url(base_url, url)
+    attrs["profile_resource_urls"] = dict((key, local_url(base_url, url)) for key, url in getattr(consumer_class, "profile_resource_urls", {}).items())
+    return type(str(consumer_class.__name__), (consumer_class,), attrs)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the cold start cost of importing uniauth, each statement timed in fresh interpreters
+
+    python -m benchmarks.startup --repeat 20
+
+"""
+from __future__ import unicode_literals, absolute_import, print_function
+
+import sys
+import time
+import argparse
+import subprocess
+
+__all__ = ["STATEMENTS", "measure", "get_stacks", "run"]
+
+STATEMENTS = [
+    ("import uniauth", "import uniauth"),
+    ("import all consumers", "import uniauth.consumers"),
+    ("get_consumer('github')", "import uniauth; uniauth.get_consumer('github')"),
+    ("get_consumer('bitbucket')", "import uniauth; uniauth.get_consumer('bitbucket')"),
+]
+STACKS = ["oauthlib.oauth1", "oauthlib.oauth2"]
+ROW = "{label:<28} {p50:>9} {min:>9}  {stacks}"
+
+
+def measure(statement, repeat=10):
+    """
+    Return the wall clock durations (ms) of running statement in repeat new interpreters
+
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.time()
+        subprocess.check_call([sys.executable, "-c", statement])
+        durations.append((time.time() - start) * 1000)
+    return sorted(durations)
+
+
+def get_stacks(statement):
+    """
+    Return the oauthlib protocol stacks imported by statement
+
+    """
+    check = "{0}; import sys; print(' '.join(name for name in {1!r} if name in sys.modules))".format(statement, [str(name) for name in STACKS])
+    return subprocess.check_output([sys.executable, "-c", check]).decode("utf-8").split()
+
+
+def run(repeat=10):
+    """
+    Return one result per statement, durations net of the interpreter start up (running "pass")
+
+    """
+    baseline = measure("pass", repeat)[repeat // 2]
+    results = []
+    for label, statement in STATEMENTS:
+        durations = measure(statement, repeat)
+        results.append({"label": label, "statement": statement, "stacks": get_stacks(statement),
+                        "p50": max(0, durations[repeat // 2] - baseline), "min": max(0, durations[0] - baseline)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    print(ROW.format(label="statement", p50="p50 ms", min="min ms", stacks="stacks"))
+    for result in run(repeat=args.repeat):
+        print(ROW.format(label=result["label"], p50="{0:.1f}".format(result["p50"]), min="{0:.1f}".format(result["min"]),
+                         stacks=", ".join(result["stacks"]) or "-"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
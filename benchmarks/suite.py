@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark stages of every consumer against a local stub provider
+
+The stub provider replays the fixtures of tests/mocks.py, like the test suite, so benchmarks run from a source checkout
+with the test requirements installed (neither package is shipped in the distribution).
+
+"""
+from __future__ import unicode_literals, absolute_import, print_function
+
+import os
+import json
+import timeit
+import contextlib
+from collections import OrderedDict
+
+from uniauth import consumers
+from uniauth.oauth1 import OAuth1Consumer
+from uniauth.sessions import SessionPool
+from tests import mocks
+from .server import StubProviderServer, localize
+
+__all__ = ["PROVIDERS", "STAGES", "run", "compare"]
+
+PROVIDERS = OrderedDict((name, getattr(consumers, name)) for name in consumers.__all__)
+REDIRECT_URI = "https://example.org/callback"
+
+OAUTH1_FIXTURES = {"request_token_url": mocks.OAUTH1_REQUEST_TOKEN_RESPONSE_1,
+                   "access_token_url": mocks.OAUTH1_ACCESS_TOKEN_RESPONSE_1,
+                   "profile_url": mocks.OAUTH1_REQUEST_RESPONSE}
+OAUTH2_FIXTURES = {"access_token_url": mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1,
+                   "profile_url": mocks.OAUTH2_REQUEST_RESPONSE}
+# fixtures of providers whose responses differ from the generic ones, by url attribute or profile resource name
+PROVIDER_FIXTURES = {"bitbucket": {"profile_url": mocks.BITBUCKET_USER_RESPONSE, "emails": mocks.BITBUCKET_EMAILS_RESPONSE}}
+
+
+class UnpooledSessionPool(SessionPool):
+    """
+    Baseline without connection reuse: a new session, and connection, per request
+
+    """
+
+    def request(self, method, url, **kwargs):
+        pool = SessionPool(timeout=self.timeout)
+        try:
+            return pool.request(method, url, **kwargs)
+        finally:
+            pool.close()
+
+
+def is_oauth1(consumer_class):
+    return issubclass(consumer_class, OAuth1Consumer)
+
+
+def get_fixtures(consumer_class):
+    """
+    Return {url: mock response} of the requests consumer_class sends
+
+    """
+    fixtures = dict(OAUTH1_FIXTURES if is_oauth1(consumer_class) else OAUTH2_FIXTURES)
+    fixtures.update(PROVIDER_FIXTURES.get(consumer_class.name, {}))
+    urls = dict((attribute, getattr(consumer_class, attribute)) for attribute in ("request_token_url", "access_token_url", "profile_url")
+                if attribute in fixtures)
+    urls.update(consumer_class.profile_resource_urls)
+    return dict((url, fixtures[key]) for key, url in urls.items() if key in fixtures)
+
+
+def get_consumer(consumer_class, session_pool, token=None):
+    if is_oauth1(consumer_class):
+        return consumer_class(token=token, session_pool=session_pool, **mocks.OAUTH1_CREDENTIALS)
+    return consumer_class(token=token, session_pool=session_pool, **mocks.OAUTH2_CREDENTIALS)
+
+
+def get_valid_token(consumer_class):
+    return mocks.OAUTH1_VALID_TOKEN_DICT if is_oauth1(consumer_class) else mocks.OAUTH2_VALID_TOKEN_DICT
+
+
+def stage_authorization_url(consumer_class, session_pool):
+    # OAuth1 fetches a request token first
+    return get_consumer(consumer_class, session_pool).dance({}, REDIRECT_URI).get_authorization_url
+
+
+def stage_access_token(consumer_class, session_pool):
+    consumer = get_consumer(consumer_class, session_pool)
+    if is_oauth1(consumer_class):
+        return lambda: consumer.get_access_token(REDIRECT_URI + "?oauth_verifier=verifier&oauth_token=token", mocks.OAUTH1_REQUEST_TOKEN)
+    return lambda: consumer.get_access_token(REDIRECT_URI, "nonce", REDIRECT_URI + "?code=code&state=nonce")
+
+
+def stage_normalize_token_data(consumer_class, session_pool):
+    consumer = get_consumer(consumer_class, session_pool)
+    token = mocks.OAUTH1_REQUEST_TOKEN if is_oauth1(consumer_class) else json.loads(mocks.OAUTH2_VALID_TOKEN_EXPIRES_AT_JSON)
+    return lambda: consumer.normalize_token_data(token)
+
+
+def stage_prepare_request(consumer_class, session_pool):
+    # signing only, HMAC-SHA1 for OAuth1
+    consumer = get_consumer(consumer_class, session_pool, get_valid_token(consumer_class))
+    return lambda: consumer.prepare_request(consumer.profile_url)
+
+
+def stage_request(consumer_class, session_pool):
+    consumer = get_consumer(consumer_class, session_pool, get_valid_token(consumer_class))
+    return lambda: consumer.request(consumer.profile_url)
+
+
+def stage_get_profile(consumer_class, session_pool):
+    return get_consumer(consumer_class, session_pool, get_valid_token(consumer_class)).get_profile
+
+
+# (name, whether the stage talks to the provider, factory returning the operation to time)
+STAGES = [
+    ("authorization_url", True, stage_authorization_url),
+    ("access_token", True, stage_access_token),
+    ("normalize_token_data", False, stage_normalize_token_data),
+    ("prepare_request", False, stage_prepare_request),
+    ("request", True, stage_request),
+    ("get_profile", True, stage_get_profile),
+]
+
+
+@contextlib.contextmanager
+def insecure_transport():
+    """
+    Let oauthlib talk to the plain HTTP stub server
+
+    """
+    previous = os.environ.get("OAUTHLIB_INSECURE_TRANSPORT")
+    os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ["OAUTHLIB_INSECURE_TRANSPORT"]
+        else:
+            os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = previous
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of sorted values
+
+    """
+    return values[max(0, int(round(percent / 100.0 * len(values) + 0.5)) - 1)] if values else None
+
+
+def measure(operation, iterations, warmup):
+    for _ in range(warmup):
+        operation()
+    timer = timeit.default_timer
+    durations = []
+    for _ in range(iterations):
+        start = timer()
+        operation()
+        durations.append(timer() - start)
+    durations.sort()
+    return {"iterations": iterations,
+            "throughput": iterations / sum(durations) if sum(durations) else None,
+            "p50": percentile(durations, 50) * 1000,
+            "p95": percentile(durations, 95) * 1000,
+            "p99": percentile(durations, 99) * 1000}
+
+
+def run(providers=None, stages=None, iterations=200, warmup=10, reuse=(True, False)):
+    """
+    Run the benchmarks against a local stub server, returns a list of results
+
+    Each result has provider, stage, reuse (None for stages that don't send requests), iterations,
+    throughput (operations per second) and p50, p95, p99 latencies in milliseconds.
+
+    """
+    providers = [PROVIDERS[name] for name in providers] if providers else list(PROVIDERS.values())
+    stages = [stage for stage in STAGES if not stages or stage[0] in stages]
+    results = []
+    with StubProviderServer() as server, insecure_transport():
+        for provider in providers:
+            for url, fixture in get_fixtures(provider).items():
+                server.add_route(url, fixture["status"], fixture["content_type"], fixture["body"])
+            consumer_class = localize(provider, server.base_url)
+            for name, network, factory in stages:
+                for mode in (reuse if network else (None,)):
+                    session_pool = SessionPool() if mode is not False else UnpooledSessionPool()
+                    try:
+                        result = measure(factory(consumer_class, session_pool), iterations, warmup)
+                    finally:
+                        session_pool.close()
+                    result.update(provider=provider.name, stage=name, reuse=mode)
+                    results.append(result)
+    return results
+
+
+def get_result_key(result):
+    return result["provider"], result["stage"], result["reuse"]
+
+
+def compare(results, baseline, threshold=0.25, metric="p50"):
+    """
+    Return (result, baseline result) pairs whose metric regressed by more than threshold (a ratio)
+
+    """
+    previous = dict((get_result_key(result), result) for result in baseline)
+    regressions = []
+    for result in results:
+        reference = previous.get(get_result_key(result))
+        if reference and reference.get(metric) and result[metric] > reference[metric] * (1 + threshold):
+            regressions.append((result, reference))
+    return regressions
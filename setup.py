@@ -56,7 +56,7 @@ setup(
     description="Minimalist and framework independent OAuth(1 & 2) consumers",
     long_description="\n\n".join([pypi_readme_note, read('README.rst')]),
     install_requires=[str(ir.req) for ir in parse_requirements('requirements.txt', session=uuid.uuid1())],
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     tests_require=["tox"],
     cmdclass={"test": Tox},
     license='MIT',
@@ -67,7 +67,6 @@ setup(
         "Operating System :: OS Independent",
         "Programming Language :: Python",
         "Programming Language :: Python :: 2.7",
-        "Programming Language :: Python :: 3.3",
         "Programming Language :: Python :: 3.4",
     ]
 )
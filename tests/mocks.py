@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals, absolute_import, print_function
 
+import json
 import functools
 import datetime
 import six
@@ -11,12 +12,14 @@ import responses
 from uniauth.base import ProfileMixin
 from uniauth.oauth1 import OAuth1Consumer
 from uniauth.oauth2 import OAuth2Consumer
+from uniauth.refresh import default_refresh_coordinator
 
 
 def patch_responses(*resps):
     def decorator(f):
         @functools.wraps(f)
         def wrapper(*args, **kwargs):
+            default_refresh_coordinator.clear()
             responses.start()
             for response in resps:
                 responses.add(**response)
@@ -154,3 +157,41 @@ OAUTH2_REQUEST_RESPONSE = {
 OAUTH2_REQUEST_EXPECTED_RESULT = {"first_name": "John", "last_name": "Carter", "id": "1", "email": u"john.carter@fromearth.org"}
 OAUTH2_REQUEST_EXPECTED_AUTHORIZATION = "Bearer AT"
 OAUTH2_GET_PROFILE_EXPECTED_RESULT = {"username": None, "first_name": "John", "last_name": "Carter", "uid": "1", "avatar_url": None, "gender": None, "is_verified": False, "email": "john.carter@fromearth.org", "birthdate": None}
+
+
+# FACEBOOK MOCKS
+FACEBOOK_BATCH_RESPONSE = {
+    "method": responses.POST,
+    "url": "https://graph.facebook.com/",
+    "status": 200,
+    "content_type": "application/json",
+    "body": json.dumps([
+        {"code": 200, "headers": [{"name": "Content-Type", "value": "text/javascript; charset=UTF-8"}],
+         "body": json.dumps({"id": "1", "first_name": "John", "last_name": "Carter", "email": "john.carter@fromearth.org", "gender": "male"})},
+        {"code": 400, "headers": [], "body": json.dumps({"error": {"type": "OAuthException", "message": "Error validating access token"}})},
+        None,
+    ]),
+}
+FACEBOOK_GET_PROFILE_EXPECTED_RESULT = {"username": None, "first_name": "John", "last_name": "Carter", "uid": "1",
+                                        "avatar_url": "https://graph.facebook.com/1/picture?type=large&return_ssl_resources=1",
+                                        "gender": "m", "is_verified": False, "email": "john.carter@fromearth.org", "birthdate": None}
+
+
+# BITBUCKET MOCKS
+BITBUCKET_USER_RESPONSE = {
+    "method": responses.GET,
+    "url": "https://bitbucket.org/api/1.0/user",
+    "status": 200,
+    "content_type": "application/json",
+    "body": json.dumps({"user": {"username": "jcarter", "first_name": "John", "last_name": "Carter", "avatar": "https://example.org/avatar.png"}}),
+}
+BITBUCKET_EMAILS_RESPONSE = {
+    "method": responses.GET,
+    "url": "https://bitbucket.org/api/1.0/emails",
+    "status": 200,
+    "content_type": "application/json",
+    "body": json.dumps([{"email": "john@example.org", "primary": False}, {"email": "john.carter@fromearth.org", "primary": True}]),
+}
+BITBUCKET_GET_PROFILE_EXPECTED_RESULT = {"username": "jcarter", "first_name": "John", "last_name": "Carter", "uid": "jcarter",
+                                         "avatar_url": "https://example.org/avatar.png", "gender": None, "is_verified": False,
+                                         "email": "john.carter@fromearth.org", "birthdate": None}
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import gc
+import sys
+import weakref
+import unittest
+from mock import patch
+from oauthlib.oauth2.rfc6749.errors import TokenExpiredError
+from uniauth.ratelimit import RateLimiter, RateLimitExceeded
+from uniauth.instrumentation import StatsObserver
+from uniauth.oauth1 import RequestTokenPool
+from uniauth.refresh import RefreshCoordinator
+from uniauth.cache import ResponseCache
+from . import mocks, test_pagination, test_refresh
+
+PY37 = sys.version_info >= (3, 7)
+
+if PY37:
+    import asyncio
+    from mock import MagicMock, AsyncMock
+    from uniauth import aio
+    from uniauth.base import ProfileMixin
+
+    class AsyncMockOAuth1Provider(aio.AsyncProfileMixin, aio.AsyncOAuth1Consumer, mocks.MockOAuth1Provider):
+        name = mocks.MockOAuth1Provider.name
+
+    class AsyncMockOAuth2Provider(aio.AsyncProfileMixin, aio.AsyncOAuth2Consumer, mocks.MockOAuth2Provider):
+        name = mocks.MockOAuth2Provider.name
+
+    def run(coroutine):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+
+@unittest.skipUnless(PY37, "asyncio consumers require Python 3.7+")
+class AsyncOAuth1ProviderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = aio.ExecutorTransport()
+
+    @mocks.patch_responses(mocks.OAUTH1_REQUEST_RESPONSE)
+    def test_get_profile(self, responses):
+        provider = AsyncMockOAuth1Provider(token=mocks.OAUTH1_ACCESS_TOKEN, transport=self.transport, **mocks.OAUTH1_CREDENTIALS)
+        self.assertDictEqual(mocks.OAUTH1_GET_PROFILE_EXPECTED_RESULT, run(provider.get_profile()))
+
+    @mocks.patch_responses(mocks.OAUTH1_REQUEST_TOKEN_RESPONSE_1, mocks.OAUTH1_ACCESS_TOKEN_RESPONSE_1)
+    def test_oauth1_dance(self, responses):
+        provider = AsyncMockOAuth1Provider(transport=self.transport, **mocks.OAUTH1_CREDENTIALS)
+        stash = {}
+        dance = provider.dance(stash, 'https://example.org/callback')
+        self.assertEqual(mocks.OAUTH1_GET_AUTHORIZATION_URL_EXPECTED_RESULT, run(dance.get_authorization_url()))
+        self.assertIn("oauth1_request_token_mockoauth1provider", stash)
+        token = run(dance.get_access_token('https://example.org/callback?oauth_verifier=verifier&oauth_token=token'))
+        self.assertEqual(mocks.OAUTH1_ACCESS_TOKEN, token)
+        self.assertEqual(mocks.OAUTH1_ACCESS_TOKEN, provider.get_token())
+
+    @mocks.patch_responses(mocks.OAUTH1_REQUEST_TOKEN_RESPONSE_1)
+    def test_prefetched_request_token(self, responses):
+        pool = RequestTokenPool(size=1)
+        provider = AsyncMockOAuth1Provider(transport=self.transport, request_token_pool=pool, **mocks.OAUTH1_CREDENTIALS)
+        pool.refill(provider, 'https://example.org/callback')
+        pool.wait()
+        dance = provider.dance({}, 'https://example.org/callback')
+        self.assertEqual(mocks.OAUTH1_GET_AUTHORIZATION_URL_EXPECTED_RESULT, run(dance.get_authorization_url()))
+        pool.wait()
+        self.assertEqual(2, len(responses.calls))
+
+
+@unittest.skipUnless(PY37, "asyncio consumers require Python 3.7+")
+class AsyncOAuth2ProviderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = aio.ExecutorTransport()
+
+    @mocks.patch_responses()
+    def test_paginate(self, responses):
+        responses.add_callback(responses.GET, test_pagination.REPOS_URL, callback=test_pagination.link_page)
+        provider = AsyncMockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, transport=self.transport, **mocks.OAUTH2_CREDENTIALS)
+
+        async def walk():
+            return [repo["id"] async for repo in provider.paginate(test_pagination.REPOS_URL)]
+
+        self.assertEqual(test_pagination.EXPECTED_IDS, run(walk()))
+
+    @mocks.patch_responses(mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_get_profile(self, responses):
+        provider = AsyncMockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, transport=self.transport, **mocks.OAUTH2_CREDENTIALS)
+        self.assertDictEqual(mocks.OAUTH2_GET_PROFILE_EXPECTED_RESULT, run(provider.get_profile()))
+        self.assertEqual(mocks.OAUTH2_REQUEST_EXPECTED_AUTHORIZATION, responses.calls[0].request.headers['Authorization'])
+
+    @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE, mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_request_refreshes_expired_token(self, responses):
+        refreshed = []
+        provider = AsyncMockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, refresh_token_callback=refreshed.append, transport=self.transport, **mocks.OAUTH2_CREDENTIALS)
+        response = run(provider.request('https://example.org/profile'))
+        self.assertDictEqual(mocks.OAUTH2_REQUEST_EXPECTED_RESULT, response.json())
+        self.assertEqual([mocks.OAUTH2_VALID_TOKEN_DICT], refreshed)
+
+    @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE, mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_observers(self, responses):
+        stats = StatsObserver()
+        provider = AsyncMockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, observers=[stats], transport=self.transport, **mocks.OAUTH2_CREDENTIALS)
+        run(provider.get_profile())
+        counts = dict((stage, stats["count"]) for (_, stage), stats in stats.get_stats().items())
+        self.assertEqual({"profile": 1, "request": 2, "sign": 2, "refresh_token": 1, "http": 2, "normalize_profile": 1}, counts)
+        self.assertEqual(1, stats.get_stats()[("mockoauth2provider", "refresh_token")]["refreshed"])
+
+    @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE, mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_concurrent_requests_refresh_once(self, responses):
+        refreshed = []
+        providers = [AsyncMockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, refresh_token_callback=refreshed.append,
+                                             transport=self.transport, **mocks.OAUTH2_CREDENTIALS) for _ in range(5)]
+
+        async def request_all():
+            return await asyncio.gather(*[provider.request('https://example.org/profile') for provider in providers])
+
+        run(request_all())
+        self.assertEqual([mocks.OAUTH2_VALID_TOKEN_DICT], refreshed)
+        self.assertEqual(1, len([call for call in responses.calls if call.request.url == 'https://example.org/oauth/token']))
+
+    @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE, mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_sequential_requests_refresh_once(self, responses):
+        refreshed = []
+        for _ in range(2):
+            provider = AsyncMockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, refresh_token_callback=refreshed.append,
+                                               transport=self.transport, **mocks.OAUTH2_CREDENTIALS)
+            run(provider.request('https://example.org/profile'))
+            self.assertEqual(mocks.OAUTH2_VALID_TOKEN_DICT, provider.get_token())
+        self.assertEqual([mocks.OAUTH2_VALID_TOKEN_DICT], refreshed)
+        self.assertEqual(1, len([call for call in responses.calls if call.request.url == 'https://example.org/oauth/token']))
+
+    @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE, mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_refresh_coordinated_by_backend(self, responses):
+        refreshed = []
+        backend = test_refresh.MemoryLockBackend()
+        for _ in range(2):
+            # a coordinator per "process", sharing the lock backend
+            provider = AsyncMockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, refresh_token_callback=refreshed.append,
+                                               refresh_coordinator=RefreshCoordinator(backend=backend), transport=self.transport,
+                                               **mocks.OAUTH2_CREDENTIALS)
+            run(provider.request('https://example.org/profile'))
+            self.assertEqual(mocks.OAUTH2_VALID_TOKEN_DICT, provider.get_token())
+        self.assertEqual([mocks.OAUTH2_VALID_TOKEN_DICT], refreshed)
+        self.assertEqual([mocks.OAUTH2_VALID_TOKEN_DICT], list(backend.results.values()))
+        self.assertFalse(any(lock.locked() for lock in backend.locks.values()))
+        self.assertEqual(1, len([call for call in responses.calls if call.request.url == 'https://example.org/oauth/token']))
+
+    def test_request_disable_auto_refresh(self):
+        provider = AsyncMockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, transport=self.transport, **mocks.OAUTH2_CREDENTIALS)
+        with self.assertRaises(TokenExpiredError):
+            run(provider.request('https://example.org/profile', auto_refresh_token=False))
+
+    @patch('uniauth.oauth2.generate_token')
+    @mocks.patch_responses(mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1)
+    def test_oauth2_dance(self, generate_token, responses):
+        generate_token.return_value = "nonce"
+        provider = AsyncMockOAuth2Provider(transport=self.transport, **mocks.OAUTH2_CREDENTIALS)
+        dance = provider.dance({}, 'https://example.org/callback')
+        self.assertEqual(mocks.OAUTH2_GET_AUTHORIZATION_URL_EXPECTED_RESULT, run(dance.get_authorization_url()))
+        token = run(dance.get_access_token('https://example.org/callback?code=code&state=nonce'))
+        self.assertEqual(mocks.OAUTH2_EXCHANGE_TOKEN_EXPECTED_RESULT, token)
+
+    def test_refresh_ahead_dropped_consumer(self):
+        refreshed = []
+
+        async def refresh_token(consumer):
+            refreshed.append(consumer.client.refresh_token)
+
+        async def scenario():
+            kept = AsyncMockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, refresh_ahead=2 * 24 * 3600,
+                                           transport=self.transport, **mocks.OAUTH2_CREDENTIALS)
+            dropped = AsyncMockOAuth2Provider(token=dict(mocks.OAUTH2_VALID_TOKEN_DICT, token="AT2", extra="RT2"), refresh_ahead=2 * 24 * 3600,
+                                              transport=self.transport, **mocks.OAUTH2_CREDENTIALS)
+            dropped_ref = weakref.ref(dropped)
+            del dropped
+            gc.collect()
+            await asyncio.sleep(0.01)
+            return kept, dropped_ref
+
+        with patch.object(AsyncMockOAuth2Provider, "refresh_token", refresh_token):
+            kept, dropped_ref = run(scenario())
+        self.assertIsNone(dropped_ref())
+        self.assertEqual(["RT"], refreshed)
+
+    @mocks.patch_responses(dict(mocks.OAUTH2_REQUEST_RESPONSE, adding_headers={"Retry-After": "60"}))
+    def test_rate_limit(self, responses):
+        provider = AsyncMockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, rate_limiter=RateLimiter(max_wait=1),
+                                           transport=self.transport, **mocks.OAUTH2_CREDENTIALS)
+        run(provider.request('https://example.org/profile'))
+        with self.assertRaises(RateLimitExceeded):
+            run(provider.request('https://example.org/profile'))
+        self.assertEqual(1, len(responses.calls))
+
+    @mocks.patch_responses(mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_concurrent_requests(self, responses):
+        provider = AsyncMockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, transport=self.transport, **mocks.OAUTH2_CREDENTIALS)
+
+        async def fetch_all():
+            return await asyncio.gather(*[provider.get_profile() for _ in range(10)])
+
+        self.assertEqual([mocks.OAUTH2_GET_PROFILE_EXPECTED_RESULT] * 10, run(fetch_all()))
+
+
+@unittest.skipUnless(PY37, "asyncio consumers require Python 3.7+")
+class AsyncProvidersTest(unittest.TestCase):
+
+    def test_names(self):
+        for provider_class, name in ((aio.AsyncGoogle, 'google'), (aio.AsyncFacebook, 'facebook'), (aio.AsyncLinkedIn, 'linkedin'), (aio.AsyncGitHub, 'github')):
+            provider = provider_class(**mocks.OAUTH2_CREDENTIALS)
+            self.assertEqual(name, provider.name)
+            self.assertIsInstance(provider, ProfileMixin)
+        self.assertEqual('bitbucket', aio.AsyncBitbucket(**mocks.OAUTH1_CREDENTIALS).name)
+
+    @mocks.patch_responses(mocks.BITBUCKET_USER_RESPONSE, mocks.BITBUCKET_EMAILS_RESPONSE)
+    def test_bitbucket_get_profile(self, responses):
+        provider = aio.AsyncBitbucket(token=mocks.OAUTH1_VALID_TOKEN_DICT, transport=aio.ExecutorTransport(), **mocks.OAUTH1_CREDENTIALS)
+        self.assertDictEqual(mocks.BITBUCKET_GET_PROFILE_EXPECTED_RESULT, run(provider.get_profile()))
+
+
+@unittest.skipUnless(PY37, "asyncio consumers require Python 3.7+")
+class AiohttpTransportTest(unittest.TestCase):
+
+    def test_session_per_event_loop(self):
+        async def get_sessions(transport):
+            return transport.get_session(), transport.get_session()
+
+        async def close(transport):
+            await transport.close()
+
+        fake_aiohttp = MagicMock()
+        fake_aiohttp.ClientSession.side_effect = lambda **kwargs: MagicMock(closed=False, close=AsyncMock())
+        with patch.object(aio, "aiohttp", fake_aiohttp):
+            transport = aio.AiohttpTransport()
+            first, same = run(get_sessions(transport))
+            second, _ = run(get_sessions(transport))
+            self.assertIs(first, same)
+            self.assertIsNot(first, second)
+            self.assertLessEqual(len(transport._sessions), 1)
+
+            loop = asyncio.new_event_loop()
+            try:
+                session, _ = loop.run_until_complete(get_sessions(transport))
+                loop.run_until_complete(close(transport))
+            finally:
+                loop.close()
+            session.close.assert_awaited_once_with()
+
+    def test_streamed_request(self):
+        resp = MagicMock(url="https://example.org/profile", status=200, reason="OK")
+        resp.headers.items.return_value = [("Content-Type", "application/json")]
+        resp.read = AsyncMock(return_value=b'{"id": 1}')
+        session = MagicMock(closed=False, close=AsyncMock())
+        session.request.return_value.__aenter__.return_value = resp
+        fake_aiohttp = MagicMock()
+        fake_aiohttp.ClientSession.return_value = session
+        with patch.object(aio, "aiohttp", fake_aiohttp):
+            provider = AsyncMockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, transport=aio.AiohttpTransport(),
+                                               response_cache=ResponseCache(ttl=60), **mocks.OAUTH2_CREDENTIALS)
+
+            async def request_twice():
+                return [await provider.request("https://example.org/profile", stream=True) for _ in range(2)]
+
+            responses = run(request_twice())
+        self.assertEqual([{"id": 1}] * 2, [response.json() for response in responses])
+        self.assertEqual(2, session.request.call_count)
+        self.assertNotIn("stream", session.request.call_args[1])
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import itertools
+import functools
+import threading
+import unittest
+import mock
+from oauthlib.common import urldecode
+from oauthlib.oauth2.rfc6749.errors import TokenExpiredError, InvalidGrantError
+from uniauth.batch import fetch_profiles, refresh_tokens, RefreshCheckpoint, MissingRefreshToken, is_permanent_error
+from uniauth.factory import ConsumerFactory
+from uniauth.stores import MemoryTokenStore
+from uniauth.concurrency import imap_unordered, HostLimiter
+from . import mocks
+
+
+class ImapUnorderedTest(unittest.TestCase):
+
+    def test_results_and_errors(self):
+        def func(item):
+            if item == 3:
+                raise ValueError(item)
+            return item * 2
+
+        results = sorted(imap_unordered(func, range(5), workers=2), key=lambda result: result[0])
+        self.assertEqual([(0, 0), (1, 2), (2, 4), (4, 8)], [(item, result) for item, result, error in results if error is None])
+        self.assertIsInstance(results[3][2], ValueError)
+
+    def test_bounded_read_ahead(self):
+        consumed = itertools.count()
+        items = (next(consumed) for _ in itertools.count())
+        results = imap_unordered(lambda item: item, items, workers=2)
+        for _ in range(3):
+            next(results)
+        results.close()
+        self.assertLessEqual(next(consumed), 3 + 2 * 2 + 1)
+
+
+class HostLimiterTest(unittest.TestCase):
+
+    def test_concurrency_per_host(self):
+        limiter = HostLimiter(concurrency=2)
+        in_flight = {"example.org": 0, "example.com": 0}
+        peaks = {"example.org": 0, "example.com": 0}
+        lock = threading.Lock()
+
+        def call(url):
+            with limiter.limit(url):
+                host = url.split("/")[2]
+                with lock:
+                    in_flight[host] += 1
+                    peaks[host] = max(peaks[host], in_flight[host])
+                time.sleep(0.02)
+                with lock:
+                    in_flight[host] -= 1
+
+        list(imap_unordered(call, ["https://example.org/a", "https://example.com/b"] * 10, workers=10))
+        self.assertEqual({"example.org": 2, "example.com": 2}, peaks)
+
+    def test_rate_per_host(self):
+        limiter = HostLimiter(rate=50)
+        start = time.time()
+        for _ in range(6):
+            with limiter.limit("https://example.org/"):
+                pass
+        self.assertGreaterEqual(time.time() - start, 0.09)
+
+
+class FetchProfilesTest(unittest.TestCase):
+
+    @mocks.patch_responses(mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_fetch_profiles(self, responses):
+        provider = functools.partial(mocks.MockOAuth2Provider, **mocks.OAUTH2_CREDENTIALS)
+        expired = dict(mocks.OAUTH2_EXPIRED_TOKEN_DICT, extra=None)
+        items = [(provider, mocks.OAUTH2_VALID_TOKEN_DICT)] * 5 + [(provider, expired)]
+
+        results = list(fetch_profiles(items, workers=3, per_host=2))
+
+        self.assertEqual(6, len(results))
+        succeeded = [result for result in results if result.ok]
+        failed = [result for result in results if not result.ok]
+        self.assertEqual([mocks.OAUTH2_GET_PROFILE_EXPECTED_RESULT] * 5, [result.profile for result in succeeded])
+        self.assertEqual(1, len(failed))
+        self.assertIs(expired, failed[0].token)
+        self.assertIsInstance(failed[0].error, TokenExpiredError)
+
+    @mocks.patch_responses(mocks.OAUTH1_REQUEST_RESPONSE, mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_fetch_profiles_mixed_providers(self, responses):
+        oauth1 = functools.partial(mocks.MockOAuth1Provider, **mocks.OAUTH1_CREDENTIALS)
+        oauth2 = functools.partial(mocks.MockOAuth2Provider, **mocks.OAUTH2_CREDENTIALS)
+        results = list(fetch_profiles([(oauth1, mocks.OAUTH1_VALID_TOKEN_DICT), (oauth2, mocks.OAUTH2_VALID_TOKEN_DICT)]))
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual({oauth1, oauth2}, set(result.provider for result in results))
+
+
+def refresh_callback(request):
+    refresh_token = dict(urldecode(request.body))["refresh_token"]
+    if refresh_token.startswith("revoked"):
+        return 400, {}, json.dumps({"error": "invalid_grant"})
+    if refresh_token.startswith("unavailable"):
+        return 503, {}, ""
+    return 200, {}, json.dumps({"access_token": "new-" + refresh_token, "refresh_token": refresh_token, "expires_in": 3600})
+
+
+class RefreshTokensTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.factory = ConsumerFactory(mocks.MockOAuth2Provider, **mocks.OAUTH2_CREDENTIALS)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def items(self, *refresh_tokens):
+        return [(refresh_token, self.factory, dict(mocks.OAUTH2_EXPIRED_TOKEN_DICT, extra=refresh_token)) for refresh_token in refresh_tokens]
+
+    def refresh(self, responses, items, **kwargs):
+        responses.add_callback(responses.POST, "https://example.org/oauth/token", callback=refresh_callback)
+        return dict((result.key, result) for result in refresh_tokens(items, workers=4, per_host=2, **kwargs))
+
+    @mocks.patch_responses()
+    def test_refresh_tokens(self, responses):
+        items = self.items(*["RT{0}".format(i) for i in range(10)] + ["revoked", "unavailable", None])
+        results = self.refresh(responses, items)
+        self.assertEqual(13, len(results))
+        for i in range(10):
+            self.assertTrue(results["RT{0}".format(i)].ok)
+            self.assertEqual("new-RT{0}".format(i), results["RT{0}".format(i)].refreshed["token"])
+        self.assertTrue(results["revoked"].permanent)
+        self.assertFalse(results["unavailable"].ok)
+        self.assertFalse(results["unavailable"].permanent)
+        self.assertIsInstance(results[None].error, MissingRefreshToken)
+        self.assertTrue(results[None].permanent)
+
+    @mocks.patch_responses()
+    def test_refreshed_tokens_stored(self, responses):
+        store = MemoryTokenStore()
+        self.factory = ConsumerFactory(mocks.MockOAuth2Provider, token_store=store, **mocks.OAUTH2_CREDENTIALS)
+        self.refresh(responses, self.items("RT1", "revoked"))
+        self.assertEqual("new-RT1", store.get("RT1").token)
+        self.assertIsNone(store.get("revoked"))
+
+    @mocks.patch_responses()
+    def test_checkpoint(self, responses):
+        path = os.path.join(self.directory, "checkpoint")
+        checkpoint = RefreshCheckpoint(path)
+        self.refresh(responses, self.items("RT1", "revoked", "unavailable"), checkpoint=checkpoint)
+        checkpoint.close()
+        self.assertEqual([True, True, False], [key in checkpoint for key in ["RT1", "revoked", "unavailable"]])
+
+        results = self.refresh(responses, self.items("RT1", "revoked", "unavailable", "RT2"), checkpoint=path)
+        self.assertEqual(["RT2", "unavailable"], sorted(results))
+        self.assertIn("RT2", RefreshCheckpoint(path))
+
+    def test_checkpoint_tuple_keys(self):
+        path = os.path.join(self.directory, "checkpoint")
+        with RefreshCheckpoint(path) as checkpoint:
+            checkpoint.add(("google", 42))
+            checkpoint.add(("google", ("user", 1)))
+            checkpoint.add("RT1")
+        checkpoint = RefreshCheckpoint(path)
+        self.assertIn(("google", 42), checkpoint)
+        self.assertIn(("google", ("user", 1)), checkpoint)
+        self.assertIn("RT1", checkpoint)
+        self.assertEqual(3, len(checkpoint))
+
+    @mocks.patch_responses()
+    def test_checkpoint_path_closed(self, responses):
+        path = os.path.join(self.directory, "checkpoint")
+        with mock.patch.object(RefreshCheckpoint, "close", autospec=True) as close:
+            self.refresh(responses, self.items("RT1", "RT2"), checkpoint=path)
+            self.assertEqual(1, close.call_count)
+            results = refresh_tokens(self.items("RT3", "RT4"), workers=1, checkpoint=path)
+            next(results)
+            results.close()
+            self.assertEqual(2, close.call_count)
+        with RefreshCheckpoint(path) as checkpoint:
+            self.assertIn("RT1", checkpoint)
+
+    def test_permanent_errors(self):
+        self.assertTrue(is_permanent_error(InvalidGrantError()))
+        self.assertFalse(is_permanent_error(TokenExpiredError()))
+        self.assertFalse(is_permanent_error(ValueError()))
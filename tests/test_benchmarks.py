@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+import mock
+import requests
+from uniauth.consumers import Bitbucket
+from benchmarks.server import StubProviderServer, localize
+from benchmarks.suite import run, compare, get_fixtures
+from benchmarks import startup
+from benchmarks import __main__ as benchmarks_main
+
+
+class StubProviderServerTest(unittest.TestCase):
+
+    def test_localize(self):
+        consumer_class = localize(Bitbucket, "http://127.0.0.1:8000")
+        self.assertEqual("bitbucket", consumer_class.name)
+        self.assertEqual("http://127.0.0.1:8000/bitbucket.org/api/1.0/user", consumer_class.profile_url)
+        self.assertEqual({"emails": "http://127.0.0.1:8000/bitbucket.org/api/1.0/emails"}, consumer_class.profile_resource_urls)
+
+    def test_routes(self):
+        with StubProviderServer() as server:
+            for url, fixture in get_fixtures(Bitbucket).items():
+                server.add_route(url, fixture["status"], fixture["content_type"], fixture["body"])
+            consumer_class = localize(Bitbucket, server.base_url)
+            response = requests.get(consumer_class.profile_resource_urls["emails"])
+            self.assertEqual(200, response.status_code)
+            self.assertTrue(response.json()[1]["primary"])
+            self.assertEqual(404, requests.get(server.base_url + "/unknown").status_code)
+
+
+class SuiteTest(unittest.TestCase):
+
+    def test_run(self):
+        results = run(providers=["Bitbucket"], stages=["prepare_request", "get_profile"], iterations=3, warmup=1)
+        self.assertEqual([("prepare_request", None), ("get_profile", True), ("get_profile", False)],
+                         [(result["stage"], result["reuse"]) for result in results])
+        self.assertTrue(all(result["p50"] <= result["p95"] <= result["p99"] for result in results))
+        self.assertNotIn("OAUTHLIB_INSECURE_TRANSPORT", os.environ)
+
+    def test_compare(self):
+        baseline = [{"provider": "github", "stage": "request", "reuse": True, "p50": 1.0}]
+        self.assertEqual([], compare([dict(baseline[0], p50=1.2)], baseline, threshold=0.25))
+        self.assertEqual(1, len(compare([dict(baseline[0], p50=1.3)], baseline, threshold=0.25)))
+        self.assertEqual([], compare([dict(baseline[0], stage="get_profile", p50=9.0)], baseline))
+
+
+class StartupTest(unittest.TestCase):
+
+    def test_run(self):
+        results = startup.run(repeat=1)
+        self.assertEqual([label for label, _ in startup.STATEMENTS], [result["label"] for result in results])
+        self.assertTrue(all(result["min"] >= 0 for result in results))
+        stacks = dict((result["label"], result["stacks"]) for result in results)
+        self.assertEqual([], stacks["import uniauth"])
+        self.assertEqual(["oauthlib.oauth2"], stacks["get_consumer('github')"])
+        self.assertEqual(["oauthlib.oauth1"], stacks["get_consumer('bitbucket')"])
+
+
+class MainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.baseline = os.path.join(self.directory, "baseline.json")
+        self.results = [{"provider": "github", "stage": "request", "reuse": True, "throughput": 1000.0,
+                         "p50": 1.0, "p95": 1.5, "p99": 2.0}]
+
+    def main(self, *argv):
+        with mock.patch.object(benchmarks_main, "run", return_value=self.results), mock.patch("sys.stdout"):
+            return benchmarks_main.main(list(argv))
+
+    def test_compare(self):
+        self.assertEqual(0, self.main("--save", self.baseline))
+        self.assertEqual(0, self.main("--compare", self.baseline))
+        self.results = [dict(self.results[0], p50=1.3)]
+        self.assertEqual(1, self.main("--compare", self.baseline))
+        self.assertEqual(0, self.main("--compare", self.baseline, "--threshold", "0.5"))
+
+    def test_missing_baseline(self):
+        with mock.patch("sys.stderr"):
+            with self.assertRaises(SystemExit) as context:
+                self.main("--compare", self.baseline)
+        self.assertEqual(2, context.exception.code)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import unittest
+from uniauth.cache import MemoryCache, ResponseCache
+from . import mocks
+
+PROFILE_RESPONSE_WITH_ETAG = dict(mocks.OAUTH2_REQUEST_RESPONSE, adding_headers={"ETag": '"v1"', "Last-Modified": "Sat, 17 Oct 2026 10:00:00 GMT"})
+PROFILE_NOT_MODIFIED_RESPONSE = dict(mocks.OAUTH2_REQUEST_RESPONSE, status=304, body="")
+
+
+class MemoryCacheTest(unittest.TestCase):
+
+    def test_get_set_delete(self):
+        cache = MemoryCache()
+        self.assertIsNone(cache.get("key"))
+        cache.set("key", {"value": 1})
+        self.assertEqual({"value": 1}, cache.get("key"))
+        cache.delete("key")
+        self.assertIsNone(cache.get("key"))
+        cache.set("key", {"value": 2})
+        self.assertEqual({"value": 2}, cache.pop("key"))
+        self.assertIsNone(cache.pop("key"))
+
+    def test_ttl(self):
+        cache = MemoryCache(ttl=0.05)
+        cache.set("default", 1)
+        cache.set("explicit", 2, ttl=60)
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("default"))
+        self.assertEqual(2, cache.get("explicit"))
+
+    def test_lru_eviction(self):
+        cache = MemoryCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(1, cache.get("a"))
+        self.assertEqual(3, cache.get("c"))
+
+    def test_add(self):
+        cache = MemoryCache()
+        self.assertTrue(cache.add("key", 1, ttl=0.05))
+        self.assertFalse(cache.add("key", 2, ttl=0.05))
+        self.assertEqual(1, cache.get("key"))
+        time.sleep(0.06)
+        self.assertTrue(cache.add("key", 3))
+        self.assertEqual(3, cache.get("key"))
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def get_provider(self, cache, token=mocks.OAUTH2_VALID_TOKEN_DICT):
+        return mocks.MockOAuth2Provider(token=token, response_cache=cache, **mocks.OAUTH2_CREDENTIALS)
+
+    @mocks.patch_responses(PROFILE_RESPONSE_WITH_ETAG)
+    def test_fresh_response_served_from_cache(self, responses):
+        provider = self.get_provider(ResponseCache(ttl=60))
+        self.assertDictEqual(mocks.OAUTH2_GET_PROFILE_EXPECTED_RESULT, provider.get_profile())
+        self.assertDictEqual(mocks.OAUTH2_GET_PROFILE_EXPECTED_RESULT, provider.get_profile())
+        self.assertEqual(1, len(responses.calls))
+
+    @mocks.patch_responses(PROFILE_RESPONSE_WITH_ETAG, PROFILE_NOT_MODIFIED_RESPONSE)
+    def test_stale_response_revalidated(self, responses):
+        provider = self.get_provider(ResponseCache(ttl=0))
+        provider.get_profile()
+        response = provider.request('https://example.org/profile')
+        self.assertEqual(200, response.status_code)
+        self.assertDictEqual(mocks.OAUTH2_REQUEST_EXPECTED_RESULT, response.json())
+
+        self.assertEqual(2, len(responses.calls))
+        request = responses.calls[1].request
+        self.assertEqual('"v1"', request.headers["If-None-Match"])
+        self.assertEqual("Sat, 17 Oct 2026 10:00:00 GMT", request.headers["If-Modified-Since"])
+        self.assertEqual(mocks.OAUTH2_REQUEST_EXPECTED_AUTHORIZATION, request.headers["Authorization"])
+
+    @mocks.patch_responses(PROFILE_RESPONSE_WITH_ETAG)
+    def test_keyed_by_token_and_params(self, responses):
+        cache = ResponseCache(ttl=60)
+        self.get_provider(cache).get_profile()
+        self.get_provider(cache, token=dict(mocks.OAUTH2_VALID_TOKEN_DICT, token="other")).get_profile()
+        self.get_provider(cache).request('https://example.org/profile', params={"fields": "id"})
+        self.assertEqual(3, len(responses.calls))
+
+    @mocks.patch_responses(dict(mocks.OAUTH2_REQUEST_RESPONSE, method="POST"))
+    def test_non_get_not_cached(self, responses):
+        cache = ResponseCache(ttl=60)
+        provider = self.get_provider(cache)
+        provider.request('https://example.org/profile', method="POST")
+        provider.request('https://example.org/profile', method="POST")
+        self.assertEqual(2, len(responses.calls))
+        self.assertEqual(0, len(cache.backend))
+
+    @mocks.patch_responses(mocks.OAUTH1_REQUEST_RESPONSE)
+    def test_oauth1(self, responses):
+        provider = mocks.MockOAuth1Provider(token=mocks.OAUTH1_VALID_TOKEN_DICT, response_cache=ResponseCache(ttl=60), **mocks.OAUTH1_CREDENTIALS)
+        provider.get_profile()
+        self.assertDictEqual(mocks.OAUTH1_GET_PROFILE_EXPECTED_RESULT, provider.get_profile())
+        self.assertEqual(1, len(responses.calls))
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import io
+import gzip
+import json
+import unittest
+import mock
+import requests
+from urllib3.response import HTTPResponse
+from uniauth import decoding
+from uniauth.decoding import decode_json, decode_form_or_json, iter_items, set_json_backend, get_json_backend, ChunkReader
+from uniauth.sessions import build_response
+from . import mocks
+
+
+def streamed_gzip_response(data):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.raw = HTTPResponse(io.BytesIO(gzip.compress(json.dumps(data).encode("utf-8"))), headers={"Content-Encoding": "gzip"},
+                            status=200, preload_content=False)
+    return resp
+
+
+def response(data):
+    return build_response("https://example.org/items", 200, "OK", [("Content-Type", "application/json")], json.dumps(data).encode("utf-8"))
+
+
+class DecodingTest(unittest.TestCase):
+
+    def test_decoded_once(self):
+        resp = response({"items": [1, 2]})
+        with mock.patch.object(decoding, "_loads", wraps=decoding._loads) as loads:
+            self.assertIs(decode_json(resp), decode_json(resp))
+        self.assertEqual(1, loads.call_count)
+
+    def test_backends(self):
+        backend = get_json_backend()
+        try:
+            self.assertEqual("json", set_json_backend("missing", "json"))
+            self.assertEqual({"name": "ü"}, decode_json(response({"name": "ü"})))
+            with self.assertRaises(ImportError):
+                set_json_backend("missing")
+        finally:
+            set_json_backend(backend)
+
+    def test_decode_form_or_json(self):
+        self.assertEqual({"access_token": "AT"}, decode_form_or_json(b'{"access_token": "AT"}'))
+        self.assertEqual({"access_token": "AT", "scope": "a,b"}, decode_form_or_json("access_token=AT&scope=a%2Cb"))
+
+    def test_iter_items(self):
+        for ijson in set([decoding.ijson, None]):
+            with mock.patch.object(decoding, "ijson", ijson):
+                self.assertEqual([1, 2], list(iter_items(response([1, 2]))))
+                self.assertEqual([{"id": 1}], list(iter_items(response({"data": {"items": [{"id": 1}]}}), "data.items.item")))
+                self.assertEqual([], list(iter_items(response({"items": []}), "items.item")))
+
+    def test_chunk_reader_gzip_stream(self):
+        reader = ChunkReader(streamed_gzip_response({"items": [1, 2]}).iter_content(4))
+        self.assertEqual(b'{"it', reader.read(4))
+        self.assertEqual(b'ems": [1, 2]}', reader.read())
+        self.assertEqual(b"", reader.read(4))
+
+    @unittest.skipIf(decoding.ijson is None, "ijson is not installed")
+    def test_iter_items_streamed(self):
+        resp = streamed_gzip_response({"items": [{"id": i} for i in range(1000)]})
+        items = iter_items(resp, "items.item", chunk_size=256)
+        self.assertEqual({"id": 0}, next(items))
+        self.assertEqual(999, len(list(items)))
+
+    def test_stream_passed_through(self):
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, **mocks.OAUTH2_CREDENTIALS)
+        self.assertTrue(provider.prepare_request("https://example.org/items", stream=True)["stream"])
+        self.assertNotIn("stream", provider.prepare_request("https://example.org/items"))
+        provider = mocks.MockOAuth1Provider(token=mocks.OAUTH1_VALID_TOKEN_DICT, **mocks.OAUTH1_CREDENTIALS)
+        self.assertTrue(provider.prepare_request("https://example.org/items", stream=True)["stream"])
+
+    @mocks.patch_responses(dict(mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1, content_type="application/x-www-form-urlencoded",
+                                body="access_token=AT&refresh_token=RT&token_type=Bearer&expires_in=3600&scope=scope1+scope2"))
+    def test_form_encoded_token_response(self, responses):
+        provider = mocks.MockOAuth2Provider(**mocks.OAUTH2_CREDENTIALS)
+        token = provider.get_access_token('https://example.org/callback', 'nonce', 'https://example.org/callback?code=code&state=nonce')
+        self.assertEqual(("AT", "RT", "scope1 scope2"), (token.token, token.extra, token.scope))
+        self.assertFalse(token.is_expired(leeway=3500))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import unittest
+from uniauth.factory import ConsumerFactory, FactoryRegistry
+from . import mocks
+
+OTHER_OAUTH1_TOKEN = {"token": "AT2", "extra": "s&cr t/ü", "scope": None, "expires_at": None}
+OTHER_OAUTH2_TOKEN = dict(mocks.OAUTH2_VALID_TOKEN_DICT, token="AT2")
+
+
+class ConsumerFactoryTest(unittest.TestCase):
+
+    def test_oauth1_views(self):
+        factory = ConsumerFactory(mocks.MockOAuth1Provider, nonce="nonce", timestamp="1", **mocks.OAUTH1_CREDENTIALS)
+        first, second = factory(mocks.OAUTH1_VALID_TOKEN_DICT), factory(OTHER_OAUTH1_TOKEN)
+        self.assertEqual(mocks.OAUTH1_VALID_TOKEN_DICT, first.get_token())
+        self.assertEqual(OTHER_OAUTH1_TOKEN, second.get_token())
+        self.assertIsNone(factory.prototype.get_token()["token"])
+
+        for view, token in [(first, mocks.OAUTH1_VALID_TOKEN_DICT), (second, OTHER_OAUTH1_TOKEN)]:
+            consumer = mocks.MockOAuth1Provider(token=token, nonce="nonce", timestamp="1", **mocks.OAUTH1_CREDENTIALS)
+            self.assertEqual(consumer.prepare_request(consumer.profile_url), view.prepare_request(view.profile_url))
+
+    @mocks.patch_responses(mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_oauth2_views(self, responses):
+        refreshed = []
+        factory = ConsumerFactory(mocks.MockOAuth2Provider, **mocks.OAUTH2_CREDENTIALS)
+        first = factory(mocks.OAUTH2_VALID_TOKEN_DICT, refresh_token_callback=refreshed.append)
+        second = factory(OTHER_OAUTH2_TOKEN)
+        self.assertEqual(mocks.OAUTH2_VALID_TOKEN_DICT, first.get_token())
+        self.assertEqual(OTHER_OAUTH2_TOKEN, second.get_token())
+        self.assertEqual(refreshed.append, first.refresh_token_callback)
+        self.assertIsNone(second.refresh_token_callback)
+
+        second.request('https://example.org/profile')
+        self.assertEqual("Bearer AT2", responses.calls[0].request.headers["Authorization"])
+
+    def test_config_is_immutable(self):
+        factory = ConsumerFactory(mocks.MockOAuth2Provider, **mocks.OAUTH2_CREDENTIALS)
+        factory.config["client_id"] = "other"
+        self.assertEqual(("mockoauth2provider", "client_id"), factory.key)
+
+
+class FactoryRegistryTest(unittest.TestCase):
+
+    def test_get_factory(self):
+        registry = FactoryRegistry()
+        factory = registry.get_factory(mocks.MockOAuth2Provider, **mocks.OAUTH2_CREDENTIALS)
+        self.assertIs(factory, registry.get_factory(mocks.MockOAuth2Provider, **mocks.OAUTH2_CREDENTIALS))
+        self.assertIsNot(factory, registry.get_factory(mocks.MockOAuth2Provider, **dict(mocks.OAUTH2_CREDENTIALS, client_id="other")))
+
+        changed = registry.get_factory(mocks.MockOAuth2Provider, **dict(mocks.OAUTH2_CREDENTIALS, client_secret="rotated"))
+        self.assertIsNot(factory, changed)
+        self.assertIs(changed, registry.get_factory(mocks.MockOAuth2Provider, **dict(mocks.OAUTH2_CREDENTIALS, client_secret="rotated")))
+
+    def test_max_factories(self):
+        registry = FactoryRegistry(max_factories=2)
+        tenants = [dict(mocks.OAUTH2_CREDENTIALS, client_id="tenant{0}".format(i)) for i in range(3)]
+        first = registry.get_factory(mocks.MockOAuth2Provider, **tenants[0])
+        second = registry.get_factory(mocks.MockOAuth2Provider, **tenants[1])
+        registry.get_factory(mocks.MockOAuth2Provider, **tenants[0])
+        third = registry.get_factory(mocks.MockOAuth2Provider, **tenants[2])
+        self.assertEqual(2, len(registry))
+        self.assertIs(first, registry.get_factory(mocks.MockOAuth2Provider, **tenants[0]))
+        self.assertIs(third, registry.get_factory(mocks.MockOAuth2Provider, **tenants[2]))
+        self.assertIsNot(second, registry.get_factory(mocks.MockOAuth2Provider, **tenants[1]))
+        self.assertIs(first.prototype.get_session_pool(), third.prototype.get_session_pool())
+
+        registry.remove("mockoauth2provider", "tenant1")
+        registry.clear()
+        self.assertEqual(0, len(registry))
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import unittest
+import requests
+from mock import patch
+from uniauth.instrumentation import BaseObserver, StatsObserver, NULL_SPAN
+from uniauth.retry import RetryPolicy
+from . import mocks
+
+
+class RecordingObserver(BaseObserver):
+
+    def __init__(self):
+        self.started = []
+        self.finished = []
+
+    def stage_started(self, event):
+        self.started.append(event.stage)
+
+    def stage_finished(self, event):
+        self.finished.append(event)
+
+    def get(self, stage):
+        return [event for event in self.finished if event.stage == stage]
+
+
+class FailingObserver(BaseObserver):
+
+    def stage_started(self, event):
+        raise RuntimeError()
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def test_disabled(self):
+        provider = mocks.MockOAuth2Provider(**mocks.OAUTH2_CREDENTIALS)
+        self.assertIs(NULL_SPAN, provider.instrument("request"))
+
+    @patch('uniauth.oauth2.generate_token')
+    @mocks.patch_responses(mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1)
+    def test_oauth2_dance(self, generate_token, responses):
+        generate_token.return_value = "nonce"
+        observer = RecordingObserver()
+        provider = mocks.MockOAuth2Provider(observers=[observer], **mocks.OAUTH2_CREDENTIALS)
+        dance = provider.dance({}, 'https://example.org/callback')
+        dance.get_authorization_url()
+        dance.get_access_token('https://example.org/callback?code=code&state=nonce')
+        self.assertEqual(["authorization_url", "http", "access_token"], [event.stage for event in observer.finished])
+        self.assertEqual({"method": "POST", "url": "https://example.org/oauth/token", "status": 200}, observer.get("http")[0].info)
+        self.assertTrue(all(event.provider == "mockoauth2provider" and event.duration >= 0 for event in observer.finished))
+
+    @mocks.patch_responses(mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_get_profile(self, responses):
+        observer = RecordingObserver()
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, observers=[observer], **mocks.OAUTH2_CREDENTIALS)
+        provider.get_profile()
+        self.assertEqual(["profile", "request", "sign", "http", "normalize_profile"], observer.started)
+        self.assertEqual(["sign", "http", "request", "normalize_profile", "profile"], [event.stage for event in observer.finished])
+        self.assertEqual(200, observer.get("request")[0].info["status"])
+
+    @mocks.patch_responses(mocks.OAUTH1_REQUEST_TOKEN_RESPONSE_1, mocks.OAUTH1_REQUEST_RESPONSE)
+    def test_oauth1(self, responses):
+        observer = RecordingObserver()
+        provider = mocks.MockOAuth1Provider(observers=[observer], **mocks.OAUTH1_CREDENTIALS)
+        provider.dance({}, 'https://example.org/callback').get_authorization_url()
+        self.assertEqual(["sign", "http", "request_token", "authorization_url"], [event.stage for event in observer.finished])
+        # signed query strings are left out
+        self.assertEqual("https://example.org/oauth/request_token", observer.get("http")[0].info["url"])
+
+    @mocks.patch_responses(dict(mocks.OAUTH2_REQUEST_RESPONSE, status=503, body=""), mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_retries(self, responses):
+        stats = StatsObserver()
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, retry_policy=RetryPolicy(backoff_factor=0),
+                                            observers=[stats], **mocks.OAUTH2_CREDENTIALS)
+        provider.request('https://example.org/profile')
+        self.assertEqual(1, stats.get_stats()[("mockoauth2provider", "http")]["retries"])
+
+    @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE, mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_refresh(self, responses):
+        stats = StatsObserver()
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, observers=[stats], **mocks.OAUTH2_CREDENTIALS)
+        provider.request('https://example.org/profile')
+        refresh = stats.get_stats()[("mockoauth2provider", "refresh_token")]
+        self.assertEqual((1, 1, 0), (refresh["count"], refresh["refreshed"], refresh["errors"]))
+        # the expired token fails signing once before the refresh
+        self.assertEqual(2, stats.get_stats()[("mockoauth2provider", "request")]["count"])
+        self.assertEqual(1, stats.get_stats()[("mockoauth2provider", "request")]["errors"])
+
+    @mocks.patch_responses(dict(mocks.OAUTH2_REQUEST_RESPONSE, status=500, body=""))
+    def test_error(self, responses):
+        observer = RecordingObserver()
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, observers=[observer], **mocks.OAUTH2_CREDENTIALS)
+        with self.assertRaises(requests.HTTPError):
+            provider.get_profile()
+        self.assertEqual(500, observer.get("request")[0].info["status"])
+        self.assertIsInstance(observer.get("profile")[0].error, requests.HTTPError)
+
+    @mocks.patch_responses(mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_failing_observer(self, responses):
+        stats = StatsObserver()
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, observers=[FailingObserver(), stats], **mocks.OAUTH2_CREDENTIALS)
+        self.assertDictEqual(mocks.OAUTH2_GET_PROFILE_EXPECTED_RESULT, provider.get_profile())
+        self.assertEqual(1, stats.get_stats()[("mockoauth2provider", "profile")]["count"])
@@ -2,6 +2,7 @@
 from __future__ import unicode_literals, absolute_import, print_function
 
 import unittest
+from uniauth.oauth1 import RequestTokenPool
 from . import mocks
 
 
@@ -15,7 +16,7 @@ class OAuth1ProviderTest(unittest.TestCase):
 
     def test_get_token(self):
         provider = mocks.MockOAuth1Provider(token=mocks.OAUTH1_VALID_TOKEN_DICT, **mocks.OAUTH1_CREDENTIALS)
-        self.assertDictEqual(mocks.OAUTH1_VALID_TOKEN_DICT, provider.get_token())
+        self.assertEqual(mocks.OAUTH1_VALID_TOKEN_DICT, provider.get_token())
 
     @mocks.patch_responses(mocks.OAUTH1_REQUEST_TOKEN_RESPONSE_1)
     def test_get_request_token(self, responses):
@@ -52,4 +53,57 @@ class OAuth1ProviderTest(unittest.TestCase):
         authorization_url = dance.get_authorization_url()
         self.assertEqual(mocks.OAUTH1_GET_AUTHORIZATION_URL_EXPECTED_RESULT, authorization_url)
         token = dance.get_access_token('https://example.org/callback?oauth_verifier=verifier&oauth_token=token')
-        self.assertDictEqual(mocks.OAUTH1_ACCESS_TOKEN, token)
+        self.assertEqual(mocks.OAUTH1_ACCESS_TOKEN, token)
+
+
+class RequestTokenPoolTest(unittest.TestCase):
+
+    @mocks.patch_responses(mocks.OAUTH1_REQUEST_TOKEN_RESPONSE_1, mocks.OAUTH1_ACCESS_TOKEN_RESPONSE_1)
+    def test_prefetched_request_token(self, responses):
+        pool = RequestTokenPool(size=2)
+        provider = mocks.MockOAuth1Provider(request_token_pool=pool, **mocks.OAUTH1_CREDENTIALS)
+        pool.refill(provider, 'https://example.org/callback')
+        pool.wait()
+        self.assertEqual(2, pool.available(provider, 'https://example.org/callback'))
+        self.assertEqual(0, pool.available(provider, 'https://example.org/other'))
+
+        dance = provider.dance({}, 'https://example.org/callback')
+        self.assertEqual(mocks.OAUTH1_GET_AUTHORIZATION_URL_EXPECTED_RESULT, dance.get_authorization_url())
+        self.assertEqual(1, pool.available(provider, 'https://example.org/callback'))
+        pool.wait()
+        self.assertEqual(2, pool.available(provider, 'https://example.org/callback'))
+        self.assertEqual(3, len(responses.calls))
+        self.assertEqual(mocks.OAUTH1_ACCESS_TOKEN, dance.get_access_token('https://example.org/callback?oauth_verifier=verifier&oauth_token=token'))
+
+    @mocks.patch_responses(mocks.OAUTH1_REQUEST_TOKEN_RESPONSE_1)
+    def test_expired_request_tokens_discarded(self, responses):
+        pool = RequestTokenPool(size=1, max_age=0)
+        provider = mocks.MockOAuth1Provider(**mocks.OAUTH1_CREDENTIALS)
+        pool.refill(provider, 'https://example.org/callback')
+        pool.wait()
+        self.assertIsNone(pool.get(provider, 'https://example.org/callback'))
+        pool.wait()
+        self.assertEqual(2, len(responses.calls))
+
+    @mocks.patch_responses(mocks.OAUTH1_REQUEST_TOKEN_RESPONSE_1)
+    def test_configured_redirect_uris(self, responses):
+        pool = RequestTokenPool(size=1, redirect_uris=['https://example.org/callback'])
+        provider = mocks.MockOAuth1Provider(**mocks.OAUTH1_CREDENTIALS)
+        self.assertIsNone(pool.get(provider, 'https://example.org/callback?next=/account'))
+        pool.refill(provider, 'https://example.org/callback?next=/settings')
+        pool.wait()
+        self.assertEqual(0, len(responses.calls))
+        pool.refill(provider, 'https://example.org/callback')
+        pool.wait()
+        self.assertEqual(1, pool.available(provider, 'https://example.org/callback'))
+
+    @mocks.patch_responses(mocks.OAUTH1_REQUEST_TOKEN_RESPONSE_1)
+    def test_max_keys(self, responses):
+        pool = RequestTokenPool(size=1, max_keys=2)
+        provider = mocks.MockOAuth1Provider(**mocks.OAUTH1_CREDENTIALS)
+        for i in range(5):
+            pool.refill(provider, 'https://example.org/callback{0}'.format(i))
+        pool.wait()
+        self.assertEqual(2, len(pool._entries))
+        self.assertEqual(1, pool.available(provider, 'https://example.org/callback4'))
+        self.assertEqual(0, pool.available(provider, 'https://example.org/callback0'))
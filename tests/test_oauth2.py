@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals, absolute_import, print_function
 
+import datetime
 import unittest
-from oauthlib.oauth2.rfc6749.errors import TokenExpiredError
+from pytz import utc
+from oauthlib.common import urldecode
+from oauthlib.oauth2.rfc6749.errors import TokenExpiredError, MismatchingStateError, MissingCodeError, AccessDeniedError
+from six.moves.urllib.parse import urlparse, parse_qsl
 from mock import patch
+from uniauth.oauth2 import get_code_challenge
+from uniauth.signing import Signer
+from uniauth.state import StateSigner
 from . import mocks
 
 
@@ -17,7 +24,7 @@ class OAuth2ProviderTest(unittest.TestCase):
 
     def test_get_token(self):
         provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, **mocks.OAUTH2_CREDENTIALS)
-        self.assertDictEqual(mocks.OAUTH2_VALID_TOKEN_DICT, provider.get_token())
+        self.assertEqual(mocks.OAUTH2_VALID_TOKEN_DICT, provider.get_token())
 
     def test_get_authorization_url(self):
         provider = mocks.MockOAuth2Provider(**mocks.OAUTH2_CREDENTIALS)
@@ -28,7 +35,7 @@ class OAuth2ProviderTest(unittest.TestCase):
     def test_exchange_token_with_expires_at(self, responses):
         provider = mocks.MockOAuth2Provider(**mocks.OAUTH2_CREDENTIALS)
         token = provider.get_access_token('https://example.org/callback', 'nonce', 'https://example.org/callback?code=code&state=nonce')
-        self.assertDictEqual(mocks.OAUTH2_EXCHANGE_TOKEN_EXPECTED_RESULT, token)
+        self.assertEqual(mocks.OAUTH2_EXCHANGE_TOKEN_EXPECTED_RESULT, token)
 
         request = responses.calls[0].request
         self.assertEqual(responses.POST, request.method)
@@ -38,19 +45,21 @@ class OAuth2ProviderTest(unittest.TestCase):
     @mocks.patch_responses(mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_2)
     def test_exchange_token_with_expires_in(self, responses):
         provider = mocks.MockOAuth2Provider(**mocks.OAUTH2_CREDENTIALS)
+        requested_at = datetime.datetime.utcnow().replace(tzinfo=utc)
         token = provider.get_access_token('https://example.org/callback', 'nonce', 'https://example.org/callback?code=code&state=nonce')
         expected = mocks.OAUTH2_EXCHANGE_TOKEN_EXPECTED_RESULT.copy()
+        token = dict(token)
         token_expires_at = token.pop('expires_at')
-        expected_expires_at = expected.pop('expires_at')
+        expected.pop('expires_at')
         self.assertDictEqual(expected, token)
-        # delta less than 5 seconds (very large epsilon)
-        self.assertLess((token_expires_at - expected_expires_at).total_seconds(), 5)
+        # expires_in is relative to the exchange, not to when the fixtures were built (delta less than 5 seconds)
+        self.assertLess(abs((token_expires_at - (requested_at + mocks.TIMEDELTA)).total_seconds()), 5)
 
     @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE)
     def test_refresh_token(self, responses):
         provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, **mocks.OAUTH2_CREDENTIALS)
         token = provider.refresh_token()
-        self.assertDictEqual(mocks.OAUTH2_REFRESH_TOKEN_EXPECTED_RESULT, token)
+        self.assertEqual(mocks.OAUTH2_REFRESH_TOKEN_EXPECTED_RESULT, token)
 
         request = responses.calls[0].request
         self.assertEqual(mocks.OAUTH2_REFRESH_TOKEN_EXPECTED_CONTENT_TYPE, request.headers['content-type'])
@@ -67,7 +76,7 @@ class OAuth2ProviderTest(unittest.TestCase):
 
     @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE, mocks.OAUTH2_REQUEST_RESPONSE)
     def test_request_refreshes_expired_token(self, responses):
-        test_token = lambda token: self.assertDictEqual(mocks.OAUTH2_VALID_TOKEN_DICT, token)
+        test_token = lambda token: self.assertEqual(mocks.OAUTH2_VALID_TOKEN_DICT, token)
         provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, refresh_token_callback=test_token, **mocks.OAUTH2_CREDENTIALS)
         response = provider.request('https://example.org/profile')
         self.assertDictEqual(mocks.OAUTH2_REQUEST_EXPECTED_RESULT, response.json())
@@ -79,7 +88,7 @@ class OAuth2ProviderTest(unittest.TestCase):
 
     @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE, mocks.OAUTH2_REQUEST_RESPONSE)
     def test_request_refresh_callback_via_arg(self, responses):
-        test_token = lambda token: self.assertDictEqual(mocks.OAUTH2_VALID_TOKEN_DICT, token)
+        test_token = lambda token: self.assertEqual(mocks.OAUTH2_VALID_TOKEN_DICT, token)
         provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, **mocks.OAUTH2_CREDENTIALS)
         response = provider.request('https://example.org/profile', refresh_token_callback=test_token)
         self.assertDictEqual(mocks.OAUTH2_REQUEST_EXPECTED_RESULT, response.json())
@@ -98,4 +107,42 @@ class OAuth2ProviderTest(unittest.TestCase):
         authorization_url = dance.get_authorization_url()
         self.assertEqual(mocks.OAUTH2_GET_AUTHORIZATION_URL_EXPECTED_RESULT, authorization_url)
         token = dance.get_access_token('https://example.org/callback?code=code&state=nonce')
-        self.assertDictEqual(mocks.OAUTH2_EXCHANGE_TOKEN_EXPECTED_RESULT, token)
+        self.assertEqual(mocks.OAUTH2_EXCHANGE_TOKEN_EXPECTED_RESULT, token)
+
+    def test_prepare_access_token_request_errors(self):
+        provider = mocks.MockOAuth2Provider(**mocks.OAUTH2_CREDENTIALS)
+        with self.assertRaises(AccessDeniedError):
+            provider.prepare_access_token_request('https://example.org/callback', 'nonce', 'https://example.org/callback?error=access_denied&state=nonce')
+        with self.assertRaises(MismatchingStateError):
+            provider.prepare_access_token_request('https://example.org/callback', 'nonce', 'https://example.org/callback?code=code&state=other')
+        with self.assertRaises(MissingCodeError):
+            provider.prepare_access_token_request('https://example.org/callback', 'nonce', 'https://example.org/callback?state=nonce')
+
+    @mocks.patch_responses(mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1)
+    def test_pkce_dance(self, responses):
+        stash = {}
+        provider = mocks.MockOAuth2Provider(pkce=True, **mocks.OAUTH2_CREDENTIALS)
+        query = dict(parse_qsl(urlparse(provider.dance(stash, 'https://example.org/callback').get_authorization_url()).query))
+        code_verifier = stash['oauth2_code_verifier_mockoauth2provider']
+        self.assertEqual(("S256", get_code_challenge(code_verifier)), (query["code_challenge_method"], query["code_challenge"]))
+        self.assertGreaterEqual(len(code_verifier), 43)
+
+        token = provider.dance(stash, 'https://example.org/callback').get_access_token('https://example.org/callback?code=code&state=' + query["state"])
+        self.assertEqual(mocks.OAUTH2_EXCHANGE_TOKEN_EXPECTED_RESULT, token)
+        self.assertEqual(code_verifier, dict(urldecode(responses.calls[0].request.body))["code_verifier"])
+        self.assertEqual({}, stash)
+
+    @mocks.patch_responses(mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1)
+    def test_stateless_pkce_public_client(self, responses):
+        state_signer = StateSigner(Signer("secret"))
+        provider = mocks.MockOAuth2Provider(client_id="client_id", client_secret=None, scope=None, pkce=True, state_signer=state_signer)
+        dance = provider.dance(None, 'https://example.org/callback')
+        query = dict(parse_qsl(urlparse(dance.get_authorization_url()).query))
+        provider.dance(None, 'https://example.org/callback', dance.binding).get_access_token('https://example.org/callback?code=code&state=' + query["state"])
+        body = dict(urldecode(responses.calls[0].request.body))
+        self.assertEqual(query["code_challenge"], get_code_challenge(body["code_verifier"]))
+        self.assertNotIn("client_secret", body)
+        self.assertEqual(state_signer.get_code_verifier(dance.binding), body["code_verifier"])
+        self.assertNotEqual(state_signer.get_code_verifier(query["state"]), body["code_verifier"])
+        self.assertNotIn(body["code_verifier"], query["state"])
+        self.assertNotEqual(dance.binding, body["code_verifier"])
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import json
+import unittest
+from six.moves.urllib.parse import urlparse, parse_qsl
+from uniauth.pagination import LinkHeaderPaginator, GraphPaginator, PageTokenPaginator
+from . import mocks
+
+PAGES = 3
+PER_PAGE = 2
+REPOS_URL = "https://example.org/repos"
+
+
+def query(url):
+    return dict(parse_qsl(urlparse(url).query))
+
+
+def link_page(request):
+    page = int(query(request.url).get("page", 1))
+    headers = {"Content-Type": "application/json"}
+    if page < PAGES:
+        headers["Link"] = '<{0}?page={1}>; rel="next", <{0}?page={2}>; rel="last"'.format(REPOS_URL, page + 1, PAGES)
+    return 200, headers, json.dumps([{"id": page * 10 + i} for i in range(PER_PAGE)])
+
+
+def graph_page(request):
+    after = int(query(request.url).get("after", 1))
+    data = [{"id": after * 10 + i} for i in range(PER_PAGE)] if after <= PAGES else []
+    next_url = "{0}?access_token=old&limit={1}&after={2}".format(REPOS_URL, PER_PAGE, after + 1)
+    return 200, {}, json.dumps({"data": data, "paging": {"next": next_url}})
+
+
+def token_page(request):
+    page = int(query(request.url).get("pageToken", 1))
+    data = {"items": [{"id": page * 10 + i} for i in range(PER_PAGE)]}
+    if page < PAGES:
+        data["nextPageToken"] = str(page + 1)
+    return 200, {}, json.dumps(data)
+
+
+EXPECTED_IDS = [page * 10 + i for page in range(1, PAGES + 1) for i in range(PER_PAGE)]
+
+
+class PaginateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, **mocks.OAUTH2_CREDENTIALS)
+
+    @mocks.patch_responses()
+    def test_link_header(self, responses):
+        responses.add_callback(responses.GET, REPOS_URL, callback=link_page)
+        self.assertEqual(EXPECTED_IDS, [repo["id"] for repo in self.provider.paginate(REPOS_URL)])
+        self.assertEqual(EXPECTED_IDS, [repo["id"] for repo in self.provider.paginate(REPOS_URL, prefetch=False)])
+
+    @mocks.patch_responses()
+    def test_graph(self, responses):
+        responses.add_callback(responses.GET, REPOS_URL, callback=graph_page)
+        self.assertEqual(EXPECTED_IDS, [item["id"] for item in self.provider.paginate(REPOS_URL, paginator=GraphPaginator())])
+        self.assertTrue(all("access_token=old" not in call.request.url for call in responses.calls))
+
+    @mocks.patch_responses()
+    def test_page_token(self, responses):
+        responses.add_callback(responses.GET, REPOS_URL, callback=token_page)
+        items = self.provider.paginate(REPOS_URL, params={"maxResults": PER_PAGE}, paginator=PageTokenPaginator())
+        self.assertEqual(EXPECTED_IDS, [item["id"] for item in items])
+        self.assertTrue(all(query(call.request.url)["maxResults"] == "2" for call in responses.calls))
+
+    @mocks.patch_responses()
+    def test_prefetches_one_page(self, responses):
+        responses.add_callback(responses.GET, REPOS_URL, callback=link_page)
+        items = self.provider.paginate(REPOS_URL)
+        for _ in range(PER_PAGE + 1):
+            next(items)
+        self.assertLessEqual(len(responses.calls), 3)
+        self.assertEqual(PAGES * PER_PAGE - PER_PAGE - 1, len(list(items)))
+
+    @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE)
+    def test_token_refreshed_during_walk(self, responses):
+        def expiring_page(request):
+            if query(request.url).get("page") == "2":
+                self.provider.set_token(mocks.OAUTH2_EXPIRED_TOKEN_DICT)
+            return link_page(request)
+
+        responses.add_callback(responses.GET, REPOS_URL, callback=expiring_page)
+        self.assertEqual(EXPECTED_IDS, [repo["id"] for repo in self.provider.paginate(REPOS_URL, prefetch=False)])
+        self.assertEqual(1, len([call for call in responses.calls if call.request.url == mocks.OAUTH2_REFRESH_TOKEN_RESPONSE["url"]]))
+
+
+class PaginatorTest(unittest.TestCase):
+
+    def test_link_header_items(self):
+        self.assertEqual([1], LinkHeaderPaginator().get_items([1]))
+        self.assertEqual([1], LinkHeaderPaginator(items_key="items").get_items({"items": [1]}))
@@ -2,13 +2,33 @@
 from __future__ import unicode_literals, absolute_import, print_function
 
 import six
+import json
+import mock
 import unittest
+import requests
 
 from uniauth import Google, Facebook, LinkedIn, GitHub, Bitbucket
+from uniauth.consumers import GraphBatch, GraphBatchError
 
 from . import mocks
 
 
+class FakeResponse(object):
+
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    @property
+    def content(self):
+        return json.dumps(self.data).encode("utf-8")
+
+    def json(self):
+        return self.data
+
+
 class GoogleTest(unittest.TestCase):
 
     def setUp(self):
@@ -32,7 +52,83 @@ class FacebookTest(unittest.TestCase):
         self.assertEqual('Facebook', self.provider.verbose_name)
         self.assertEqual('Facebook', six.text_type(self.provider))
 
-    # Add more
+    @mocks.patch_responses(mocks.FACEBOOK_BATCH_RESPONSE)
+    def test_get_profiles(self, responses):
+        tokens = [{"token": "user1"}, {"token": "user2"}, {"token": "user3"}]
+        results = self.provider.get_profiles(tokens)
+
+        self.assertEqual(tokens, [result.token for result in results])
+        self.assertEqual(mocks.FACEBOOK_GET_PROFILE_EXPECTED_RESULT, results[0].profile)
+        self.assertIsInstance(results[1].error, GraphBatchError)
+        self.assertEqual(400, results[1].error.status)
+        self.assertIsInstance(results[2].error, GraphBatchError)
+
+        self.assertEqual(1, len(responses.calls))
+        body = six.moves.urllib.parse.parse_qs(responses.calls[0].request.body)
+        self.assertEqual(["client_id|client_secret"], body["access_token"])
+        self.assertEqual([{"method": "GET", "relative_url": "me?access_token=user1"},
+                          {"method": "GET", "relative_url": "me?access_token=user2"},
+                          {"method": "GET", "relative_url": "me?access_token=user3"}], json.loads(body["batch"][0]))
+
+    def test_batch_chunks(self):
+        batch = GraphBatch(self.provider)
+        for i in range(120):
+            batch.add("me/friends", params={"limit": 10})
+        self.assertEqual(120, len(batch))
+
+        sent = []
+
+        def http_request(method, url, data):
+            sent.append(json.loads(data["batch"]))
+            return FakeResponse([{"code": 200, "body": "{}"}] * len(sent[-1]))
+
+        self.provider.http_request = http_request
+        results = batch.execute()
+        self.assertEqual([50, 50, 20], [len(chunk) for chunk in sent])
+        self.assertEqual("me/friends?limit=10", sent[0][0]["relative_url"])
+        self.assertEqual(120, len(results))
+        self.assertEqual(0, len(batch))
+
+    def test_batch_chunk_errors(self):
+        batch = GraphBatch(self.provider)
+        for i in range(120):
+            batch.add("me/friends")
+        error = requests.HTTPError("500 Server Error", response=mock.Mock(status_code=500))
+
+        def http_request(method, url, data):
+            chunk = json.loads(data["batch"])
+            if len(chunk) == 50 and not getattr(http_request, "failed", False):
+                http_request.failed = True
+                return mock.Mock(raise_for_status=mock.Mock(side_effect=error))
+            return FakeResponse([{"code": 200, "body": "{}"}] * (len(chunk) - 1))
+
+        self.provider.http_request = http_request
+        results = batch.execute()
+        self.assertEqual(120, len(results))
+        self.assertEqual([(500, error)] * 50, [(result.status, result.error) for result in results[:50]])
+        self.assertTrue(all(result.ok for result in results[50:99]))
+        self.assertIsInstance(results[99].error, GraphBatchError)
+        self.assertTrue(all(result.ok for result in results[100:119]))
+        self.assertFalse(results[119].ok)
+
+    @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE, mocks.FACEBOOK_BATCH_RESPONSE)
+    def test_batch_sent_with_consumer_token(self, responses):
+        provider = Facebook(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, **mocks.OAUTH2_CREDENTIALS)
+        provider.access_token_url = "https://example.org/oauth/token"
+        batch = provider.batch()
+        batch.add("me")
+        self.assertTrue(batch.execute()[0].ok)
+        self.assertEqual(2, len(responses.calls))
+        request = responses.calls[1].request
+        self.assertEqual("Bearer AT", request.headers["Authorization"])
+        self.assertNotIn("access_token", six.moves.urllib.parse.parse_qs(request.body))
+
+    def test_batch_post_params_in_body(self):
+        batch = GraphBatch(self.provider)
+        batch.add("me/feed", method="POST", token={"token": "user1"}, params={"message": "hello"})
+        request, _ = batch._requests[0]
+        self.assertEqual("me/feed", request["relative_url"])
+        self.assertEqual(mocks.QueryString("message=hello&access_token=user1"), request["body"])
 
 
 class LinkedInTest(unittest.TestCase):
@@ -71,4 +167,13 @@ class BitbucketTest(unittest.TestCase):
         self.assertEqual('Bitbucket', self.provider.verbose_name)
         self.assertEqual('Bitbucket', six.text_type(self.provider))
 
-    # Add more
+    @mocks.patch_responses(mocks.BITBUCKET_USER_RESPONSE, mocks.BITBUCKET_EMAILS_RESPONSE)
+    def test_get_profile(self, responses):
+        provider = Bitbucket(token=mocks.OAUTH1_VALID_TOKEN_DICT, **mocks.OAUTH1_CREDENTIALS)
+        self.assertDictEqual(mocks.BITBUCKET_GET_PROFILE_EXPECTED_RESULT, provider.get_profile())
+        self.assertEqual(2, len(responses.calls))
+
+    def test_normalize_profile_data_without_io(self):
+        data = {"user": {"username": "jcarter"}}
+        self.assertIsNone(self.provider.normalize_profile_data(data)["email"])
+        self.assertEqual("a@example.org", self.provider.normalize_profile_data(data, emails=[{"email": "a@example.org", "primary": True}])["email"])
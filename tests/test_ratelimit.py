@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import unittest
+from uniauth.ratelimit import RateLimiter, RateLimitExceeded, TokenBucket, FAIL
+from uniauth.sessions import build_response
+from . import mocks
+
+KEY = ("mockoauth2provider", None)
+RESET = int(time.time()) + 3600
+
+
+def response(status=200, **headers):
+    return build_response("https://example.org/profile", status, "", list(headers.items()), b"")
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_local_rate(self):
+        bucket = TokenBucket(rate=2, capacity=2, now=0)
+        for _ in range(2):
+            self.assertEqual(0, bucket.delay(0))
+            bucket.consume()
+        self.assertAlmostEqual(0.5, bucket.delay(0))
+        self.assertEqual(0, bucket.delay(0.5))
+
+    def test_remaining_exhausted_until_reset(self):
+        bucket = TokenBucket(now=0)
+        bucket.update(0, remaining=1, limit=60, reset_at=100)
+        self.assertEqual(0, bucket.delay(1))
+        bucket.consume()
+        self.assertEqual(99, bucket.delay(1))
+        self.assertEqual(0, bucket.delay(100))
+
+    def test_retry_after(self):
+        bucket = TokenBucket(now=0)
+        bucket.update(0, retry_after=30)
+        self.assertEqual(20, bucket.delay(10))
+        self.assertEqual(0, bucket.delay(30))
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_github_headers(self):
+        limiter = RateLimiter()
+        reset = int(time.time()) + 60
+        limiter.update(KEY, response(**{"X-RateLimit-Remaining": "0", "X-RateLimit-Limit": "5000", "X-RateLimit-Reset": str(reset)}))
+        budget = limiter.budget(KEY)
+        self.assertEqual((0, 5000, reset), budget[:3])
+        self.assertGreater(budget.delay, 50)
+
+    def test_retry_after_date(self):
+        limiter = RateLimiter()
+        limiter.update(KEY, response(429, **{"Retry-After": time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 120))}))
+        self.assertGreater(limiter.budget(KEY).delay, 100)
+
+    def test_429_without_headers(self):
+        limiter = RateLimiter(default_retry_after=5)
+        limiter.update(KEY, response(429))
+        self.assertGreater(limiter.budget(KEY).delay, 4)
+
+    def test_fail_fast(self):
+        limiter = RateLimiter(mode=FAIL)
+        limiter.update(KEY, response(**{"Retry-After": "10"}))
+        with self.assertRaises(RateLimitExceeded) as context:
+            limiter.acquire(KEY)
+        self.assertGreater(context.exception.retry_after, 9)
+
+    def test_max_wait(self):
+        limiter = RateLimiter(max_wait=1)
+        limiter.update(KEY, response(**{"Retry-After": "10"}))
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire(KEY)
+
+    def test_block(self):
+        limiter = RateLimiter(rate=100, capacity=1)
+        start = time.time()
+        for _ in range(3):
+            limiter.acquire(KEY)
+        self.assertGreaterEqual(time.time() - start, 0.015)
+
+    def test_keys(self):
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, **mocks.OAUTH2_CREDENTIALS)
+        other = mocks.MockOAuth2Provider(token=dict(mocks.OAUTH2_VALID_TOKEN_DICT, token="other"), **mocks.OAUTH2_CREDENTIALS)
+        self.assertNotEqual(RateLimiter().get_key(provider), RateLimiter().get_key(other))
+        self.assertEqual(RateLimiter(per_token=False).get_key(provider), RateLimiter(per_token=False).get_key(other))
+
+
+class ConsumerRateLimitTest(unittest.TestCase):
+
+    @mocks.patch_responses(dict(mocks.OAUTH2_REQUEST_RESPONSE, adding_headers={"X-RateLimit-Remaining": "1", "X-RateLimit-Limit": "60", "X-RateLimit-Reset": str(RESET)}),
+                           dict(mocks.OAUTH2_REQUEST_RESPONSE, adding_headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Limit": "60", "X-RateLimit-Reset": str(RESET)}))
+    def test_request_follows_headers(self, responses):
+        limiter = RateLimiter(mode=FAIL)
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, rate_limiter=limiter, **mocks.OAUTH2_CREDENTIALS)
+        provider.request('https://example.org/profile')
+        self.assertEqual(1, provider.get_rate_limit_budget().remaining)
+        provider.request('https://example.org/profile')
+        self.assertEqual(0, provider.get_rate_limit_budget().remaining)
+        with self.assertRaises(RateLimitExceeded):
+            provider.request('https://example.org/profile')
+        self.assertEqual(2, len(responses.calls))
+
+    @mocks.patch_responses(dict(mocks.OAUTH1_REQUEST_RESPONSE, adding_headers={"Retry-After": "60"}))
+    def test_oauth1_fail_fast_per_call(self, responses):
+        provider = mocks.MockOAuth1Provider(token=mocks.OAUTH1_VALID_TOKEN_DICT, rate_limiter=RateLimiter(), **mocks.OAUTH1_CREDENTIALS)
+        provider.request('https://example.org/profile')
+        with self.assertRaises(RateLimitExceeded):
+            provider.request('https://example.org/profile', rate_limit_mode=FAIL)
+
+    def test_no_budget_without_limiter(self):
+        self.assertIsNone(mocks.MockOAuth2Provider(**mocks.OAUTH2_CREDENTIALS).get_rate_limit_budget())
+
+    def test_max_keys(self):
+        limiter = RateLimiter(rate=1, capacity=1, mode=FAIL, max_keys=2)
+        for key in ["token1", "token2", "token3"]:
+            limiter.acquire(("github", key))
+        self.assertEqual(2, len(limiter._buckets))
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire(("github", "token3"))
+        limiter.acquire(("github", "token1"))
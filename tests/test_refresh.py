@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import threading
+import unittest
+import mock
+from uniauth.refresh import RefreshCoordinator, BaseLockBackend, RefreshTimeout, RefreshScheduler
+from . import mocks
+
+
+class MemoryLockBackend(BaseLockBackend):
+
+    def __init__(self):
+        self.locks = {}
+        self.results = {}
+
+    def acquire(self, key, timeout):
+        return self.locks.setdefault(key, threading.Lock()).acquire(True, timeout)
+
+    def release(self, key):
+        self.locks[key].release()
+
+    def get_result(self, key):
+        return self.results.get(key)
+
+    def set_result(self, key, token, ttl):
+        self.results[key] = token
+
+
+class RefreshCoordinatorTest(unittest.TestCase):
+
+    def run_concurrently(self, coordinator, func, count=10):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(coordinator.refresh("key", func))) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def slow_refresh(self, calls):
+        def refresh():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"token": "new"}
+        return refresh
+
+    def test_single_flight(self):
+        calls = []
+        results = self.run_concurrently(RefreshCoordinator(), self.slow_refresh(calls))
+        self.assertEqual(1, len(calls))
+        self.assertEqual([{"token": "new"}] * 10, [token for token, _ in results])
+        self.assertEqual(1, len([refreshed for _, refreshed in results if refreshed]))
+
+    def test_error_shared_with_waiters(self):
+        coordinator = RefreshCoordinator()
+        errors = []
+
+        def refresh():
+            time.sleep(0.1)
+            raise ValueError("invalid_grant")
+
+        def call():
+            try:
+                coordinator.refresh("key", refresh)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(5, len(errors))
+        self.assertEqual({}, coordinator._flights)
+
+    def test_waiter_timeout(self):
+        coordinator = RefreshCoordinator(timeout=0.01)
+        started = threading.Event()
+
+        def refresh():
+            started.set()
+            time.sleep(0.2)
+
+        thread = threading.Thread(target=coordinator.refresh, args=("key", refresh))
+        thread.start()
+        started.wait()
+        with self.assertRaises(RefreshTimeout):
+            coordinator.refresh("key", refresh)
+        thread.join()
+
+    def test_backend_result_reused(self):
+        backend = MemoryLockBackend()
+        calls = []
+        RefreshCoordinator(backend=backend).refresh("key", self.slow_refresh(calls))
+        token, refreshed = RefreshCoordinator(backend=backend).refresh("key", self.slow_refresh(calls))
+        self.assertEqual(1, len(calls))
+        self.assertEqual({"token": "new"}, token)
+        self.assertFalse(refreshed)
+
+    def test_result_reused_after_refresh(self):
+        calls = []
+        coordinator = RefreshCoordinator(result_ttl=0.05)
+        self.assertEqual(({"token": "new"}, True), coordinator.refresh("key", self.slow_refresh(calls)))
+        self.assertEqual(({"token": "new"}, False), coordinator.refresh("key", self.slow_refresh(calls)))
+        time.sleep(0.05)
+        self.assertEqual(({"token": "new"}, True), coordinator.refresh("key", self.slow_refresh(calls)))
+        self.assertEqual(2, len(calls))
+
+    def test_key(self):
+        self.assertEqual(RefreshCoordinator.get_key("google", "RT"), RefreshCoordinator.get_key("google", "RT"))
+        self.assertNotEqual(RefreshCoordinator.get_key("google", "RT"), RefreshCoordinator.get_key("github", "RT"))
+        self.assertNotIn("RT", RefreshCoordinator.get_key("google", "RT"))
+
+
+class ConsumerRefreshTest(unittest.TestCase):
+
+    @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE, mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_concurrent_requests_refresh_once(self, responses):
+        refreshed = []
+        coordinator = RefreshCoordinator()
+        providers = [mocks.MockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, refresh_token_callback=refreshed.append,
+                                              refresh_coordinator=coordinator, **mocks.OAUTH2_CREDENTIALS) for _ in range(10)]
+        original = coordinator._refresh
+
+        def slow_refresh(key, func):
+            time.sleep(0.1)
+            return original(key, func)
+
+        coordinator._refresh = slow_refresh
+        threads = [threading.Thread(target=provider.request, args=('https://example.org/profile',)) for provider in providers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([mocks.OAUTH2_VALID_TOKEN_DICT], refreshed)
+        self.assertEqual(1, len([call for call in responses.calls if call.request.url == 'https://example.org/oauth/token']))
+        for provider in providers:
+            self.assertEqual(mocks.OAUTH2_VALID_TOKEN_DICT, provider.get_token())
+
+    @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE, mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_sequential_requests_refresh_once(self, responses):
+        refreshed = []
+        for _ in range(2):
+            provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, refresh_token_callback=refreshed.append,
+                                                **mocks.OAUTH2_CREDENTIALS)
+            provider.request('https://example.org/profile')
+            self.assertEqual(mocks.OAUTH2_VALID_TOKEN_DICT, provider.get_token())
+        self.assertEqual([mocks.OAUTH2_VALID_TOKEN_DICT], refreshed)
+        self.assertEqual(1, len([call for call in responses.calls if call.request.url == 'https://example.org/oauth/token']))
+
+    def test_set_token(self):
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, **mocks.OAUTH2_CREDENTIALS)
+        provider.set_token(mocks.OAUTH2_VALID_TOKEN_DICT)
+        self.assertEqual(mocks.OAUTH2_VALID_TOKEN_DICT, provider.get_token())
+
+
+class FakeConsumer(object):
+
+    name = "fake"
+    refresh_token_callback = None
+
+    def __init__(self, expires_at=None, fail=False):
+        self.expires_at = expires_at
+        self.fail = fail
+        self.refreshed = threading.Event()
+        self.calls = 0
+
+    def refresh_token_once(self, callback=None):
+        self.calls += 1
+        self.refreshed.set()
+        if self.fail:
+            raise ValueError("temporarily unavailable")
+
+    def get_token_expiry(self):
+        return self.expires_at
+
+
+class RefreshSchedulerTest(unittest.TestCase):
+
+    def test_refresh_when_due(self):
+        scheduler = RefreshScheduler(workers=1)
+        consumer = FakeConsumer()
+        scheduler.schedule(consumer, time.time() + 0.05)
+        self.assertFalse(consumer.refreshed.is_set())
+        self.assertTrue(consumer.refreshed.wait(2))
+
+    def test_reschedule_replaces(self):
+        scheduler = RefreshScheduler(workers=1)
+        consumer = FakeConsumer()
+        scheduler.schedule(consumer, time.time() + 0.05)
+        scheduler.schedule(consumer, time.time() + 60)
+        self.assertFalse(consumer.refreshed.wait(0.2))
+
+    def test_cancel(self):
+        scheduler = RefreshScheduler(workers=1)
+        consumer = FakeConsumer()
+        scheduler.schedule(consumer, time.time() + 0.05)
+        scheduler.cancel(consumer)
+        self.assertFalse(consumer.refreshed.wait(0.2))
+
+    def test_retry_failed_refresh_before_expiry(self):
+        scheduler = RefreshScheduler(workers=1, retry_delay=0.05)
+        consumer = FakeConsumer(expires_at=time.time() + 60, fail=True)
+        scheduler.schedule(consumer, time.time())
+        self.assertTrue(consumer.refreshed.wait(2))
+        time.sleep(0.3)
+        self.assertGreater(consumer.calls, 1)
+        scheduler.cancel(consumer)
+
+    def test_no_retry_after_expiry(self):
+        scheduler = RefreshScheduler(workers=1, retry_delay=60)
+        consumer = FakeConsumer(expires_at=time.time() + 1, fail=True)
+        scheduler.schedule(consumer, time.time())
+        self.assertTrue(consumer.refreshed.wait(2))
+        time.sleep(0.1)
+        self.assertEqual({}, scheduler._due)
+
+
+class ConsumerRefreshAheadTest(unittest.TestCase):
+
+    def test_not_scheduled_by_default(self):
+        scheduler = mock.Mock()
+        mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, refresh_scheduler=scheduler, **mocks.OAUTH2_CREDENTIALS)
+        self.assertFalse(scheduler.schedule.called)
+
+    def test_scheduled_before_expiry(self):
+        scheduler = mock.Mock()
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, refresh_ahead=300, refresh_scheduler=scheduler, **mocks.OAUTH2_CREDENTIALS)
+        scheduler.schedule.assert_called_once_with(provider, mocks.FUTURE_TIMESTAMP - 300)
+
+    @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE)
+    def test_rescheduled_after_refresh(self, responses):
+        scheduler = mock.Mock()
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, refresh_ahead=300, refresh_scheduler=scheduler, **mocks.OAUTH2_CREDENTIALS)
+        scheduler.reset_mock()
+        provider.refresh_token()
+        scheduler.schedule.assert_called_once_with(provider, mocks.FUTURE_TIMESTAMP - 300)
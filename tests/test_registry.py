@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import sys
+import unittest
+import subprocess
+import uniauth
+from uniauth import consumers
+from uniauth.registry import ConsumerRegistry, default_registry, get_consumer
+from . import mocks
+
+
+class ConsumerRegistryTest(unittest.TestCase):
+
+    def test_builtin_consumers(self):
+        self.assertEqual(["bitbucket", "facebook", "github", "google", "linkedin"], default_registry.names())
+        for name in default_registry.names():
+            self.assertEqual(name, get_consumer(name).name)
+        self.assertIs(consumers.GitHub, get_consumer("github"))
+        with self.assertRaises(KeyError):
+            get_consumer("unknown")
+
+    def test_register(self):
+        registry = ConsumerRegistry()
+        registry.register(mocks.MockOAuth2Provider)
+        registry.register("tests.mocks:MockOAuth1Provider", name="oauth1")
+        self.assertEqual(["mockoauth2provider", "oauth1"], registry.names())
+        self.assertIs(mocks.MockOAuth2Provider, registry.get("mockoauth2provider"))
+        self.assertIs(mocks.MockOAuth1Provider, registry.get("oauth1"))
+        with self.assertRaises(ValueError):
+            registry.register("tests.mocks:MockOAuth1Provider")
+
+    @unittest.skipUnless(sys.version_info >= (3, 7), "lazy module attributes require Python 3.7+")
+    def test_lazy_import(self):
+        self.assertIs(consumers.Google, uniauth.Google)
+        with self.assertRaises(AttributeError):
+            uniauth.Unknown
+        statement = "import sys, uniauth; print(sorted(set(['requests', 'oauthlib', 'uniauth.consumers']) & set(sys.modules)))"
+        self.assertEqual("[]", subprocess.check_output([sys.executable, "-c", statement]).decode("utf-8").strip())
+
+    def test_protocol_stack_imported_on_use(self):
+        statement = ("import sys, uniauth; uniauth.get_consumer({0!r}); "
+                     "print(sorted(set(['oauthlib.oauth1', 'oauthlib.oauth2', 'uniauth.consumers']) & set(sys.modules)))")
+        for name, expected in [("github", "['oauthlib.oauth2']"), ("bitbucket", "['oauthlib.oauth1']")]:
+            output = subprocess.check_output([sys.executable, "-c", statement.format(str(name))]).decode("utf-8").strip()
+            self.assertEqual(expected, output)
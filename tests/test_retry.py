@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import unittest
+import requests
+from requests.packages.urllib3.exceptions import NewConnectionError
+from uniauth.retry import RetryPolicy
+from uniauth.sessions import SessionPool, build_response
+from . import mocks
+
+CONNECTION_REFUSED = requests.ConnectionError(NewConnectionError(None, "Connection refused"))
+READ_TIMEOUT = requests.ReadTimeout("Read timed out")
+
+
+def response(status, **headers):
+    return build_response("https://example.org/profile", status, "", list(headers.items()), b"")
+
+
+def unavailable(mock_response, status=503):
+    return dict(mock_response, status=status, body="")
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_backoff(self):
+        state = RetryPolicy(total=5, backoff_factor=0.5, max_backoff=2, jitter=False).start("GET")
+        self.assertEqual([0.5, 1, 2, 2, 2, None], [state.next(response=response(503)) for _ in range(6)])
+
+    def test_jitter(self):
+        policy = RetryPolicy(backoff_factor=1)
+        for _ in range(20):
+            self.assertTrue(0 <= policy.get_backoff(3) <= 4)
+
+    def test_retry_after(self):
+        policy = RetryPolicy(jitter=False, max_backoff=30)
+        self.assertEqual(10, policy.start("GET").next(response=response(429, **{"Retry-After": "10"})))
+        self.assertIsNone(policy.start("GET").next(response=response(429, **{"Retry-After": "60"})))
+
+    def test_idempotent(self):
+        state = RetryPolicy().start("GET")
+        self.assertIsNotNone(state.next(response=response(502)))
+        self.assertIsNotNone(state.next(error=READ_TIMEOUT))
+        self.assertIsNone(state.next(response=response(400)))
+        self.assertIsNone(state.next(error=ValueError()))
+
+    def test_non_idempotent_only_retried_when_not_sent(self):
+        policy = RetryPolicy()
+        self.assertIsNone(policy.start("POST").next(response=response(502)))
+        self.assertIsNone(policy.start("POST").next(error=READ_TIMEOUT))
+        self.assertIsNotNone(policy.start("POST").next(error=CONNECTION_REFUSED))
+        self.assertIsNotNone(policy.start("POST").next(error=requests.ConnectTimeout()))
+        self.assertIsNotNone(policy.start("POST", idempotent=True).next(response=response(502)))
+        self.assertIsNone(policy.start("GET", idempotent=False).next(response=response(502)))
+
+    def test_deadline(self):
+        state = RetryPolicy(backoff_factor=1, jitter=False, deadline=1.5).start("GET")
+        self.assertEqual([1, None], [state.next(response=response(503)) for _ in range(2)])
+
+
+class SessionPoolRetryTest(unittest.TestCase):
+
+    policy = RetryPolicy(backoff_factor=0)
+
+    @mocks.patch_responses(unavailable(mocks.OAUTH2_REQUEST_RESPONSE), mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_retry_status(self, responses):
+        self.assertEqual(200, SessionPool().request("GET", "https://example.org/profile", retry=self.policy).status_code)
+        self.assertEqual(2, len(responses.calls))
+
+    @mocks.patch_responses(dict(mocks.OAUTH2_REQUEST_RESPONSE, body=CONNECTION_REFUSED), mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_retry_exception(self, responses):
+        self.assertEqual(200, SessionPool().request("GET", "https://example.org/profile", retry=self.policy).status_code)
+
+    @mocks.patch_responses(unavailable(mocks.OAUTH2_REQUEST_RESPONSE))
+    def test_retries_exhausted(self, responses):
+        self.assertEqual(503, SessionPool().request("GET", "https://example.org/profile", retry=self.policy).status_code)
+        self.assertEqual(4, len(responses.calls))
+
+
+class ConsumerRetryTest(unittest.TestCase):
+
+    policy = RetryPolicy(backoff_factor=0)
+
+    @mocks.patch_responses(unavailable(mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1, 502), mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1)
+    def test_code_exchange_not_retried_once_seen(self, responses):
+        provider = mocks.MockOAuth2Provider(retry_policy=self.policy, **mocks.OAUTH2_CREDENTIALS)
+        with self.assertRaises(requests.HTTPError):
+            provider.get_access_token('https://example.org/callback', 'nonce', 'https://example.org/callback?code=code&state=nonce')
+        self.assertEqual(1, len(responses.calls))
+
+    @mocks.patch_responses(dict(mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1, body=CONNECTION_REFUSED), mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1)
+    def test_code_exchange_retried_when_not_sent(self, responses):
+        provider = mocks.MockOAuth2Provider(retry_policy=self.policy, **mocks.OAUTH2_CREDENTIALS)
+        token = provider.get_access_token('https://example.org/callback', 'nonce', 'https://example.org/callback?code=code&state=nonce')
+        self.assertEqual(mocks.OAUTH2_EXCHANGE_TOKEN_EXPECTED_RESULT, token)
+
+    @mocks.patch_responses(unavailable(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE), mocks.OAUTH2_REFRESH_TOKEN_RESPONSE)
+    def test_refresh_retried(self, responses):
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_EXPIRED_TOKEN_DICT, retry_policy=self.policy, **mocks.OAUTH2_CREDENTIALS)
+        self.assertEqual(mocks.OAUTH2_REFRESH_TOKEN_EXPECTED_RESULT, provider.refresh_token())
+        self.assertEqual(2, len(responses.calls))
+
+    @mocks.patch_responses(unavailable(mocks.OAUTH1_REQUEST_RESPONSE), mocks.OAUTH1_REQUEST_RESPONSE)
+    def test_resource_get_retried(self, responses):
+        provider = mocks.MockOAuth1Provider(token=mocks.OAUTH1_VALID_TOKEN_DICT, retry_policy=self.policy, **mocks.OAUTH1_CREDENTIALS)
+        self.assertDictEqual(mocks.OAUTH1_GET_PROFILE_EXPECTED_RESULT, provider.get_profile())
+
+    @mocks.patch_responses(unavailable(mocks.OAUTH1_ACCESS_TOKEN_RESPONSE_1), mocks.OAUTH1_ACCESS_TOKEN_RESPONSE_1)
+    def test_oauth1_token_exchange_not_retried(self, responses):
+        provider = mocks.MockOAuth1Provider(retry_policy=self.policy, **mocks.OAUTH1_CREDENTIALS)
+        with self.assertRaises(requests.HTTPError):
+            provider.get_access_token('https://example.org/callback?oauth_verifier=verifier&oauth_token=token', mocks.OAUTH1_REQUEST_TOKEN)
+        self.assertEqual(1, len(responses.calls))
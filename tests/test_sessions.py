@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import unittest
+import mock
+from uniauth.sessions import SessionPool, default_session_pool, build_response
+from . import mocks
+
+
+class SessionPoolTest(unittest.TestCase):
+
+    def test_one_session_per_host(self):
+        pool = SessionPool()
+        session = pool.get_session("https://example.org/oauth/token")
+        self.assertIs(session, pool.get_session("https://EXAMPLE.org/profile?alt=json"))
+        self.assertIsNot(session, pool.get_session("https://api.example.org/profile"))
+        self.assertIsNot(session, pool.get_session("http://example.org/profile"))
+
+    def test_host_options(self):
+        pool = SessionPool(pool_maxsize=5, host_options={"api.example.org": {"pool_maxsize": 50}})
+        self.assertEqual(5, pool.get_session("https://example.org").get_adapter("https://example.org/")._pool_maxsize)
+        self.assertEqual(50, pool.get_session("https://api.example.org").get_adapter("https://api.example.org/")._pool_maxsize)
+
+    @mocks.patch_responses(dict(mocks.OAUTH2_REQUEST_RESPONSE, adding_headers={"Set-Cookie": "sid=user1; Domain=example.org; Path=/"}))
+    def test_cookies_not_persisted(self, responses):
+        pool = SessionPool()
+        pool.request("GET", "https://example.org/profile")
+        pool.request("GET", "https://example.org/profile")
+        self.assertEqual(0, len(pool.get_session("https://example.org").cookies))
+        self.assertNotIn("Cookie", responses.calls[1].request.headers)
+
+    def test_close(self):
+        pool = SessionPool()
+        session = pool.get_session("https://example.org")
+        pool.close()
+        self.assertIsNot(session, pool.get_session("https://example.org"))
+
+    def test_max_hosts(self):
+        pool = SessionPool(max_hosts=2)
+        first = pool.get_session("https://a.example.org")
+        second = pool.get_session("https://b.example.org")
+        pool.get_session("https://a.example.org")
+        with mock.patch.object(second, "close") as close:
+            pool.get_session("https://c.example.org")
+        close.assert_called_once_with()
+        self.assertEqual(["https://a.example.org", "https://c.example.org"], list(pool._sessions))
+        self.assertIs(first, pool.get_session("https://a.example.org"))
+        self.assertIsNot(second, pool.get_session("https://b.example.org"))
+
+    def test_evicted_session_closed_after_request(self):
+        pool = SessionPool(max_hosts=1)
+        session = pool.acquire("https://a.example.org")
+        with mock.patch.object(session, "close") as close:
+            pool.get_session("https://b.example.org")
+            self.assertFalse(close.called)
+            pool.release(session)
+            close.assert_called_once_with()
+        self.assertEqual(({}, set()), (pool._in_use, pool._retired))
+
+    def test_default_max_hosts(self):
+        self.assertEqual(100, SessionPool().max_hosts)
+        self.assertEqual(100, default_session_pool.max_hosts)
+
+    def test_build_response(self):
+        response = build_response("https://example.org/profile", 200, "OK",
+                                  [("Content-Type", "application/json; charset=utf-8"), ("Link", "<a>"), ("link", "<b>")],
+                                  b'{"id": "1"}')
+        self.assertEqual({"id": "1"}, response.json())
+        self.assertEqual("<a>, <b>", response.headers["link"])
+        self.assertEqual("utf-8", response.encoding)
+
+
+class ConsumerSessionPoolTest(unittest.TestCase):
+
+    def test_default_session_pool(self):
+        provider = mocks.MockOAuth2Provider(**mocks.OAUTH2_CREDENTIALS)
+        self.assertIs(default_session_pool, provider.get_session_pool())
+
+    @mocks.patch_responses(mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_oauth2_injected_session_pool(self, responses):
+        pool = SessionPool(timeout=3)
+        provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, session_pool=pool, **mocks.OAUTH2_CREDENTIALS)
+        self.assertIs(pool, provider.get_session_pool())
+        provider.request('https://example.org/profile')
+        self.assertIn("https://example.org", pool._sessions)
+
+    @mocks.patch_responses(mocks.OAUTH1_REQUEST_RESPONSE)
+    def test_oauth1_injected_session_pool(self, responses):
+        pool = SessionPool()
+        provider = mocks.MockOAuth1Provider(token=mocks.OAUTH1_VALID_TOKEN_DICT, session_pool=pool, **mocks.OAUTH1_CREDENTIALS)
+        provider.request('https://example.org/profile')
+        self.assertIn("https://example.org", pool._sessions)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import unittest
+import mock
+from uniauth.cache import MemoryCache
+from uniauth.signing import Signer, FernetSigner, Fernet, BadSignature, SignatureExpired
+from uniauth.stashes import CacheStash, MemoryStash, SignedStash
+from . import mocks
+
+
+class SignerTest(unittest.TestCase):
+
+    def test_sign(self):
+        signer = Signer("secret")
+        signed = signer.dumps({"state": "nonce", "name": "ü"})
+        self.assertEqual({"state": "nonce", "name": "ü"}, signer.loads(signed, max_age=60))
+        for tampered in [signed[:-1] + ("A" if signed[-1] != "A" else "B"), signed.replace(".", ".1", 1), "", "a.b", None]:
+            with self.assertRaises(BadSignature):
+                signer.loads(tampered)
+        with self.assertRaises(BadSignature):
+            Signer("other").loads(signed)
+        with self.assertRaises(BadSignature):
+            Signer("secret", salt="other").loads(signed)
+
+    def test_digest(self):
+        signer = Signer("secret")
+        self.assertEqual(signer.digest("value"), Signer("secret").digest("value"))
+        self.assertNotEqual(signer.digest("value"), Signer("other").digest("value"))
+        self.assertNotEqual(signer.digest("value"), signer.digest("other"))
+
+    def test_expiry(self):
+        signer = Signer("secret")
+        with mock.patch("time.time", return_value=time.time() - 120):
+            signed = signer.sign("value")
+        self.assertEqual("value", signer.unsign(signed))
+        with self.assertRaises(SignatureExpired):
+            signer.unsign(signed, max_age=60)
+
+    @unittest.skipIf(Fernet is None, "cryptography is not installed")
+    def test_fernet(self):
+        signer = FernetSigner(Fernet.generate_key())
+        signed = signer.sign("value")
+        self.assertNotIn("value", signed)
+        self.assertEqual("value", signer.unsign(signed, max_age=60))
+        with self.assertRaises(BadSignature):
+            FernetSigner(Fernet.generate_key()).unsign(signed)
+        self.assertEqual(32, len(signer.digest("value")))
+
+
+class CacheStashTest(unittest.TestCase):
+
+    def test_shared_backend(self):
+        backend = MemoryCache()
+        CacheStash("browser1", backend)["state"] = "nonce"
+        self.assertIsNone(CacheStash("browser2", backend).pop("state"))
+        self.assertEqual("nonce", CacheStash("browser1", backend).pop("state"))
+        self.assertEqual("default", CacheStash("browser1", backend).pop("state", "default"))
+
+    def test_expiry(self):
+        stash = MemoryStash("browser1", ttl=60, backend=MemoryCache())
+        stash["state"] = "nonce"
+        with mock.patch("time.time", return_value=time.time() + 120):
+            self.assertIsNone(stash.pop("state"))
+
+
+class SignedStashTest(unittest.TestCase):
+
+    signer = Signer("secret")
+
+    def test_round_trip(self):
+        stash = SignedStash(self.signer)
+        stash["state"] = {"oauth_token": "token"}
+        value = stash.dumps()
+        stash = SignedStash(self.signer, value)
+        self.assertEqual({"oauth_token": "token"}, stash.pop("state"))
+        self.assertTrue(stash.modified)
+        self.assertIsNone(stash.dumps())
+        self.assertIsNone(SignedStash(self.signer, value[:-2]).pop("state"))
+
+    def test_expiry(self):
+        stash = SignedStash(self.signer, ttl=60)
+        stash["state"] = "nonce"
+        value = stash.dumps()
+        with mock.patch("time.time", return_value=time.time() + 120):
+            self.assertIsNone(SignedStash(self.signer, value, ttl=60).pop("state"))
+            self.assertIsNone(stash.pop("state"))
+
+    @mock.patch('uniauth.oauth2.generate_token')
+    @mocks.patch_responses(mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1)
+    def test_oauth2_dance(self, generate_token, responses):
+        generate_token.return_value = "nonce"
+        provider = mocks.MockOAuth2Provider(**mocks.OAUTH2_CREDENTIALS)
+        stash = SignedStash(self.signer)
+        provider.dance(stash, 'https://example.org/callback').get_authorization_url()
+        dance = provider.dance(SignedStash(self.signer, stash.dumps()), 'https://example.org/callback')
+        self.assertEqual(mocks.OAUTH2_EXCHANGE_TOKEN_EXPECTED_RESULT, dance.get_access_token('https://example.org/callback?code=code&state=nonce'))
+
+    @mocks.patch_responses(mocks.OAUTH1_REQUEST_TOKEN_RESPONSE_1, mocks.OAUTH1_ACCESS_TOKEN_RESPONSE_1)
+    def test_oauth1_dance(self, responses):
+        provider = mocks.MockOAuth1Provider(**mocks.OAUTH1_CREDENTIALS)
+        stash = SignedStash(self.signer)
+        provider.dance(stash, 'https://example.org/callback').get_authorization_url()
+        dance = provider.dance(SignedStash(self.signer, stash.dumps()), 'https://example.org/callback')
+        self.assertEqual(mocks.OAUTH1_ACCESS_TOKEN, dance.get_access_token('https://example.org/callback?oauth_verifier=verifier&oauth_token=token'))
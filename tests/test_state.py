@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import unittest
+import mock
+from oauthlib.oauth2.rfc6749.errors import MismatchingStateError
+from six.moves.urllib.parse import urlparse, parse_qsl
+from uniauth.cache import MemoryCache
+from uniauth.signing import Signer
+from uniauth.state import InvalidState, StateSigner, CacheReplayFilter, BloomReplayFilter
+from . import mocks
+
+CALLBACK = "https://example.org/callback"
+
+
+class StateSignerTest(unittest.TestCase):
+
+    def test_loads(self):
+        signer = StateSigner(Signer("secret"))
+        state = signer.dumps("github", CALLBACK, "binding")
+        self.assertNotEqual(state, signer.dumps("github", CALLBACK, "binding"))
+        self.assertTrue(signer.loads(state, "github", CALLBACK, "binding"))
+        self.assertTrue(signer.loads(state, "github", CALLBACK, "binding"))
+        for provider, redirect_uri in [("google", CALLBACK), ("github", "https://evil.example.org/callback")]:
+            with self.assertRaises(InvalidState):
+                signer.loads(state, provider, redirect_uri, "binding")
+        for binding in [None, "", "other"]:
+            with self.assertRaises(InvalidState):
+                signer.loads(state, "github", CALLBACK, binding)
+        for forged in [None, "", "nonce", state[:-2], StateSigner(Signer("other")).dumps("github", CALLBACK, "binding")]:
+            with self.assertRaises(MismatchingStateError):
+                signer.loads(forged, "github", CALLBACK, "binding")
+
+    def test_expiry(self):
+        signer = StateSigner(Signer("secret"), max_age=60)
+        with mock.patch("time.time", return_value=time.time() - 120):
+            state = signer.dumps("github", CALLBACK, "binding")
+        with self.assertRaises(InvalidState):
+            signer.loads(state, "github", CALLBACK, "binding")
+
+    def test_replay(self):
+        for replay_filter in [CacheReplayFilter(MemoryCache()), BloomReplayFilter(capacity=100)]:
+            signer = StateSigner(Signer("secret"), replay_filter=replay_filter)
+            state = signer.dumps("github", CALLBACK, "binding")
+            signer.loads(state, "github", CALLBACK, "binding")
+            with self.assertRaises(InvalidState):
+                signer.loads(state, "github", CALLBACK, "binding")
+            signer.loads(signer.dumps("github", CALLBACK, "binding"), "github", CALLBACK, "binding")
+
+
+class ReplayFilterTest(unittest.TestCase):
+
+    def test_cache_expiry(self):
+        replay_filter = CacheReplayFilter(MemoryCache())
+        self.assertTrue(replay_filter.add("nonce", 60))
+        self.assertFalse(replay_filter.add("nonce", 60))
+        with mock.patch("time.time", return_value=time.time() + 120):
+            self.assertTrue(replay_filter.add("nonce", 60))
+
+    def test_bloom_rotation(self):
+        replay_filter = BloomReplayFilter(capacity=1000, error_rate=0.01, ttl=60)
+        self.assertTrue(replay_filter.add("nonce"))
+        now = time.time()
+        with mock.patch("time.time", return_value=now + 90):
+            self.assertFalse(replay_filter.add("nonce"))
+        with mock.patch("time.time", return_value=now + 200):
+            self.assertTrue(replay_filter.add("nonce"))
+
+    def test_bloom_false_positives(self):
+        replay_filter = BloomReplayFilter(capacity=1000, error_rate=0.01)
+        self.assertLess(replay_filter.size // 8, 1500)
+        rejected = sum(not replay_filter.add("nonce{0}".format(i)) for i in range(1000))
+        self.assertLess(rejected, 30)
+
+
+class StatelessDanceTest(unittest.TestCase):
+
+    @mocks.patch_responses(mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1)
+    def test_dance(self, responses):
+        state_signer = StateSigner(Signer("secret"), replay_filter=CacheReplayFilter(MemoryCache()))
+        provider = mocks.MockOAuth2Provider(state_signer=state_signer, **mocks.OAUTH2_CREDENTIALS)
+        dance = provider.dance(None, CALLBACK)
+        state = dict(parse_qsl(urlparse(dance.get_authorization_url()).query))["state"]
+        binding = dance.binding
+        self.assertTrue(binding)
+        self.assertNotIn(binding, state)
+        callback_uri = "{0}?code=code&state={1}".format(CALLBACK, state)
+
+        # Verified by another process, without the stash
+        other = mocks.MockOAuth2Provider(state_signer=state_signer, **mocks.OAUTH2_CREDENTIALS)
+        token = other.dance(None, CALLBACK, binding).get_access_token(callback_uri)
+        self.assertEqual(mocks.OAUTH2_EXCHANGE_TOKEN_EXPECTED_RESULT, token)
+        with self.assertRaises(InvalidState):
+            other.dance(None, CALLBACK, binding).get_access_token(callback_uri)
+        with self.assertRaises(InvalidState):
+            other.dance(None, CALLBACK, binding).get_access_token(CALLBACK + "?code=code&state=nonce")
+        self.assertEqual(1, len(responses.calls))
+
+    @mocks.patch_responses(mocks.OAUTH2_EXCHANGE_TOKEN_RESPONSE_1)
+    def test_state_of_another_user_agent(self, responses):
+        provider = mocks.MockOAuth2Provider(state_signer=StateSigner(Signer("secret")), **mocks.OAUTH2_CREDENTIALS)
+
+        # The attacker starts a dance and sends the callback of their own authorization to the victim
+        attacker = provider.dance(None, CALLBACK)
+        state = dict(parse_qsl(urlparse(attacker.get_authorization_url()).query))["state"]
+        callback_uri = "{0}?code=code&state={1}".format(CALLBACK, state)
+        for victim_binding in [None, provider.dance(None, CALLBACK).binding, StateSigner.create_binding()]:
+            with self.assertRaises(InvalidState):
+                provider.dance(None, CALLBACK, victim_binding).get_access_token(callback_uri)
+        self.assertEqual(0, len(responses.calls))
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import unittest
+from uniauth.factory import ConsumerFactory
+from uniauth.stores import MemoryTokenStore, SQLiteTokenStore
+from uniauth.tokens import Token
+from . import mocks
+
+
+def token(name, expires_in=None):
+    return Token(name, "RT", time.time() + expires_in if expires_in is not None else None, "email")
+
+
+class TokenStoreTestMixin(object):
+
+    def create_store(self):  # pragma: no cover
+        raise NotImplementedError()
+
+    def setUp(self):
+        self.store = self.create_store()
+
+    def test_get_set(self):
+        self.assertIsNone(self.store.get("github:1"))
+        self.store.set("github:1", mocks.OAUTH2_VALID_TOKEN_DICT)
+        self.assertEqual(mocks.OAUTH2_VALID_TOKEN_DICT, self.store.get("github:1"))
+        self.store.delete("github:1")
+        self.assertIsNone(self.store.get("github:1"))
+        self.assertEqual(0, len(self.store))
+
+    def test_bulk(self):
+        tokens = dict(("github:{0}".format(i), token("AT{0}".format(i), i)) for i in range(1200))
+        self.store.set_many(tokens)
+        self.assertEqual(1200, len(self.store))
+        self.assertEqual(tokens, self.store.get_many(list(tokens) + ["missing"]))
+
+    def test_expiring(self):
+        self.store.set_many([("a", token("A", 3600)), ("b", token("B", -60)), ("c", token("C")), ("d", token("D", 60))])
+        self.assertEqual(["b"], [key for key, _ in self.store.expiring()])
+        self.assertEqual(["b", "d"], [key for key, _ in self.store.expiring(600)])
+        self.assertEqual(["b"], [key for key, _ in self.store.expiring(600, limit=1)])
+        self.assertEqual("D", dict(self.store.expiring(600))["d"].token)
+
+    def test_replace_reindexes(self):
+        self.store.set("a", token("A", 60))
+        self.store.set("a", token("A2", 3600))
+        self.assertEqual([], self.store.expiring(600))
+        self.store.set("a", token("A3", 60))
+        self.store.set("b", token("B", 60))
+        self.store.delete("b")
+        self.assertEqual([("a", self.store.get("a"))], self.store.expiring(600))
+
+
+class MemoryTokenStoreTest(TokenStoreTestMixin, unittest.TestCase):
+
+    def create_store(self):
+        return MemoryTokenStore()
+
+
+class SQLiteTokenStoreTest(TokenStoreTestMixin, unittest.TestCase):
+
+    def create_store(self):
+        return SQLiteTokenStore()
+
+    def tearDown(self):
+        self.store.close()
+
+
+class ConsumerTokenStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = MemoryTokenStore({"user:1": mocks.OAUTH2_EXPIRED_TOKEN_DICT})
+
+    def test_token_loaded_from_store(self):
+        provider = mocks.MockOAuth2Provider(token_store=self.store, token_key="user:1", **mocks.OAUTH2_CREDENTIALS)
+        self.assertEqual(mocks.OAUTH2_EXPIRED_TOKEN_DICT, provider.get_token())
+        factory = ConsumerFactory(mocks.MockOAuth1Provider, token_store=MemoryTokenStore({"user:2": mocks.OAUTH1_VALID_TOKEN_DICT}), **mocks.OAUTH1_CREDENTIALS)
+        self.assertEqual(mocks.OAUTH1_VALID_TOKEN_DICT, factory(token_key="user:2").get_token())
+
+    @mocks.patch_responses(mocks.OAUTH2_REFRESH_TOKEN_RESPONSE, mocks.OAUTH2_REQUEST_RESPONSE)
+    def test_refreshed_token_written_back(self, responses):
+        refreshed = []
+        factory = ConsumerFactory(mocks.MockOAuth2Provider, token_store=self.store, **mocks.OAUTH2_CREDENTIALS)
+        factory(token_key="user:1", refresh_token_callback=refreshed.append).request('https://example.org/profile')
+        self.assertEqual(mocks.OAUTH2_REFRESH_TOKEN_EXPECTED_RESULT, self.store.get("user:1"))
+        self.assertEqual([mocks.OAUTH2_REFRESH_TOKEN_EXPECTED_RESULT], refreshed)
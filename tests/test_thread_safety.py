@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import json
+import threading
+import unittest
+from oauthlib.common import urldecode, urlparse
+from uniauth.concurrency import imap_unordered
+from uniauth.sessions import build_response
+from . import mocks
+
+THREADS = 16
+ITERATIONS = 400
+
+
+def run_concurrently(func, iterations=ITERATIONS, workers=THREADS):
+    """
+    Call func(i) for every iteration from a pool of threads, re-raising the first error
+
+    """
+    barrier = threading.Event()
+
+    def call(i):
+        barrier.wait()
+        return func(i)
+
+    results = imap_unordered(call, range(iterations), workers=workers)
+    barrier.set()
+    for i, result, error in results:
+        if error is not None:
+            raise error
+
+
+def query(url):
+    return dict(urldecode(urlparse.urlparse(url).query))
+
+
+def token_response(access_token, refresh_token=None):
+    token = {"access_token": access_token, "expires_in": 3600, "token_type": "Bearer"}
+    if refresh_token:
+        token["refresh_token"] = refresh_token
+    return build_response("https://example.org/oauth/token", 200, "OK", [("Content-Type", "application/json")], json.dumps(token).encode("utf-8"))
+
+
+class OAuth1ThreadSafetyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.provider = mocks.MockOAuth1Provider(token=mocks.OAUTH1_VALID_TOKEN_DICT, **mocks.OAUTH1_CREDENTIALS)
+
+    def test_concurrent_dances_and_requests(self):
+        provider = self.provider
+
+        def call(i):
+            if i % 3 == 0:
+                redirect_uri = "https://example.org/callback/{0}".format(i)
+                self.assertEqual(redirect_uri, query(provider.prepare_request_token_request(redirect_uri)["url"])["oauth_callback"])
+            elif i % 3 == 1:
+                request_token = {"oauth_token": "token{0}".format(i), "oauth_token_secret": "secret{0}".format(i)}
+                callback_uri = "https://example.org/callback?oauth_verifier=verifier{0}&oauth_token=token{0}".format(i)
+                params = query(provider.prepare_access_token_request(callback_uri, request_token)["url"])
+                self.assertEqual(("verifier{0}".format(i), "token{0}".format(i)), (params["oauth_verifier"], params["oauth_token"]))
+            else:
+                params = query(provider.prepare_request(provider.profile_url)["url"])
+                self.assertEqual("AT", params["oauth_token"])
+                self.assertNotIn("oauth_verifier", params)
+                self.assertNotIn("oauth_callback", params)
+
+        run_concurrently(call)
+        self.assertIsNone(provider.client.callback_uri)
+        self.assertIsNone(provider.client.verifier)
+        self.assertEqual(mocks.OAUTH1_VALID_TOKEN_DICT, provider.get_token())
+
+    def test_token_replacement_is_atomic(self):
+        provider = self.provider
+
+        def call(i):
+            if i % 2:
+                provider.set_token({"oauth_token": "token{0}".format(i), "oauth_token_secret": "secret{0}".format(i)})
+            token = provider.get_token()
+            self.assertEqual(token["token"].replace("token", "secret").replace("AT", "RT"), token["extra"])
+
+        run_concurrently(call)
+
+
+class OAuth2ThreadSafetyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.provider = mocks.MockOAuth2Provider(token=mocks.OAUTH2_VALID_TOKEN_DICT, **mocks.OAUTH2_CREDENTIALS)
+
+    def test_concurrent_code_exchanges(self):
+        provider = self.provider
+
+        def call(i):
+            callback_uri = "https://example.org/callback?code=code{0}&state=state{0}".format(i)
+            data = provider.prepare_access_token_request("https://example.org/callback", "state{0}".format(i), callback_uri)["data"]
+            self.assertEqual("code{0}".format(i), dict(urldecode(data))["code"])
+
+        run_concurrently(call)
+        self.assertIsNone(provider.client.code)
+
+    def test_concurrent_token_responses_and_requests(self):
+        provider = self.provider
+
+        def call(i):
+            if i % 2:
+                token = provider.parse_token_response(token_response("AT{0}".format(i), "RT{0}".format(i)))
+                self.assertEqual(("AT{0}".format(i), "RT{0}".format(i)), (token["token"], token["extra"]))
+            headers = provider.prepare_request(provider.profile_url)["headers"]
+            access_token = headers["Authorization"][len("Bearer "):]
+            self.assertTrue(access_token == "AT" or int(access_token[2:]) % 2)
+            current = provider.get_token()
+            self.assertEqual(current["token"].replace("AT", "RT"), current["extra"])
+
+        run_concurrently(call)
+
+    def test_refresh_keeps_refresh_token(self):
+        token = self.provider.parse_token_response(token_response("AT2"), refresh_token="RT")
+        self.assertEqual("RT", token["extra"])
+        self.assertEqual("RT", self.provider.client.refresh_token)
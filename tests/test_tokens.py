@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import pickle
+import unittest
+from datetime import datetime
+from pytz import utc
+from uniauth.tokens import Token
+
+
+class TokenTest(unittest.TestCase):
+
+    def test_compares_to_dict(self):
+        token = Token("AT", "RT", datetime(2014, 1, 1, tzinfo=utc), "email profile")
+        expected = {"token": "AT", "extra": "RT", "expires_at": datetime(2014, 1, 1, tzinfo=utc), "scope": "email profile"}
+        self.assertEqual(expected, token)
+        self.assertEqual(expected, dict(token))
+        self.assertNotEqual(dict(expected, token="AT2"), token)
+        self.assertEqual("AT", token["token"])
+        self.assertEqual("RT", token.get("extra"))
+        self.assertIsNone(token.get("missing"))
+
+    def test_immutable(self):
+        token = Token("AT", "RT")
+        with self.assertRaises(AttributeError):
+            token.token = "AT2"
+        with self.assertRaises(TypeError):
+            token["token"] = "AT2"
+        self.assertEqual("AT2", token.replace(token="AT2").token)
+        self.assertEqual("AT", token.token)
+
+    def test_expiry_is_converted_lazily(self):
+        token = Token("AT", expires_at=1388534400)
+        self.assertEqual(1388534400, token.expires_at_timestamp)
+        self.assertEqual(datetime(2014, 1, 1, tzinfo=utc), token.expires_at)
+        self.assertEqual(1388534400, Token(expires_at=datetime(2014, 1, 1)).expires_at_timestamp)
+        self.assertTrue(token.is_expired())
+        self.assertEqual(token, Token("AT", expires_at=datetime(2014, 1, 1, tzinfo=utc)))
+
+    def test_oauth1(self):
+        token = Token.from_oauth1({"oauth_token": "AT", "oauth_token_secret": "RT"})
+        self.assertEqual({"token": "AT", "extra": "RT", "expires_at": None, "scope": None}, token)
+        self.assertEqual({"oauth_token": "AT", "oauth_token_secret": "RT"}, token.to_oauth1())
+
+    def test_oauth2(self):
+        token = Token.from_oauth2({"access_token": "AT", "refresh_token": "RT", "expires_at": 1388534400, "scope": ["email", "profile"]})
+        self.assertEqual("email profile", token.scope)
+        self.assertEqual({"access_token": "AT", "refresh_token": "RT", "expires_at": 1388534400, "scope": ["email", "profile"]}, token.to_oauth2())
+        self.assertEqual({"access_token": None, "refresh_token": None, "expires_at": 0, "scope": []}, Token().to_oauth2())
+
+    def test_shares_scopes(self):
+        first = Token.from_oauth2({"access_token": "AT", "scope": " ".join(["email", "profile"])})
+        second = Token.from_oauth2({"access_token": "AT2", "scope": " ".join(["email", "profile"])})
+        self.assertIs(first.scope, second.scope)
+
+    def test_serialisation(self):
+        token = Token("AT", "s&cr t/ü", datetime(2014, 1, 1, tzinfo=utc), "email")
+        self.assertEqual('["AT","s&cr t/\\u00fc",1388534400,"email"]', token.dumps())
+        self.assertEqual(token, Token.loads(token.dumps()))
+        self.assertEqual(token, pickle.loads(pickle.dumps(token)))
+        self.assertNotIn("AT", repr(token))
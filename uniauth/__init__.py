@@ -1,6 +1,22 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals, absolute_import, print_function
 
-from .consumers import *
+import sys
+
+from .registry import get_consumer, register_consumer
+
+__all__ = ["Google", "Facebook", "LinkedIn", "GitHub", "Bitbucket", "get_consumer", "register_consumer"]
 
 __version__ = '0.0.2'
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        """
+        Import consumers on first access (PEP 562), so importing uniauth doesn't import requests and oauthlib
+
+        """
+        if name in __all__:
+            return get_consumer(name.lower())
+        raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+else:  # pragma: no cover
+    from .consumers import *
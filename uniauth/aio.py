@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio consumers (Python 3.7+)
+
+Same flows as the blocking consumers, with coroutines for every call doing network I/O.
+Signing and normalisation are shared with the blocking consumers; only the transport differs.
+
+"""
+import time
+import asyncio
+import logging
+import weakref
+import functools
+import requests
+from requests.packages.urllib3.exceptions import NewConnectionError
+from oauthlib.oauth2.rfc6749.errors import TokenExpiredError
+
+from .base import ProfileMixin
+from .oauth1 import OAuth1Consumer, OAuth1Dance
+from .oauth2 import OAuth2Consumer, OAuth2Dance
+from .consumers import Google, Facebook, LinkedIn, GitHub, Bitbucket
+from .sessions import build_response
+from .instrumentation import strip_query
+from .decoding import decode_json
+from .refresh import RefreshTimeout
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["AsyncOAuth1Consumer", "AsyncOAuth2Consumer", "AsyncProfileMixin",
+           "AsyncGoogle", "AsyncFacebook", "AsyncLinkedIn", "AsyncGitHub", "AsyncBitbucket",
+           "BaseAsyncTransport", "ExecutorTransport", "AiohttpTransport", "get_default_transport"]
+
+
+class BaseAsyncTransport(object):
+
+    async def request(self, method, url, headers=None, data=None, params=None, timeout=None, stream=False):  # pragma: no cover
+        """
+        Send request and return a requests.Response
+
+        The body is read before returning even when stream is set, so reading the response never blocks the event loop.
+
+        """
+        raise NotImplementedError()
+
+    async def close(self):
+        pass
+
+
+class ExecutorTransport(BaseAsyncTransport):
+    """
+    Runs the blocking session pool of the consumer in an executor (default thread pool)
+
+    """
+
+    def __init__(self, session_pool=None, executor=None):
+        self.session_pool = session_pool
+        self.executor = executor
+
+    async def request(self, method, url, session_pool=None, stream=False, **kwargs):
+        pool = self.session_pool or session_pool
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(pool.request, method, url, **kwargs))
+
+
+class AiohttpTransport(BaseAsyncTransport):
+    """
+    Native non-blocking transport (requires aiohttp)
+
+    aiohttp errors are raised as their requests equivalents (ConnectionError, Timeout).
+
+    aiohttp sessions belong to the event loop they were created on, so the transport keeps one session per loop.
+    Await close() before a loop ends (e.g. at the end of the coroutine passed to asyncio.run) to release its
+    connections, the sessions of loops closed without it are dropped.
+
+    :limit: total number of simultaneous connections per event loop
+    :limit_per_host: number of simultaneous connections per provider host
+    :timeout: default total timeout in seconds
+
+    """
+
+    def __init__(self, limit=100, limit_per_host=10, timeout=None):
+        if aiohttp is None:  # pragma: no cover
+            raise ImportError("AiohttpTransport requires aiohttp")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def get_session(self):
+        """
+        Session of the running event loop
+
+        """
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            for closed_loop in [other for other in list(self._sessions) if other.is_closed()]:
+                self._sessions.pop(closed_loop, None)
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            session = self._sessions[loop] = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+        return session
+
+    async def request(self, method, url, headers=None, data=None, params=None, timeout=None, stream=False, session_pool=None):
+        timeout = timeout if timeout is not None else self.timeout
+        if isinstance(timeout, tuple):
+            timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        else:
+            timeout = aiohttp.ClientTimeout(total=timeout)
+        try:
+            async with self.get_session().request(method, url, headers=headers, data=data, params=params, timeout=timeout) as resp:
+                content = await resp.read()
+                return build_response(str(resp.url), resp.status, resp.reason, resp.headers.items(), content)
+        except aiohttp.ClientConnectorError as e:
+            raise requests.ConnectionError(NewConnectionError(None, str(e)))
+        except asyncio.TimeoutError as e:
+            raise requests.Timeout(e)
+        except aiohttp.ClientError as e:
+            raise requests.ConnectionError(e)
+
+    async def close(self):
+        """
+        Close the session of the running event loop
+
+        """
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+_default_transport = None
+_refresh_tasks = {}
+
+
+async def _coordinated_refresh(coordinator, key, refresh):
+    """
+    Async counterpart of RefreshCoordinator.refresh for the consumer refreshing key on the event loop
+
+    Tokens refreshed during the coordinator's result_ttl are reused. The blocking calls to the coordinator's lock
+    backend run in the default executor, so the backend must allow a lock to be released from another thread.
+
+    """
+    token = coordinator.get_result(key)
+    if token is not None:
+        return token, False
+    backend = coordinator.backend
+    if backend is None:
+        token = await refresh()
+        coordinator.set_result(key, token)
+        return token, True
+
+    loop = asyncio.get_running_loop()
+    token = await loop.run_in_executor(None, backend.get_result, key)
+    if token is not None:
+        return token, False
+    if not await loop.run_in_executor(None, backend.acquire, key, coordinator.timeout):
+        raise RefreshTimeout("Timed out acquiring token refresh lock")
+    try:
+        token = await loop.run_in_executor(None, backend.get_result, key)
+        if token is not None:
+            return token, False
+        token = await refresh()
+        await loop.run_in_executor(None, backend.set_result, key, token, coordinator.result_ttl)
+        coordinator.set_result(key, token)
+        return token, True
+    finally:
+        await loop.run_in_executor(None, backend.release, key)
+
+
+def get_default_transport():
+    """
+    aiohttp transport when available, blocking session pool in the default executor otherwise
+
+    """
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = AiohttpTransport() if aiohttp is not None else ExecutorTransport()
+    return _default_transport
+
+
+class AsyncConsumerMixin(object):
+
+    transport = None
+
+    def get_transport(self):
+        return self.transport or get_default_transport()
+
+    async def http_request(self, method, url, idempotent=None, **kwargs):
+        with self.instrument("http", method=method, url=strip_query(url)) as span:
+            response = await self.send_http_request(method, url, idempotent, span.on_retry, **kwargs)
+            span.set(status=response.status_code)
+            return response
+
+    async def send_http_request(self, method, url, idempotent=None, on_retry=None, **kwargs):
+        transport = self.get_transport()
+        if self.retry_policy is None:
+            return await transport.request(method, url, session_pool=self.get_session_pool(), **kwargs)
+
+        state = self.retry_policy.start(method, idempotent)
+        while True:
+            try:
+                response = await transport.request(method, url, session_pool=self.get_session_pool(), **kwargs)
+            except requests.RequestException as error:
+                response, failure, delay = None, error, state.next(error=error)
+                if delay is None:
+                    raise
+            else:
+                failure, delay = None, state.next(response=response)
+                if delay is None:
+                    return response
+            if on_retry is not None:
+                on_retry(delay, response, failure)
+            await asyncio.sleep(delay)
+
+    async def send_request(self, url, method=None, rate_limit_mode=None, **kwargs):
+        with self.instrument("request", method=method or self.request_method, url=strip_query(url)) as span:
+            response = await self.send_resource_request(url, method, rate_limit_mode, **kwargs)
+            span.set(status=response.status_code)
+            return response
+
+    async def send_resource_request(self, url, method=None, rate_limit_mode=None, **kwargs):
+        limiter = self.rate_limiter
+        key = limiter.get_key(self) if limiter is not None else None
+        cache = self.response_cache if (method or self.request_method).upper() == "GET" and not kwargs.get("stream") else None
+
+        if cache is not None:
+            cache_key = cache.get_key(self, url, kwargs.get("params"))
+            entry, response = cache.lookup(cache_key)
+            if response is not None:
+                return response
+            headers = dict(kwargs.get("headers") or {}, **cache.get_conditional_headers(entry))
+            kwargs["headers"] = headers or None
+
+        if limiter is not None:
+            await self.acquire_rate_limit(key, rate_limit_mode)
+        response = await self.http_request(**self.prepare_request(url, method, **kwargs))
+        if limiter is not None:
+            limiter.update(key, response)
+
+        if cache is not None:
+            return cache.update(cache_key, entry, response)
+        return response
+
+    async def paginate(self, url, method=None, params=None, paginator=None, prefetch=True, **kwargs):
+        """
+        Asynchronously iterate over the items of a paginated resource (see BaseAuthConsumer.paginate)
+
+        """
+        paginator = paginator or self.paginator
+        response = await self.request(url, method, params=params or {}, **kwargs)
+        while True:
+            data = decode_json(response)
+            next_page = paginator.get_next_page(response, data, url, params)
+            pending = None
+            if next_page is not None and prefetch:
+                pending = asyncio.ensure_future(self.request(next_page[0], method, params=next_page[1] or {}, **kwargs))
+            try:
+                for item in paginator.get_items(data):
+                    yield item
+            except GeneratorExit:
+                if pending is not None:
+                    pending.cancel()
+                raise
+            if next_page is None:
+                return
+            url, params = next_page
+            response = await pending if pending is not None else await self.request(url, method, params=params or {}, **kwargs)
+
+    async def acquire_rate_limit(self, key, mode=None):
+        """
+        Wait on the event loop (or fail) until the rate limiter allows a request
+
+        """
+        while True:
+            delay = self.rate_limiter.reserve(key)
+            if not delay:
+                return
+            self.rate_limiter.check(key, delay, mode)
+            await asyncio.sleep(delay)
+
+
+class AsyncOAuth1Dance(OAuth1Dance):
+
+    async def get_authorization_url(self, **params):
+        with self.client.instrument("authorization_url") as span:
+            request_token = self.client.get_pooled_request_token(self.redirect_uri)
+            span.set(pooled=request_token is not None)
+            if request_token is None:
+                request_token = await self.client.get_request_token(self.redirect_uri)
+            self.stash[self._request_token_stash_key] = request_token
+            return self.client.get_authorization_url(request_token)
+
+    async def get_access_token(self, callback_uri):
+        return await self.client.get_access_token(callback_uri, self.stash.pop(self._request_token_stash_key, None))
+
+
+class AsyncOAuth1Consumer(AsyncConsumerMixin, OAuth1Consumer):
+
+    def __init__(self, *args, transport=None, **kwargs):
+        if transport is not None:
+            self.transport = transport
+        super(AsyncOAuth1Consumer, self).__init__(*args, **kwargs)
+
+    def dance(self, stash, redirect_uri):
+        return AsyncOAuth1Dance(self, stash=stash, redirect_uri=redirect_uri)
+
+    async def get_request_token(self, redirect_uri):
+        with self.instrument("request_token"):
+            return self.parse_request_token_response(await self.http_request(**self.prepare_request_token_request(redirect_uri)))
+
+    async def get_access_token(self, callback_uri, request_token):
+        with self.instrument("access_token"):
+            return self.parse_access_token_response(await self.http_request(**self.prepare_access_token_request(callback_uri, request_token)))
+
+    async def request(self, url, method=None, **kwargs):
+        response = await self.send_request(url, method, **kwargs)
+        response.raise_for_status()
+        return response
+
+
+class AsyncOAuth2Dance(OAuth2Dance):
+
+    async def get_authorization_url(self, **params):
+        return super(AsyncOAuth2Dance, self).get_authorization_url(**params)
+
+    async def get_access_token(self, callback_uri):
+        return await self.client.get_access_token(**self.pop_access_token_params(callback_uri))
+
+
+def _background_refresh(consumer_ref):
+    """
+    Refresh callback scheduled on the event loop, holding a weak reference so dropped consumers aren't kept refreshing
+
+    """
+    consumer = consumer_ref()
+    if consumer is not None:
+        asyncio.ensure_future(consumer._background_refresh())
+
+
+class AsyncOAuth2Consumer(AsyncConsumerMixin, OAuth2Consumer):
+
+    def __init__(self, *args, transport=None, **kwargs):
+        if transport is not None:
+            self.transport = transport
+        super(AsyncOAuth2Consumer, self).__init__(*args, **kwargs)
+
+    def dance(self, stash, redirect_uri, binding=None):
+        return AsyncOAuth2Dance(self, stash=stash, redirect_uri=redirect_uri, binding=binding)
+
+    async def get_access_token(self, redirect_uri, state, callback_uri, code_verifier=None):
+        with self.instrument("access_token"):
+            return self.parse_token_response(await self.http_request(**self.prepare_access_token_request(redirect_uri, state, callback_uri, code_verifier)))
+
+    async def refresh_token(self):
+        refresh_token = self.client.refresh_token
+        return self.parse_token_response(await self.http_request(**self.prepare_refresh_token_request(refresh_token)), refresh_token)
+
+    def schedule_refresh(self):
+        """
+        Schedule a refresh refresh_ahead seconds before the token expires on the running event loop
+
+        """
+        handle = getattr(self, "_refresh_handle", None)
+        if handle is not None:
+            handle.cancel()
+        self._refresh_handle = None
+        if self.refresh_ahead is None or not self.client.refresh_token or not self.get_token_expiry():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        delay = max(0, self.get_token_expiry() - self.refresh_ahead - time.time())
+        self._refresh_handle = loop.call_later(delay, _background_refresh, weakref.ref(self))
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh_token_once(self.refresh_token_callback)
+        except Exception:
+            logger.warning("Background refresh of %s token failed", self.name, exc_info=True)
+
+    async def refresh_token_once(self, callback=None):
+        """
+        Refreshes the token, awaiting any refresh of the same token already in flight on the event loop
+
+        Refreshes go through the consumer's refresh coordinator: a token it refreshed recently is reused, and its lock
+        backend (if any) coordinates the refresh with other processes.
+
+        """
+        coordinator = self.get_refresh_coordinator()
+        refresh_key = self.get_refresh_key()
+        key = (id(asyncio.get_running_loop()), refresh_key)
+        with self.instrument("refresh_token") as span:
+            task = _refresh_tasks.get(key)
+            leader = task is None
+            if leader:
+                task = _refresh_tasks[key] = asyncio.ensure_future(_coordinated_refresh(coordinator, refresh_key, self.refresh_token))
+                task.add_done_callback(lambda _: _refresh_tasks.pop(key, None))
+            token, refreshed = await asyncio.shield(task)
+            refreshed = leader and refreshed
+            span.set(refreshed=refreshed)
+        if not refreshed:
+            self.set_token(token)
+            return token
+        self.store_token(token)
+        if callback:
+            callback(token)
+        return token
+
+    async def request(self, url, method=None, auto_refresh_token=True, refresh_token_callback=None, **kwargs):
+        try:
+            response = await self.send_request(url, method, **kwargs)
+        except TokenExpiredError:
+            if not (auto_refresh_token and self.client.refresh_token):
+                raise
+            await self.refresh_token_once(refresh_token_callback or self.refresh_token_callback)
+            return await self.request(url, method, **kwargs)
+        response.raise_for_status()
+        return response
+
+
+class AsyncProfileMixin(ProfileMixin):
+
+    async def get_profile(self):
+        with self.instrument("profile"):
+            resource_urls = self.get_profile_resource_urls()
+            names = list(resource_urls)
+            responses = await asyncio.gather(self.request(self.profile_url), *[self.request(resource_urls[name]) for name in names])
+            resources = dict(zip(names, [self.normalize_profile_response(response) for response in responses[1:]]))
+            return self.build_profile(self.normalize_profile_response(responses[0]), **resources)
+
+
+class AsyncGoogle(AsyncProfileMixin, AsyncOAuth2Consumer, Google):
+    name = Google.name
+    verbose_name = Google.verbose_name
+
+
+class AsyncFacebook(AsyncProfileMixin, AsyncOAuth2Consumer, Facebook):
+    name = Facebook.name
+    verbose_name = Facebook.verbose_name
+
+
+class AsyncLinkedIn(AsyncProfileMixin, AsyncOAuth2Consumer, LinkedIn):
+    name = LinkedIn.name
+    verbose_name = LinkedIn.verbose_name
+
+
+class AsyncGitHub(AsyncProfileMixin, AsyncOAuth2Consumer, GitHub):
+    name = GitHub.name
+    verbose_name = GitHub.verbose_name
+
+
+class AsyncBitbucket(AsyncProfileMixin, AsyncOAuth1Consumer, Bitbucket):
+    name = Bitbucket.name
+    verbose_name = Bitbucket.verbose_name
@@ -4,6 +4,12 @@ from __future__ import unicode_literals, absolute_import, print_function
 import re
 import six
 
+from .sessions import default_session_pool
+from .concurrency import imap_unordered
+from .decoding import decode_json
+from .instrumentation import Span, NULL_SPAN, strip_query
+from .pagination import LinkHeaderPaginator, paginate
+
 
 def python_2_unicode_compatible(klass):
     """
@@ -38,6 +44,15 @@ class MetaAuthConsumer(type):
 @python_2_unicode_compatible
 class BaseAuthConsumer(six.with_metaclass(MetaAuthConsumer)):
 
+    session_pool = None
+    response_cache = None
+    rate_limiter = None
+    retry_policy = None
+    observers = ()
+    token_store = None
+    token_key = None
+    paginator = LinkHeaderPaginator()
+
     def dance(self, stash, redirect_uri):  # pragma: no cover
         """
         Return OAuth flow instance
@@ -54,6 +69,119 @@ class BaseAuthConsumer(six.with_metaclass(MetaAuthConsumer)):
     def request(self, uri, method=None, headers=None, **params):  # pragma: no cover
         raise NotImplementedError()
 
+    def bind_token(self, token):  # pragma: no cover
+        """
+        Bind a normalised token to a view (see view), without altering the consumer it was copied from
+
+        """
+        raise NotImplementedError()
+
+    def view(self, token=None, **attrs):
+        """
+        Return a lightweight copy of this consumer bound to token, sharing its configuration and signing state
+
+        :attrs: attributes to override on the copy, e.g. refresh_token_callback
+
+        """
+        consumer = self.__class__.__new__(self.__class__)
+        consumer.__dict__.update(self.__dict__)
+        consumer.__dict__.update(attrs)
+        consumer.bind_token(token if token is not None else consumer.load_token())
+        return consumer
+
+    def load_token(self):
+        """
+        Return the token stored under token_key in token_store (None if not bound to a store)
+
+        """
+        if self.token_store is None or self.token_key is None:
+            return None
+        return self.token_store.get(self.token_key)
+
+    def store_token(self, token):
+        """
+        Write token back to token_store under token_key (if bound to a store)
+
+        """
+        if self.token_store is not None and self.token_key is not None:
+            self.token_store.set(self.token_key, token)
+
+    def get_session_pool(self):
+        """
+        Connection pool used to talk to the provider (shared by default)
+
+        """
+        return self.session_pool or default_session_pool
+
+    def http_request(self, method, url, **kwargs):
+        """
+        Send an already signed request over a pooled keep-alive connection
+
+        """
+        with self.instrument("http", method=method, url=strip_query(url)) as span:
+            response = self.get_session_pool().request(method, url, retry=self.retry_policy, on_retry=span.on_retry, **kwargs)
+            span.set(status=response.status_code)
+            return response
+
+    def instrument(self, stage, **info):
+        """
+        Span timing stage for the observers (a no-op when there are none), see uniauth.instrumentation
+
+        """
+        if not self.observers:
+            return NULL_SPAN
+        return Span(self, stage, info)
+
+    def send_request(self, url, method=None, rate_limit_mode=None, **kwargs):
+        """
+        Prepare and send a resource request
+
+        GET requests go through the response cache (if any, except streamed ones) and every request sent is paced by
+        the rate limiter (if any).
+
+        """
+        limiter = self.rate_limiter
+        key = limiter.get_key(self) if limiter is not None else None
+
+        def send(conditional_headers=None):
+            if limiter is not None:
+                limiter.acquire(key, rate_limit_mode)
+            if conditional_headers:
+                kwargs["headers"] = dict(kwargs.get("headers") or {}, **conditional_headers)
+            response = self.http_request(**self.prepare_request(url, method, **kwargs))
+            if limiter is not None:
+                limiter.update(key, response)
+            return response
+
+        with self.instrument("request", method=method or self.request_method, url=strip_query(url)) as span:
+            if self.response_cache is None or (method or self.request_method).upper() != "GET" or kwargs.get("stream"):
+                response = send()
+            else:
+                response = self.response_cache.fetch(self, url, kwargs.get("params"), send)
+            span.set(status=response.status_code)
+            return response
+
+    def paginate(self, url, method=None, params=None, paginator=None, prefetch=True, **kwargs):
+        """
+        Iterate over the items of a paginated resource, following the provider's pagination (see uniauth.pagination)
+
+        The next page is fetched in the background while the items of the current one are consumed (unless prefetch
+        is False), so at most two pages are held in memory. Tokens expiring during the walk are refreshed by request.
+
+        """
+        def fetch(url, params):
+            return self.request(url, method, params=params or {}, **kwargs)
+        return paginate(fetch, paginator or self.paginator, url, params, prefetch)
+
+    def get_rate_limit_budget(self):
+        """
+        Return current uniauth.ratelimit.RateLimitBudget (None without rate limiter)
+
+        """
+        if self.rate_limiter is None:
+            return None
+        return self.rate_limiter.budget(self.rate_limiter.get_key(self))
+
     def __str__(self):
         return self.verbose_name
 
@@ -74,6 +202,8 @@ class BaseAuthDance(object):
 
 class ProfileMixin(object):
 
+    profile_resource_urls = {}
+
     @property
     def profile_url(self):  # pragma: no cover
         """
@@ -86,6 +216,8 @@ class ProfileMixin(object):
         """
         Return normalized data
 
+        Responses of profile_resource_urls are passed as keyword arguments named after their key.
+
         E.g.::
             return {"uid": data.get("id"),
                     "email": None,
@@ -101,7 +233,32 @@ class ProfileMixin(object):
         raise NotImplementedError()
 
     def normalize_profile_response(self, response):
-        return response.json()
+        return decode_json(response)
+
+    def get_profile_resource_urls(self):
+        """
+        Extra resources needed to normalise the profile, fetched concurrently with profile_url
+
+        E.g.::
+            return {"emails": "https://example.org/user/emails"}
+
+        """
+        return self.profile_resource_urls
 
     def get_profile(self):
-        return self.normalize_profile_data(self.normalize_profile_response(self.request(self.profile_url)))
+        with self.instrument("profile"):
+            resource_urls = self.get_profile_resource_urls()
+            if not resource_urls:
+                return self.build_profile(self.normalize_profile_response(self.request(self.profile_url)))
+
+            resources = {}
+            requests = [(None, self.profile_url)] + list(resource_urls.items())
+            for (name, url), response, error in imap_unordered(lambda request: self.request(request[1]), requests, workers=len(requests)):
+                if error is not None:
+                    raise error
+                resources[name] = self.normalize_profile_response(response)
+            return self.build_profile(resources.pop(None), **resources)
+
+    def build_profile(self, data, **resources):
+        with self.instrument("normalize_profile"):
+            return self.normalize_profile_data(data, **resources)
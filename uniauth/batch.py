@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import io
+import json
+import requests
+from collections import namedtuple
+from oauthlib.oauth2.rfc6749.errors import OAuth2Error
+
+from .concurrency import imap_unordered, HostLimiter
+from .decoding import decode_json
+
+__all__ = ["ProfileResult", "fetch_profiles", "RefreshResult", "RefreshCheckpoint", "MissingRefreshToken",
+           "is_permanent_error", "refresh_tokens"]
+
+PERMANENT_ERRORS = frozenset(["invalid_grant", "invalid_client", "unauthorized_client", "unsupported_grant_type"])
+
+
+class ProfileResult(namedtuple("ProfileResult", ["provider", "token", "profile", "error"])):
+    """
+    Outcome of fetching one profile: either profile (normalised) or error is set
+
+    """
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def fetch_profiles(items, workers=10, per_host=None, rate=None):
+    """
+    Fetch and normalise the profiles of many (provider, token) pairs concurrently
+
+    Results are yielded as they complete (not in input order) and errors are reported per item.
+
+    :items: iterable of (provider, token) pairs where provider is called with token=token to build the consumer,
+            e.g. functools.partial(Google, client_id="...", client_secret="...", scope=None)
+    :workers: maximum number of profiles fetched in parallel
+    :per_host: maximum number of requests in flight per provider host
+    :rate: maximum requests per second per provider host
+
+    """
+    limiter = HostLimiter(concurrency=per_host, rate=rate)
+
+    def fetch(item):
+        provider, token = item
+        consumer = provider(token=token)
+        with limiter.limit(consumer.profile_url):
+            return consumer.get_profile()
+
+    for (provider, token), profile, error in imap_unordered(fetch, items, workers=workers):
+        yield ProfileResult(provider, token, profile, error)
+
+
+class MissingRefreshToken(Exception):
+    """
+    Raised when refreshing a token without refresh token
+
+    """
+
+
+def is_permanent_error(error):
+    """
+    Whether a refresh error means the token can never be refreshed (revoked or invalid grant, invalid client...)
+
+    Other errors (network errors, 5xx, rate limits) are transient and worth retrying later.
+
+    """
+    if isinstance(error, MissingRefreshToken):
+        return True
+    if isinstance(error, OAuth2Error):
+        return error.error in PERMANENT_ERRORS
+    response = getattr(error, "response", None)
+    if isinstance(error, requests.HTTPError) and response is not None and response.status_code in (400, 401):
+        try:
+            return decode_json(response).get("error") in PERMANENT_ERRORS
+        except (ValueError, AttributeError):
+            return False
+    return False
+
+
+class RefreshResult(namedtuple("RefreshResult", ["key", "provider", "token", "refreshed", "error"])):
+    """
+    Outcome of refreshing one token: either refreshed (normalised token) or error is set
+
+    """
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def permanent(self):
+        """
+        Whether the token can't be refreshed anymore (e.g. revoked), as opposed to a transient failure
+
+        """
+        return self.error is not None and is_permanent_error(self.error)
+
+
+def _load_key(value):
+    """
+    Key written to a checkpoint by json.dumps, with JSON arrays turned back into (hashable) tuples
+
+    """
+    if isinstance(value, list):
+        return tuple(_load_key(item) for item in value)
+    return value
+
+
+class RefreshCheckpoint(object):
+    """
+    Keys of the tokens already processed by refresh_tokens, appended to a file so a restarted run skips them
+
+    Refreshed tokens and permanent failures are recorded, transient failures are not (they are retried). Keys are
+    stored as JSON: strings, numbers and tuples of them (read back as tuples) are supported. Close it when done, or use it as a context manager.
+
+    :path: checkpoint file, created if missing
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._keys = set()
+        try:
+            with io.open(path, encoding="utf-8") as f:
+                self._keys.update(_load_key(json.loads(line)) for line in f if line.endswith("\n"))
+        except IOError:
+            pass
+        self._file = None
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        if self._file is None:
+            self._file = io.open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(key) + "\n")
+        self._file.flush()
+        self._keys.add(key)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def refresh_tokens(items, workers=10, per_host=None, rate=None, checkpoint=None):
+    """
+    Refresh many OAuth2 tokens concurrently
+
+    Results are yielded as they complete (not in input order). Items are read lazily so arbitrarily large token
+    populations run in bounded memory. Requests are bounded and paced per provider token endpoint host, and refreshes
+    go through the consumers' refresh coordinator and token store (see uniauth.stores).
+
+    E.g.::
+        factory = get_factory(Google, client_id="...", client_secret="...", scope=None, token_store=store)
+        for result in refresh_tokens((key, factory, token) for key, token in store.expiring(within=600)):
+            if result.permanent:
+                store.delete(result.key)
+
+    :items: iterable of (key, provider, token) where provider is called with token=token and token_key=key to build
+            the consumer, e.g. a uniauth.factory.ConsumerFactory
+    :workers: maximum number of tokens refreshed in parallel
+    :per_host: maximum number of refreshes in flight per provider host
+    :rate: maximum refreshes per second per provider host
+    :checkpoint: RefreshCheckpoint instance or path (closed when done), keys already in it are skipped
+
+    """
+    owned = checkpoint is not None and not isinstance(checkpoint, RefreshCheckpoint)
+    if owned:
+        checkpoint = RefreshCheckpoint(checkpoint)
+    limiter = HostLimiter(concurrency=per_host, rate=rate)
+
+    def refresh(item):
+        key, provider, token = item
+        consumer = provider(token=token, token_key=key)
+        if not consumer.client.refresh_token:
+            raise MissingRefreshToken("No refresh token")
+        with limiter.limit(consumer.access_token_url):
+            return consumer.refresh_token_once()
+
+    if checkpoint is not None:
+        items = (item for item in items if item[0] not in checkpoint)
+    try:
+        for (key, provider, token), refreshed, error in imap_unordered(refresh, items, workers=workers):
+            result = RefreshResult(key, provider, token, refreshed, error)
+            if checkpoint is not None and (result.ok or result.permanent):
+                checkpoint.add(key)
+            yield result
+    finally:
+        if owned:
+            checkpoint.close()
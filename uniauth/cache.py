@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .sessions import build_response
+
+__all__ = ["BaseCache", "MemoryCache", "ResponseCache"]
+
+
+class BaseCache(object):
+    """
+    Key/value cache backend
+
+    Implement it to share cached entries between processes (e.g. on top of redis or memcached).
+    Values are plain dicts of strings, numbers and bytes.
+
+    """
+
+    def get(self, key):  # pragma: no cover
+        """
+        Return value for key or None when missing or expired
+
+        """
+        raise NotImplementedError()
+
+    def set(self, key, value, ttl=None):  # pragma: no cover
+        """
+        Store value for key during ttl seconds (forever if None)
+
+        """
+        raise NotImplementedError()
+
+    def delete(self, key):  # pragma: no cover
+        raise NotImplementedError()
+
+    def pop(self, key):
+        """
+        Delete key and return its value (or None), override to make it atomic
+
+        """
+        value = self.get(key)
+        if value is not None:
+            self.delete(key)
+        return value
+
+    def add(self, key, value, ttl=None):
+        """
+        Store value for key unless it's already set, return whether it was stored (override to make it atomic)
+
+        """
+        if self.get(key) is not None:
+            return False
+        self.set(key, value, ttl)
+        return True
+
+
+class MemoryCache(BaseCache):
+    """
+    Thread-safe in-memory cache with TTL and LRU eviction
+
+    :max_entries: maximum number of entries, least recently used entries are evicted first
+    :ttl: default ttl in seconds (None for no expiry)
+
+    """
+
+    def __init__(self, max_entries=1000, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                return None
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.time() + ttl if ttl is not None else None)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def pop(self, key):
+        with self._lock:
+            value, expires_at = self._entries.pop(key, (None, None))
+            if expires_at is not None and expires_at <= time.time():
+                return None
+            return value
+
+    def add(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                return False
+            self._entries.pop(key, None)
+            self._entries[key] = (value, now + ttl if ttl is not None else None)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+
+class ResponseCache(object):
+    """
+    Cache of resource GET responses, keyed by provider, token and url
+
+    Fresh responses (younger than ttl) are served without any request. Older ones are revalidated with
+    If-None-Match / If-Modified-Since so providers can answer 304 Not Modified.
+
+    :backend: BaseCache instance (defaults to a MemoryCache)
+    :ttl: seconds during which a response is served without revalidation
+    :max_age: seconds during which a response is kept for revalidation
+
+    """
+
+    def __init__(self, backend=None, ttl=60, max_age=24 * 3600):
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttl = ttl
+        self.max_age = max_age
+
+    def get_key(self, consumer, url, params=None):
+        identity = "\n".join([consumer.name, consumer.get_token().get("token") or "", url] +
+                             ["{0}={1}".format(key, value) for key, value in sorted((params or {}).items())])
+        return "uniauth:response:{0}".format(hashlib.sha256(identity.encode("utf-8")).hexdigest())
+
+    def lookup(self, key):
+        """
+        Return (entry, response): response is set when the entry is fresh
+
+        """
+        entry = self.backend.get(key)
+        if entry is not None and time.time() - entry["stored_at"] < self.ttl:
+            return entry, self.build_response(entry)
+        return entry, None
+
+    def get_conditional_headers(self, entry):
+        headers = {}
+        if entry is not None and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry is not None and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def update(self, key, entry, response):
+        """
+        Store response (or refresh entry on 304), return the response to hand to the caller
+
+        """
+        if response.status_code == 304 and entry is not None:
+            entry = dict(entry, stored_at=time.time())
+            self.backend.set(key, entry, self.max_age)
+            return self.build_response(entry)
+        if response.status_code == 200:
+            self.backend.set(key, {"url": response.url,
+                                   "headers": list(response.headers.items()),
+                                   "content": response.content,
+                                   "etag": response.headers.get("etag"),
+                                   "last_modified": response.headers.get("last-modified"),
+                                   "stored_at": time.time()}, self.max_age)
+        return response
+
+    def build_response(self, entry):
+        return build_response(entry["url"], 200, "OK", entry["headers"], entry["content"])
+
+    def fetch(self, consumer, url, params, send):
+        """
+        Return cached response for url or call send(conditional_headers) to get it
+
+        """
+        key = self.get_key(consumer, url, params)
+        entry, response = self.lookup(key)
+        if response is not None:
+            return response
+        return self.update(key, entry, send(self.get_conditional_headers(entry)))
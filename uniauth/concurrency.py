@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import threading
+import contextlib
+from six.moves import queue
+from oauthlib.common import urlparse
+
+__all__ = ["imap_unordered", "HostLimiter"]
+
+_STOP = object()
+
+
+def imap_unordered(func, iterable, workers=10):
+    """
+    Apply func to every item of iterable on worker threads
+
+    Yields (item, result, error) tuples as soon as each call completes. At most 2 x workers items are read
+    ahead from iterable, so arbitrarily large (or infinite) iterables run in bounded memory. Closing the
+    generator early lets the calls in flight finish and stops the workers.
+
+    """
+    tasks = queue.Queue()
+    results = queue.Queue()
+
+    def run():
+        while True:
+            item = tasks.get()
+            if item is _STOP:
+                return
+            try:
+                results.put((item, func(item), None))
+            except Exception as e:
+                results.put((item, None, e))
+
+    threads = [threading.Thread(target=run) for _ in range(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    pending = 0
+    try:
+        for item in iterable:
+            if pending >= workers * 2:
+                yield results.get()
+                pending -= 1
+            tasks.put(item)
+            pending += 1
+        while pending:
+            yield results.get()
+            pending -= 1
+    finally:
+        for _ in threads:
+            tasks.put(_STOP)
+
+
+class HostLimiter(object):
+    """
+    Bounds concurrent requests (and optionally request rate) per host
+
+    :concurrency: maximum requests in flight per host (None for unbounded)
+    :rate: maximum requests per second per host (None for unbounded)
+
+    """
+
+    def __init__(self, concurrency=None, rate=None):
+        self.concurrency = concurrency
+        self.rate = rate
+        self._semaphores = {}
+        self._next_slots = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def limit(self, url):
+        host = urlparse.urlparse(url).netloc.lower()
+        semaphore = self._get_semaphore(host)
+        if semaphore is not None:
+            semaphore.acquire()
+        try:
+            self._wait_for_slot(host)
+            yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    def _get_semaphore(self, host):
+        if self.concurrency is None:
+            return None
+        with self._lock:
+            return self._semaphores.setdefault(host, threading.BoundedSemaphore(self.concurrency))
+
+    def _wait_for_slot(self, host):
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_slots.get(host, now))
+            self._next_slots[host] = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
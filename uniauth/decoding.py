@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+from importlib import import_module
+from six.moves.urllib.parse import parse_qsl
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+__all__ = ["JSON_BACKENDS", "set_json_backend", "get_json_backend", "loads", "decode_json", "decode_form_or_json", "ChunkReader", "iter_items"]
+
+JSON_BACKENDS = ("orjson", "ujson", "simplejson", "json")
+
+_backend = None
+_loads = None
+
+
+def set_json_backend(*names):
+    """
+    Decode JSON with the first importable module of names (see JSON_BACKENDS), returns its name
+
+    E.g. set_json_backend("json") to use the standard library only.
+
+    """
+    global _backend, _loads
+    for name in names or JSON_BACKENDS:
+        try:
+            module = import_module(name)
+        except ImportError:
+            continue
+        _backend, _loads = name, module.loads
+        return name
+    raise ImportError("None of the JSON backends {0} is installed".format(", ".join(names)))
+
+
+def get_json_backend():
+    """
+    Name of the module decoding JSON
+
+    """
+    return _backend
+
+
+def loads(data):
+    """
+    Decode a JSON document (bytes or text), raising ValueError when invalid
+
+    """
+    if _backend == "json" and isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return _loads(data)
+
+
+def decode_json(response):
+    """
+    Decoded JSON body of response, parsed once from its raw bytes and kept on the response
+
+    Decoding again (e.g. by a paginator, then by the caller) returns the same object.
+
+    """
+    data = response.__dict__.get("_uniauth_json", response)
+    if data is response:
+        data = response._uniauth_json = loads(response.content)
+    return data
+
+
+def decode_form_or_json(body):
+    """
+    Decode a JSON or form encoded body (bytes or text) to a dict, like oauthlib does for token responses
+
+    """
+    try:
+        data = loads(body)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        return data
+    if isinstance(body, bytes):
+        body = body.decode("utf-8")
+    return dict(parse_qsl(body))
+
+
+class ChunkReader(object):
+    """
+    File-like reader over an iterator of byte chunks, e.g. response.iter_content() (decompressed as it's read)
+
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def read(self, size=-1):
+        while size is None or size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size is None or size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def iter_items(response, prefix="item", chunk_size=64 * 1024):
+    """
+    Iterate over the items of the JSON array at prefix (ijson notation, e.g. "items.item") without decoding the whole body
+
+    Parses incrementally with ijson when it's installed, from the network for streamed responses (requested with
+    stream=True, e.g. consumer.request(url, stream=True)), so only one item is held in memory at a time.
+    Falls back to decoding the whole body otherwise.
+
+    """
+    if ijson is not None:
+        for item in ijson.items(ChunkReader(response.iter_content(chunk_size)), prefix):
+            yield item
+        return
+
+    data = decode_json(response)
+    for key in prefix.split(".")[:-1]:
+        data = data.get(key) or {}
+    for item in data or ():
+        yield item
+
+
+set_json_backend(*JSON_BACKENDS)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import threading
+
+from .cache import MemoryCache
+
+__all__ = ["ConsumerFactory", "FactoryRegistry", "default_factory_registry", "get_factory"]
+
+
+class ConsumerFactory(object):
+    """
+    Immutable configuration of a consumer class for one set of client credentials, building per-token consumers
+
+    The configured consumer (prototype) and its oauthlib client are built once and shared by the consumers the factory
+    builds, which only carry their token.
+
+    :consumer_class: e.g. uniauth.consumers.GitHub
+    :config: consumer constructor arguments, except token (client_id, client_secret, scope, session_pool...)
+
+    """
+
+    def __init__(self, consumer_class, **config):
+        self.consumer_class = consumer_class
+        self._config = config
+        self.prototype = consumer_class(**config)
+
+    @property
+    def config(self):
+        return dict(self._config)
+
+    @property
+    def key(self):
+        return self.consumer_class.name, self._config.get("client_id")
+
+    def __call__(self, token=None, **attrs):
+        """
+        Return a consumer bound to token (normalised)
+
+        :attrs: attributes to override on the consumer, e.g. refresh_token_callback
+
+        """
+        return self.prototype.view(token, **attrs)
+
+
+class FactoryRegistry(object):
+    """
+    Thread-safe registry of consumer factories keyed by (provider name, client_id), e.g. one per tenant
+
+    Factories share the session pool they are configured with (the default one unless given), so tenants of the same
+    provider share connections to its hosts.
+
+    :max_factories: maximum number of factories kept, the least recently used ones are evicted first (and rebuilt on
+                    next use)
+
+    """
+
+    def __init__(self, max_factories=1000):
+        self.max_factories = max_factories
+        self._factories = MemoryCache(max_entries=max_factories)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._factories)
+
+    def get_factory(self, consumer_class, **config):
+        """
+        Return the factory of consumer_class and config, built on first use or when config changed
+
+        """
+        key = (consumer_class.name, config.get("client_id"))
+        factory = self._factories.get(key)
+        if factory is None or factory.consumer_class is not consumer_class or factory._config != config:
+            with self._lock:
+                factory = self._factories.get(key)
+                if factory is None or factory.consumer_class is not consumer_class or factory._config != config:
+                    factory = ConsumerFactory(consumer_class, **config)
+                    self._factories.set(key, factory)
+        return factory
+
+    def remove(self, name, client_id):
+        self._factories.delete((name, client_id))
+
+    def clear(self):
+        with self._lock:
+            self._factories = MemoryCache(max_entries=self.max_factories)
+
+
+default_factory_registry = FactoryRegistry()
+
+
+def get_factory(consumer_class, **config):
+    """
+    Return the factory of consumer_class and config from the default registry
+
+    E.g.::
+        consumer = get_factory(GitHub, client_id="...", client_secret="...", scope=None)(token=token)
+
+    """
+    return default_factory_registry.get_factory(consumer_class, **config)
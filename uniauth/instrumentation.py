@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import logging
+import threading
+from timeit import default_timer
+
+__all__ = ["BaseObserver", "StatsObserver", "StageEvent", "Span", "NULL_SPAN", "strip_query"]
+
+logger = logging.getLogger(__name__)
+
+
+class StageEvent(object):
+    """
+    One stage of a consumer call, passed to observers when it starts and when it finishes
+
+    Stages: authorization_url, request_token, access_token, refresh_token, profile, normalize_profile,
+    request (a resource request), http (a request sent, retries included) and sign (oauthlib signing).
+
+    :consumer: consumer instance
+    :provider: consumer name
+    :stage: stage name
+    :info: stage details (method, url, status, retries, refreshed...)
+    :started: default_timer() value when the stage started
+    :duration: seconds, set when the stage finished
+    :error: exception raised by the stage, if any
+    :data: free storage for observers, e.g. a tracing span
+
+    """
+
+    __slots__ = ("consumer", "provider", "stage", "info", "started", "duration", "error", "data")
+
+    def __init__(self, consumer, stage, info):
+        self.consumer = consumer
+        self.provider = consumer.name
+        self.stage = stage
+        self.info = info
+        self.started = None
+        self.duration = None
+        self.error = None
+        self.data = {}
+
+
+class BaseObserver(object):
+    """
+    Receives the StageEvents of the consumers it is attached to (observers=[...])
+
+    Called synchronously on the thread (or event loop) of the call, so implementations should be quick.
+    Exceptions raised by observers are logged and never interrupt the call.
+
+    """
+
+    def stage_started(self, event):
+        pass
+
+    def stage_finished(self, event):
+        pass
+
+
+class StatsObserver(BaseObserver):
+    """
+    Aggregates count, errors, durations, retries and refreshes per provider and stage in memory
+
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def stage_finished(self, event):
+        with self._lock:
+            stats = self._stats.get((event.provider, event.stage))
+            if stats is None:
+                stats = self._stats[(event.provider, event.stage)] = {"count": 0, "errors": 0, "total_duration": 0.0, "max_duration": 0.0,
+                                                                      "retries": 0, "refreshed": 0}
+            stats["count"] += 1
+            stats["errors"] += event.error is not None
+            stats["total_duration"] += event.duration
+            stats["max_duration"] = max(stats["max_duration"], event.duration)
+            stats["retries"] += event.info.get("retries", 0)
+            stats["refreshed"] += bool(event.info.get("refreshed"))
+
+    def get_stats(self):
+        """
+        Return {(provider, stage): {count, errors, total_duration, max_duration, retries, refreshed}}
+
+        """
+        with self._lock:
+            return dict((key, dict(stats)) for key, stats in self._stats.items())
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def notify(observers, method, event):
+    for observer in observers:
+        try:
+            getattr(observer, method)(event)
+        except Exception:
+            logger.exception("Observer %r failed on %s", observer, method)
+
+
+class Span(object):
+    """
+    Context manager timing a stage and notifying the observers of the consumer
+
+    """
+
+    __slots__ = ("event", "observers")
+
+    def __init__(self, consumer, stage, info):
+        self.observers = consumer.observers
+        self.event = StageEvent(consumer, stage, info)
+
+    def set(self, **info):
+        self.event.info.update(info)
+
+    def on_retry(self, delay, response=None, error=None):
+        self.event.info["retries"] = self.event.info.get("retries", 0) + 1
+
+    def __enter__(self):
+        self.event.started = default_timer()
+        notify(self.observers, "stage_started", self.event)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.event.duration = default_timer() - self.event.started
+        self.event.error = exc_value
+        notify(reversed(self.observers), "stage_finished", self.event)
+        return False
+
+
+class NullSpan(object):
+    """
+    Span used when a consumer has no observers
+
+    """
+
+    __slots__ = ()
+
+    on_retry = None
+
+    def set(self, **info):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def strip_query(url):
+    """
+    Url without query string, which can carry signatures and tokens
+
+    """
+    return url.split("?", 1)[0]
@@ -1,24 +1,167 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals, absolute_import, print_function
 
-import requests
+import time
+import logging
+import threading
 from copy import copy
+from collections import deque
+from six.moves import queue
 from oauthlib import oauth1
 from oauthlib.common import urldecode, add_params_to_uri, urlparse
 
 from .base import BaseAuthConsumer, BaseAuthDance
+from .cache import MemoryCache
+from .tokens import Token
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTokenPool(object):
+    """
+    Request tokens fetched ahead of time in the background, so a dance can redirect without waiting for the provider
+
+    Request tokens are bound to their callback uri, so the pool keeps tokens per consumer credentials and callback
+    uri. Tokens older than max_age are discarded (providers expire unused request tokens after a few minutes).
+    A dance falls back to fetching a request token itself when the pool is empty.
+
+    :size: number of request tokens kept ready per consumer and callback uri
+    :max_age: seconds after which a prefetched request token is discarded
+    :workers: number of threads fetching request tokens
+    :redirect_uris: callback uris to prefetch request tokens for (None for any), so callback uris varying per request
+                    (e.g. with a ?next= parameter) don't trigger prefetches that are never used
+    :max_keys: maximum number of (consumer credentials, callback uri) kept, least recently used ones are dropped first
+
+    """
+
+    def __init__(self, size=5, max_age=120, workers=1, redirect_uris=None, max_keys=100):
+        self.size = size
+        self.max_age = max_age
+        self.workers = workers
+        self.redirect_uris = frozenset(redirect_uris) if redirect_uris is not None else None
+        self._entries = MemoryCache(max_entries=max_keys)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._threads = []
+
+    @staticmethod
+    def get_key(consumer, redirect_uri):
+        return consumer.name, consumer.client_key, redirect_uri
+
+    def accepts(self, redirect_uri):
+        return self.redirect_uris is None or redirect_uri in self.redirect_uris
+
+    def get_entry(self, key):
+        """
+        Return [tokens, pending fetches] of key, with expired tokens dropped (call with the lock held)
+
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = [deque(), 0]
+            self._entries.set(key, entry)
+        tokens, expired = entry[0], time.time() - self.max_age
+        while tokens and tokens[0][0] <= expired:
+            tokens.popleft()
+        return entry
+
+    def get(self, consumer, redirect_uri):
+        """
+        Return a prefetched request token for consumer and redirect_uri (None when there's none), and refill the pool
+
+        """
+        if not self.accepts(redirect_uri):
+            return None
+        with self._lock:
+            tokens = self.get_entry(self.get_key(consumer, redirect_uri))[0]
+            request_token = tokens.popleft()[1] if tokens else None
+        self.refill(consumer, redirect_uri)
+        return request_token
+
+    def refill(self, consumer, redirect_uri):
+        """
+        Fetch request tokens in the background until size tokens are ready for consumer and redirect_uri
+
+        """
+        if not self.accepts(redirect_uri):
+            return
+        key = self.get_key(consumer, redirect_uri)
+        with self._lock:
+            entry = self.get_entry(key)
+            missing = self.size - len(entry[0]) - entry[1]
+            if missing <= 0:
+                return
+            entry[1] += missing
+            self._start()
+        for _ in range(missing):
+            self._queue.put((key, consumer, redirect_uri))
+
+    def available(self, consumer, redirect_uri):
+        """
+        Number of fresh request tokens ready for consumer and redirect_uri
+
+        """
+        key = self.get_key(consumer, redirect_uri)
+        with self._lock:
+            return len(self.get_entry(key)[0]) if self._entries.get(key) is not None else 0
+
+    def wait(self):
+        """
+        Block until the request tokens being fetched are ready, e.g. to warm the pool up on startup
+
+        """
+        self._queue.join()
+
+    def fetch(self, consumer, redirect_uri):
+        """
+        Fetch a request token, always blocking (the pool fetches on its own threads, also for asyncio consumers)
+
+        """
+        with consumer.instrument("request_token", prefetch=True):
+            request = consumer.prepare_request_token_request(redirect_uri)
+            return consumer.parse_request_token_response(BaseAuthConsumer.http_request(consumer, **request))
+
+    def _start(self):
+        if self._threads:
+            return
+        self._threads.extend(threading.Thread(target=self._run_worker, name="uniauth-request-token-{0}".format(i)) for i in range(self.workers))
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def _run_worker(self):
+        while True:
+            key, consumer, redirect_uri = self._queue.get()
+            try:
+                token = self.fetch(consumer, redirect_uri)
+            except Exception:
+                logger.warning("Prefetching %s request token failed", consumer.name, exc_info=True)
+                token = None
+            with self._lock:
+                # The entry may have been evicted meanwhile, the token is dropped with it then
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry[1] -= 1
+                    if token is not None:
+                        entry[0].append((time.time(), token))
+            del consumer
+            self._queue.task_done()
 
 
 class OAuth1Dance(BaseAuthDance):
 
     @property
     def _request_token_stash_key(self):
-        return "oauth1_request_token_{0}".format(self.client.__class__.__name__.lower())
+        return "oauth1_request_token_{0}".format(self.client.name)
 
     def get_authorization_url(self, **params):
-        request_token = self.client.get_request_token(self.redirect_uri)
-        self.stash[self._request_token_stash_key] = request_token
-        return self.client.get_authorization_url(request_token)
+        with self.client.instrument("authorization_url") as span:
+            request_token = self.client.get_pooled_request_token(self.redirect_uri)
+            span.set(pooled=request_token is not None)
+            if request_token is None:
+                request_token = self.client.get_request_token(self.redirect_uri)
+            self.stash[self._request_token_stash_key] = request_token
+            return self.client.get_authorization_url(request_token)
 
     def get_access_token(self, callback_uri):
         return self.client.get_access_token(callback_uri, self.stash.pop(self._request_token_stash_key, None))
@@ -34,14 +177,32 @@ class OAuth1Consumer(BaseAuthConsumer):
     request_method = "get"
     request_extra_params = {}
 
-    def __init__(self, client_id, client_secret, token=None, **client_kwargs):
+    request_token_pool = None
+
+    def __init__(self, client_id, client_secret, token=None, session_pool=None, response_cache=None, rate_limiter=None, retry_policy=None, observers=None,
+                 token_store=None, token_key=None, request_token_pool=None, **client_kwargs):
+        if session_pool is not None:
+            self.session_pool = session_pool
+        if response_cache is not None:
+            self.response_cache = response_cache
+        if rate_limiter is not None:
+            self.rate_limiter = rate_limiter
+        if retry_policy is not None:
+            self.retry_policy = retry_policy
+        if observers is not None:
+            self.observers = tuple(observers)
+        if token_store is not None:
+            self.token_store = token_store
+        if request_token_pool is not None:
+            self.request_token_pool = request_token_pool
+        self.token_key = token_key
         self.client_key = client_id
         self.client_secret = client_secret
         self.client = self.client_class(client_key=self.client_key, client_secret=self.client_secret,
                                         signature_method=self.signature_method, signature_type=self.signature_type,
                                         **client_kwargs)
 
-        self.set_token(self.denormalize_token_data(token))
+        self.set_token(self.denormalize_token_data(token if token is not None else self.load_token()))
 
     @property
     def request_token_url(self):  # pragma: no cover
@@ -78,25 +239,36 @@ class OAuth1Consumer(BaseAuthConsumer):
         if not data:
             return
 
-        return {"oauth_token": data.get("token"),
-                "oauth_token_secret": data.get("extra")}
+        return Token.coerce(data).to_oauth1()
 
     def normalize_token_data(self, token):
         """
-        Transforms token into a generic format
+        Transforms token into a generic format (a uniauth.tokens.Token)
 
         """
-        token = copy(token)
-        return {"token": token.get("oauth_token"),
-                "extra": token.get("oauth_token_secret"),
-                "expires_at": None,
-                "scope": None}
+        return Token.from_oauth1(token)
 
     def set_token(self, token):
         if not token:
             return
-        self.client.resource_owner_key = token.get('oauth_token')
-        self.client.resource_owner_secret = token.get('oauth_token_secret')
+        self.client = self.copy_client(resource_owner_key=token.get('oauth_token'), resource_owner_secret=token.get('oauth_token_secret'))
+
+    def bind_token(self, token):
+        token = self.denormalize_token_data(token) or {}
+        self.client = self.copy_client(resource_owner_key=token.get('oauth_token'), resource_owner_secret=token.get('oauth_token_secret'))
+
+    def copy_client(self, **attrs):
+        """
+        Copy of the oauthlib client with attrs replaced
+
+        The client of the consumer is never changed in place (only replaced), so per-call state such as the callback
+        uri or the verifier lives on copies and one consumer can serve concurrent dances and requests.
+
+        """
+        client = copy(self.client)
+        for name, value in attrs.items():
+            setattr(client, name, value)
+        return client
 
     def get_request_token(self, redirect_uri):
         """
@@ -105,9 +277,29 @@ class OAuth1Consumer(BaseAuthConsumer):
         First step of OAuth1
 
         """
-        self.client.callback_uri = redirect_uri
-        uri, headers, body = self.client.sign(self.request_token_url)
-        response = requests.request(self.token_method, uri, headers=headers, data=body)
+        with self.instrument("request_token"):
+            return self.parse_request_token_response(self.http_request(**self.prepare_request_token_request(redirect_uri)))
+
+    def get_pooled_request_token(self, redirect_uri):
+        """
+        Request token prefetched by the request token pool (None without pool or when it's empty)
+
+        """
+        if self.request_token_pool is None:
+            return None
+        return self.request_token_pool.get(self, redirect_uri)
+
+    def prepare_request_token_request(self, redirect_uri):
+        """
+        Signed request (method, url, headers and data) for retrieving a request token
+
+        """
+        client = self.copy_client(callback_uri=redirect_uri)
+        with self.instrument("sign"):
+            uri, headers, body = client.sign(self.request_token_url)
+        return {"method": self.token_method, "url": uri, "headers": headers, "data": body, "idempotent": False}
+
+    def parse_request_token_response(self, response):
         response.raise_for_status()
         return dict(urldecode(response.text))
 
@@ -126,26 +318,46 @@ class OAuth1Consumer(BaseAuthConsumer):
 
         Third and last step of OAuth1
 
+        """
+        with self.instrument("access_token"):
+            return self.parse_access_token_response(self.http_request(**self.prepare_access_token_request(callback_uri, request_token)))
+
+    def prepare_access_token_request(self, callback_uri, request_token):
+        """
+        Signed request (method, url, headers and data) for exchanging the request token and verifier
+
         """
         verifier = dict(urldecode(urlparse.urlparse(callback_uri).query))
-        self.client.verifier = verifier.get('oauth_verifier')
-        self.client.resource_owner_key = request_token.get('oauth_token')
-        self.client.resource_owner_secret = request_token.get('oauth_token_secret')
-        uri, headers, body = self.client.sign(self.access_token_url)
-        response = requests.request(self.token_method, uri, headers=headers, data=body)
-        self.client.verifier = None
+        client = self.copy_client(verifier=verifier.get('oauth_verifier'), resource_owner_key=request_token.get('oauth_token'),
+                                  resource_owner_secret=request_token.get('oauth_token_secret'))
+        with self.instrument("sign"):
+            uri, headers, body = client.sign(self.access_token_url)
+        return {"method": self.token_method, "url": uri, "headers": headers, "data": body, "idempotent": False}
+
+    def parse_access_token_response(self, response):
         response.raise_for_status()
         token = dict(urldecode(response.text))
         self.set_token(token)
         return self.normalize_token_data(token)
 
     def request(self, url, method=None, **kwargs):
-        url, headers, body = self.client.sign(add_params_to_uri(url, self.get_request_extra_params(**kwargs.get("params", {}))),
-                                              http_method=method or self.request_method, headers=kwargs.get('headers', None), body=kwargs.get('data', None))
-        response = requests.request(method or self.request_method, url, headers=headers, data=body)
+        response = self.send_request(url, method, **kwargs)
         response.raise_for_status()
         return response
 
+    def prepare_request(self, url, method=None, **kwargs):
+        """
+        Signed request (method, url, headers, data, timeout and stream) for a resource
+
+        """
+        with self.instrument("sign"):
+            url, headers, body = self.client.sign(add_params_to_uri(url, self.get_request_extra_params(**kwargs.get("params", {}))),
+                                                  http_method=method or self.request_method, headers=kwargs.get('headers', None), body=kwargs.get('data', None))
+        request = {"method": method or self.request_method, "url": url, "headers": headers, "data": body, "timeout": kwargs.get('timeout', None)}
+        if kwargs.get('stream'):
+            request["stream"] = True
+        return request
+
     def get_request_extra_params(self, **kwargs):
         """
         Extra params for requesting resources
@@ -160,4 +372,5 @@ class OAuth1Consumer(BaseAuthConsumer):
         Return normalised token
 
         """
-        return self.normalize_token_data({"oauth_token": self.client.resource_owner_key, "oauth_token_secret": self.client.resource_owner_secret})
+        client = self.client
+        return Token(client.resource_owner_key, client.resource_owner_secret)
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+OAuth1 providers, importing only the OAuth1 stack of oauthlib
+
+"""
+from __future__ import unicode_literals, absolute_import, print_function
+
+from .base import ProfileMixin
+from .oauth1 import OAuth1Consumer
+
+__all__ = ["Bitbucket"]
+
+
+class Bitbucket(ProfileMixin, OAuth1Consumer):
+
+    request_token_url = "https://bitbucket.org/api/1.0/oauth/request_token"
+    authorization_url = "https://bitbucket.org/api/1.0/oauth/authenticate"
+    access_token_url = "https://bitbucket.org/api/1.0/oauth/access_token"
+    profile_url = "https://bitbucket.org/api/1.0/user"
+    profile_resource_urls = {"emails": "https://bitbucket.org/api/1.0/emails"}
+
+    def normalize_profile_data(self, data, emails=()):
+        email = next((entry.get('email') for entry in emails if entry.get('primary')), None)
+        return {"uid": data.get('user').get("username"),
+                "email": email,
+                "username": data.get('user').get("username"),
+                "first_name": data.get('user').get("first_name"),
+                "last_name": data.get('user').get("last_name"),
+                "gender": None,
+                "birthdate": None,
+                "avatar_url": data.get('user').get("avatar"),
+                "is_verified": False}
@@ -1,31 +1,139 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals, absolute_import, print_function
 
-import calendar
-import requests
-from copy import copy
-from datetime import datetime, timedelta
-from pytz import utc
+import six
+import hmac
+import time
+import base64
+import hashlib
+import threading
+from six.moves.urllib.parse import urlparse, parse_qsl, urlencode
 from oauthlib.common import urldecode, generate_token
 from oauthlib.oauth2.rfc6749.clients import WebApplicationClient
-from oauthlib.oauth2.rfc6749.errors import TokenExpiredError
+from oauthlib.oauth2.rfc6749.errors import TokenExpiredError, MismatchingStateError, MissingCodeError, InsecureTransportError, raise_from_error
+from oauthlib.oauth2.rfc6749.parameters import validate_token_parameters
+from oauthlib.oauth2.rfc6749.tokens import OAuth2Token
+from oauthlib.oauth2.rfc6749.utils import scope_to_list, is_secure_transport
 
 from .base import BaseAuthConsumer, BaseAuthDance
+from .decoding import decode_form_or_json
+from .refresh import default_refresh_coordinator, default_refresh_scheduler
+from .tokens import Token
+
+
+def parse_token_data(client, data):
+    """
+    Same as client.parse_request_body_response, for token response data already decoded
+
+    """
+    params = dict(data)
+    if "scope" in params:
+        params["scope"] = scope_to_list(params["scope"])
+    if params.get("expires_in") is not None:
+        params["expires_in"] = int(float(params["expires_in"]))
+        params["expires_at"] = time.time() + params["expires_in"]
+    token = OAuth2Token(params, old_scope=client.scope)
+    validate_token_parameters(token)
+    client.token = token
+    client.populate_token_attributes(token)
+    return token
+
+
+def create_code_verifier():
+    """
+    Random PKCE code verifier (RFC 7636)
+
+    """
+    return generate_token(64)
+
+
+def get_code_challenge(code_verifier):
+    """
+    S256 PKCE code challenge of code_verifier
+
+    """
+    digest = hashlib.sha256(code_verifier.encode("ascii")).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
 
 
 class OAuth2Dance(BaseAuthDance):
+    """
+    OAuth2 authorization code flow
+
+    The state is kept in the stash, or signed into the state itself when the consumer has a state_signer (the stash
+    isn't used and may be None). With PKCE, the code verifier is kept next to the state (derived from the binding in
+    stateless mode).
+
+    In stateless mode, the state is bound to the user agent by binding: a random value created with the state
+    (available as dance.binding after get_authorization_url) that the caller keeps in the user agent, e.g. in a
+    cookie, and passes back to the dance handling the callback.
+
+    """
+
+    def __init__(self, client, stash, redirect_uri, binding=None):
+        super(OAuth2Dance, self).__init__(client, stash, redirect_uri)
+        self.binding = binding
 
     @property
     def _state_stash_key(self):
-        return "oauth2_state_{0}".format(self.client.__class__.__name__.lower())
+        return "oauth2_state_{0}".format(self.client.name)
 
-    def get_authorization_url(self, **params):
+    @property
+    def _code_verifier_stash_key(self):
+        return "oauth2_code_verifier_{0}".format(self.client.name)
+
+    def create_state(self):
+        state_signer = self.client.state_signer
+        if state_signer is not None:
+            if self.binding is None:
+                self.binding = state_signer.create_binding()
+            return state_signer.dumps(self.client.name, self.redirect_uri, self.binding)
         state = generate_token()
         self.stash[self._state_stash_key] = state
-        return self.client.get_authorization_url(self.redirect_uri, state, **params)
+        return state
+
+    def pop_state(self, callback_uri):
+        """
+        State the authorization url was sent with (verified against callback_uri in stateless mode)
+
+        """
+        state_signer = self.client.state_signer
+        if state_signer is None:
+            return self.stash.pop(self._state_stash_key, None)
+        state = dict(parse_qsl(urlparse(callback_uri).query)).get("state")
+        state_signer.loads(state, self.client.name, self.redirect_uri, self.binding)
+        return state
+
+    def create_code_verifier(self, state):
+        if self.client.state_signer is not None:
+            return self.client.state_signer.get_code_verifier(self.binding)
+        code_verifier = create_code_verifier()
+        self.stash[self._code_verifier_stash_key] = code_verifier
+        return code_verifier
+
+    def pop_code_verifier(self, state):
+        if self.client.state_signer is not None:
+            return self.client.state_signer.get_code_verifier(self.binding) if self.binding else None
+        return self.stash.pop(self._code_verifier_stash_key, None)
+
+    def get_authorization_url(self, **params):
+        with self.client.instrument("authorization_url"):
+            state = self.create_state()
+            if self.client.pkce:
+                params.update(code_challenge=get_code_challenge(self.create_code_verifier(state)), code_challenge_method="S256")
+            return self.client.get_authorization_url(self.redirect_uri, state, **params)
+
+    def pop_access_token_params(self, callback_uri):
+        """
+        Arguments of client.get_access_token (redirect_uri, state, callback_uri and code_verifier)
+
+        """
+        state = self.pop_state(callback_uri)
+        code_verifier = self.pop_code_verifier(state) if self.client.pkce else None
+        return {"redirect_uri": self.redirect_uri, "state": state, "callback_uri": callback_uri, "code_verifier": code_verifier}
 
     def get_access_token(self, callback_uri):
-        return self.client.get_access_token(self.redirect_uri, self.stash.pop(self._state_stash_key, None), callback_uri)
+        return self.client.get_access_token(**self.pop_access_token_params(callback_uri))
 
 
 class OAuth2Consumer(BaseAuthConsumer):
@@ -40,6 +148,13 @@ class OAuth2Consumer(BaseAuthConsumer):
     request_method = "GET"
     request_extra_params = {}
 
+    refresh_coordinator = None
+    refresh_scheduler = None
+    refresh_ahead = None
+
+    state_signer = None
+    pkce = False
+
     @property
     def authorization_url(self):  # pragma: no cover
         """
@@ -56,15 +171,47 @@ class OAuth2Consumer(BaseAuthConsumer):
         """
         raise NotImplementedError()
 
-    def __init__(self, client_id, client_secret, scope, token=None, refresh_token_callback=None, **client_kwargs):
+    def __init__(self, client_id, client_secret, scope, token=None, refresh_token_callback=None, session_pool=None, refresh_coordinator=None,
+                 refresh_ahead=None, refresh_scheduler=None, response_cache=None, rate_limiter=None, retry_policy=None, observers=None, token_store=None,
+                 token_key=None, state_signer=None, pkce=None, **client_kwargs):
+        if session_pool is not None:
+            self.session_pool = session_pool
+        if response_cache is not None:
+            self.response_cache = response_cache
+        if rate_limiter is not None:
+            self.rate_limiter = rate_limiter
+        if retry_policy is not None:
+            self.retry_policy = retry_policy
+        if observers is not None:
+            self.observers = tuple(observers)
+        if refresh_coordinator is not None:
+            self.refresh_coordinator = refresh_coordinator
+        if refresh_ahead is not None:
+            self.refresh_ahead = refresh_ahead
+        if refresh_scheduler is not None:
+            self.refresh_scheduler = refresh_scheduler
+        if token_store is not None:
+            self.token_store = token_store
+        self.token_key = token_key
+        if state_signer is not None:
+            self.state_signer = state_signer
+        if pkce is not None:
+            self.pkce = pkce
         self.client_id = client_id
         self.client_secret = client_secret
         self.scope = scope
-        self.client = self.client_class(self.client_id, token_type=self.token_type, token=self.denormalize_token_data(token), **client_kwargs)
+        self.client_kwargs = client_kwargs
+        self._token_lock = threading.Lock()
+        self.client = self.create_client(self.denormalize_token_data(token if token is not None else self.load_token()))
         self.refresh_token_callback = refresh_token_callback
+        self.schedule_refresh()
 
-    def dance(self, stash, redirect_uri):
-        return OAuth2Dance(self, stash=stash, redirect_uri=redirect_uri)
+    def dance(self, stash, redirect_uri, binding=None):
+        """
+        Return OAuth2 flow instance, binding is the value kept by the user agent in stateless mode (see OAuth2Dance)
+
+        """
+        return OAuth2Dance(self, stash=stash, redirect_uri=redirect_uri, binding=binding)
 
     def denormalize_token_data(self, data):
         """
@@ -74,28 +221,14 @@ class OAuth2Consumer(BaseAuthConsumer):
         if not data:
             return
 
-        return {"access_token": data.get("token"),
-                "refresh_token": data.get("extra"),
-                "expires_at": calendar.timegm(data.get("expires_at").utctimetuple()) if data.get("expires_at", False) else 0,
-                "scope": data.get("scope").split(" ")}
+        return Token.coerce(data).to_oauth2()
 
     def normalize_token_data(self, token):
         """
-        Transforms token into a generic format
+        Transforms token into a generic format (a uniauth.tokens.Token)
 
         """
-        token = copy(token)
-
-        if token.get("expires_at", False):
-            token["expires_at"] = datetime.fromtimestamp(token.get("expires_at"), tz=utc)
-
-        if token.get("expires_in", False):
-            token["expires_at"] = datetime.utcnow().replace(tzinfo=utc) + timedelta(seconds=int(token.get("expires_in")))
-
-        return {"token": token.get("access_token"),
-                "extra": token.get("refresh_token", None),
-                "expires_at": token.get("expires_at"),
-                "scope": " ".join(token.get("scope", []))}
+        return Token.from_oauth2(token)
 
     def get_authorization_url(self, redirect_uri, state, **params):
         """
@@ -115,7 +248,7 @@ class OAuth2Consumer(BaseAuthConsumer):
         params.update(kwargs)
         return params
 
-    def get_access_token(self, redirect_uri, state, callback_uri):
+    def get_access_token(self, redirect_uri, state, callback_uri, code_verifier=None):
         """
         Returns normalized access token
 
@@ -124,47 +257,130 @@ class OAuth2Consumer(BaseAuthConsumer):
         :redirect_uri: original authorization redirect absolute uri (must be allowed for oauth2 credentials)
         :state: original authorization state (must be identical to the one sent when requesting code)
         :callback_uri: absolute uri of the current request as redirected by provider after authorization step (must contain code or error)
+        :code_verifier: PKCE code verifier the authorization url was sent with (if any)
         :return: dict denormalized token
 
         """
-        self.client.parse_request_uri_response(callback_uri, state)
-        payload = self.client.prepare_request_body(redirect_uri=redirect_uri, client_secret=self.client_secret)
-        response = requests.request(self.token_method, self.access_token_url, data=payload, headers={"content-type": "application/x-www-form-urlencoded"})
-        response.raise_for_status()
-        return self.normalize_token_data(self.client.parse_request_body_response(self.normalize_token_response(response)))
+        with self.instrument("access_token"):
+            return self.parse_token_response(self.http_request(**self.prepare_access_token_request(redirect_uri, state, callback_uri, code_verifier)))
+
+    def prepare_access_token_request(self, redirect_uri, state, callback_uri, code_verifier=None):
+        """
+        Request (method, url, headers and data) exchanging the grant code of the callback uri
+
+        Raises the same errors as client.parse_request_uri_response, without building a client.
+
+        """
+        if not is_secure_transport(callback_uri):
+            raise InsecureTransportError()
+        params = dict(parse_qsl(urlparse(callback_uri).query))
+        if "error" in params:
+            raise_from_error(params["error"], params)
+        if state and not hmac.compare_digest(params.get("state", "").encode("utf-8"), state.encode("utf-8")):
+            raise MismatchingStateError()
+        if "code" not in params:
+            raise MissingCodeError("Missing code parameter in response.")
+        data = [("grant_type", "authorization_code"), ("code", params["code"]), ("redirect_uri", redirect_uri), ("client_id", self.client_id)]
+        if self.client_secret is not None:
+            data.append(("client_secret", self.client_secret))
+        if code_verifier:
+            data.append(("code_verifier", code_verifier))
+        return {"method": self.token_method, "url": self.access_token_url, "data": urlencode(data), "headers": {"content-type": "application/x-www-form-urlencoded"}, "idempotent": False}
 
     def refresh_token(self):
         """
         Refreshes the token when requesting a resource with an expired token
 
         """
-        payload = self.client.prepare_refresh_body(refresh_token=self.client.refresh_token, client_id=self.client_id, client_secret=self.client_secret)
-        response = requests.request(self.token_method, self.access_token_url, data=dict(urldecode(payload)), headers={"content-type": "application/x-www-form-urlencoded"})
+        refresh_token = self.client.refresh_token
+        return self.parse_token_response(self.http_request(**self.prepare_refresh_token_request(refresh_token)), refresh_token)
+
+    def prepare_refresh_token_request(self, refresh_token=None):
+        """
+        Request (method, url, headers and data) refreshing refresh_token (defaults to the current one)
+
+        """
+        client = self.client
+        payload = client.prepare_refresh_body(refresh_token=refresh_token or client.refresh_token, client_id=self.client_id, client_secret=self.client_secret)
+        return {"method": self.token_method, "url": self.access_token_url, "data": dict(urldecode(payload)), "headers": {"content-type": "application/x-www-form-urlencoded"}, "idempotent": True}
+
+    def parse_token_response(self, response, refresh_token=None):
+        """
+        Returns normalized token from access token url response (also becomes the current token)
+
+        :refresh_token: refresh token kept when a refresh response doesn't include a new one
+
+        """
         response.raise_for_status()
-        return self.normalize_token_data(self.client.parse_request_body_response(self.normalize_token_response(response)))
+        client = self.create_client()
+        data = self.normalize_token_response(response)
+        if isinstance(data, six.string_types):
+            data = decode_form_or_json(data)
+        token = parse_token_data(client, data)
+        if refresh_token and not token.get("refresh_token"):
+            token["refresh_token"] = client.refresh_token = refresh_token
+        self.replace_client(client)
+        return self.normalize_token_data(token)
 
     def normalize_token_response(self, response):
         """
-        Fix response content to match what's expected by oauthlib (json string)
+        Decoded token response (JSON or form encoded), fix provider specific content here
+
+        Returning a JSON or form encoded string is still supported.
 
         """
-        return response.text
+        return decode_form_or_json(response.content)
 
     def request(self, url, method=None, auto_refresh_token=True, refresh_token_callback=None, **kwargs):
         try:
-            url, headers, body = self.client.add_token(url, http_method=method or self.request_method, body=kwargs.get('data', None), headers=kwargs.get('headers', None))
-            response = requests.request(method or self.request_method, url=url, headers=headers, data=body, params=self.get_request_extra_params(**kwargs.get('params', {})))
+            response = self.send_request(url, method, **kwargs)
             response.raise_for_status()
             return response
         except TokenExpiredError:
             if not (auto_refresh_token and self.client.refresh_token):
                 raise
-            refreshed_token = self.refresh_token()
-            callback = refresh_token_callback or self.refresh_token_callback
-            if callback:
-                callback(refreshed_token)
+            self.refresh_token_once(refresh_token_callback or self.refresh_token_callback)
             return self.request(url, method, **kwargs)
 
+    def get_refresh_coordinator(self):
+        return self.refresh_coordinator or default_refresh_coordinator
+
+    def get_refresh_key(self):
+        return self.get_refresh_coordinator().get_key(self.name, self.client.refresh_token)
+
+    def refresh_token_once(self, callback=None):
+        """
+        Refreshes the token, sharing the result of any refresh of the same token already in flight
+
+        The token store (if any) is written and the callback called only by the consumer that actually refreshed the token.
+
+        """
+        with self.instrument("refresh_token") as span:
+            token, refreshed = self.get_refresh_coordinator().refresh(self.get_refresh_key(), self.refresh_token)
+            span.set(refreshed=refreshed)
+        if not refreshed:
+            self.set_token(token)
+            return token
+        self.store_token(token)
+        if callback:
+            callback(token)
+        return token
+
+    def prepare_request(self, url, method=None, **kwargs):
+        """
+        Request (method, url, headers, data, params, timeout and stream) for a resource with the token added
+
+        Raises TokenExpiredError when the token has expired
+
+        """
+        with self.instrument("sign"):
+            url, headers, body = self.client.add_token(url, http_method=method or self.request_method, body=kwargs.get('data', None), headers=kwargs.get('headers', None))
+        request = {"method": method or self.request_method, "url": url, "headers": headers, "data": body,
+                   "params": self.get_request_extra_params(**kwargs.get('params', {})), "timeout": kwargs.get('timeout', None)}
+        if kwargs.get('stream'):
+            request["stream"] = True
+        return request
+
     def get_request_extra_params(self, **kwargs):
         """
         Extra params for requesting resources
@@ -174,6 +390,52 @@ class OAuth2Consumer(BaseAuthConsumer):
         params.update(kwargs)
         return params
 
+    def set_token(self, token):
+        """
+        Replace the current token with a normalised token
+
+        """
+        self.replace_client(self.create_client(self.denormalize_token_data(token)))
+
+    def create_client(self, token=None):
+        """
+        New oauthlib client for token (denormalised)
+
+        The client of the consumer is never changed in place (only replaced), so per-call state such as the grant code
+        lives on separate clients and one consumer can serve concurrent dances and requests.
+
+        """
+        return self.client_class(self.client_id, token_type=self.token_type, token=token, **self.client_kwargs)
+
+    def replace_client(self, client):
+        with self._token_lock:
+            self.client = client
+            self.schedule_refresh()
+
+    def bind_token(self, token):
+        self.set_token(token)
+
+    def get_token_expiry(self):
+        """
+        Return expiry timestamp of the current token (None if unknown)
+
+        """
+        return (self.client.token or {}).get("expires_at") or None
+
+    def get_refresh_scheduler(self):
+        return self.refresh_scheduler or default_refresh_scheduler
+
+    def schedule_refresh(self):
+        """
+        Schedule a background refresh refresh_ahead seconds before the token expires (opt-in)
+
+        """
+        if self.refresh_ahead is None or not self.client.refresh_token:
+            return
+        expires_at = self.get_token_expiry()
+        if expires_at:
+            self.get_refresh_scheduler().schedule(self, expires_at - self.refresh_ahead)
+
     def get_token(self):
         """
         Return normalised
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+OAuth2 providers, importing only the OAuth2 stack of oauthlib
+
+"""
+from __future__ import unicode_literals, absolute_import, print_function
+
+import six
+import json
+from collections import namedtuple
+from oauthlib.common import add_params_to_uri, urlencode
+
+from .base import ProfileMixin
+from .batch import ProfileResult
+from .decoding import decode_json, loads
+from .oauth2 import OAuth2Consumer
+from .pagination import GraphPaginator, PageTokenPaginator
+
+__all__ = ["Google", "Facebook", "LinkedIn", "GitHub", "GraphBatch", "GraphBatchError", "GraphResult"]
+
+
+class Google(ProfileMixin, OAuth2Consumer):
+
+    authorization_url = "https://accounts.google.com/o/oauth2/auth"
+    access_token_url = "https://accounts.google.com/o/oauth2/token"
+    profile_url = "https://www.googleapis.com/oauth2/v1/userinfo"
+
+    authorization_params = {"approval_prompt": "auto"}
+    request_extra_params = {"alt": "json"}
+    paginator = PageTokenPaginator()
+
+    def normalize_profile_data(self, data):
+        return {"uid": data.get("id"),
+                "email": data.get("email"),
+                "username": data.get("email"),
+                "first_name": data.get("given_name"),
+                "last_name": data.get("family_name"),
+                "gender": data.get("gender")[:1] if data.get("gender", False) else None,
+                "birthdate": data.get("dob", None),
+                "avatar_url": data.get("picture", None),
+                "is_verified": data.get("verified_email", False)}
+
+
+class Facebook(ProfileMixin, OAuth2Consumer):
+
+    authorization_url = "https://www.facebook.com/dialog/oauth"
+    access_token_url = "https://graph.facebook.com/oauth/access_token"
+    profile_url = "https://graph.facebook.com/me"
+    paginator = GraphPaginator()
+
+    def normalize_token_response(self, response):
+        if "application/json" in response.headers.get("content-type", {}):
+            data = dict(decode_json(response))
+        elif "text/plain" in response.headers.get("content-type", {}):
+            data = dict(six.moves.urllib.parse.parse_qsl(response.text))
+        else:
+            raise ValueError("Invalid content-type '{}' for Facebook response".format(response.headers.get("content-type", None)))
+
+        if "expires" in data:
+            data["expires_in"] = data.pop("expires")
+
+        if "token_type" not in data:
+            data["token_type"] = "Bearer"
+
+        return data
+
+    def batch(self):
+        """
+        Return a GraphBatch collecting Graph API requests to send in batch calls
+
+        """
+        return GraphBatch(self)
+
+    def get_profiles(self, tokens):
+        """
+        Fetch the profiles of many tokens with batch calls, returns a list of ProfileResult in the same order
+
+        """
+        tokens = list(tokens)
+        batch = self.batch()
+        for token in tokens:
+            batch.add_profile(token)
+        return [ProfileResult(self, token, result.data, result.error) for token, result in zip(tokens, batch.execute())]
+
+    def normalize_profile_data(self, data):
+        return {"uid": data.get("id"),
+                "email": data.get("email"),
+                "username": data.get("username"),
+                "first_name": data.get("first_name"),
+                "last_name": data.get("last_name"),
+                "gender": data.get("gender")[:1] if data.get("gender", False) else None,
+                "birthdate": data.get("dob", None),
+                "avatar_url": "https://graph.facebook.com/{}/picture?type=large&return_ssl_resources=1".format(data.get("id")),
+                "is_verified": data.get("verified", False)}
+
+
+class GraphBatchError(Exception):
+    """
+    Error returned by the Graph API for one request of a batch
+
+    """
+
+    def __init__(self, status, body):
+        super(GraphBatchError, self).__init__("Graph API error {0}: {1}".format(status, body))
+        self.status = status
+        self.body = body
+
+
+class GraphResult(namedtuple("GraphResult", ["status", "headers", "data", "error"])):
+    """
+    Outcome of one request of a batch: either data (decoded body) or error is set
+
+    """
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class GraphBatch(object):
+    """
+    Collects Graph API requests and sends them as batch calls of up to max_size requests
+
+    Requests made on behalf of other users carry their own token. The batch calls themselves
+    use the consumer's token, or the app token when the consumer has none.
+
+    """
+
+    url = "https://graph.facebook.com"
+    max_size = 50
+
+    def __init__(self, consumer):
+        self.consumer = consumer
+        self._requests = []
+
+    def __len__(self):
+        return len(self._requests)
+
+    def add(self, relative_url, method="GET", token=None, params=None, parse=None):
+        """
+        Queue a request, returns the index of its result
+
+        :relative_url: Graph path, e.g. "me/friends?limit=10"
+        :token: normalised token of the user the request is made for (defaults to the batch call token)
+        :params: query (GET/DELETE) or body (POST) parameters
+        :parse: callable applied to the decoded body
+
+        """
+        params = dict(params or {})
+        if token:
+            params["access_token"] = token.get("token")
+        request = {"method": method, "relative_url": relative_url}
+        if method.upper() in ("GET", "DELETE"):
+            request["relative_url"] = add_params_to_uri(relative_url, list(params.items()))
+        elif params:
+            request["body"] = urlencode(list(params.items()))
+        self._requests.append((request, parse))
+        return len(self._requests) - 1
+
+    def add_profile(self, token=None):
+        """
+        Queue a profile request, its result data is normalised like Facebook.get_profile()
+
+        """
+        return self.add(self.consumer.profile_url[len(self.url):].lstrip("/"), token=token, parse=self.consumer.normalize_profile_data)
+
+    def get_access_token(self):
+        token = self.consumer.get_token()
+        return token.get("token") or "{0}|{1}".format(self.consumer.client_id, self.consumer.client_secret)
+
+    def send(self, chunk):
+        """
+        Send a batch call, through consumer.request (token refresh, extra params, rate limits and retries) when the
+        consumer has a token
+
+        """
+        batch = json.dumps([request for request, _ in chunk])
+        if self.consumer.get_token().get("token"):
+            return self.consumer.request(self.url, "POST", data={"batch": batch})
+        response = self.consumer.http_request("POST", self.url, data={"access_token": self.get_access_token(), "batch": batch})
+        response.raise_for_status()
+        return response
+
+    def execute(self):
+        """
+        Send the queued requests, returns a list of GraphResult in the order requests were added
+
+        A batch call that fails gives an error result for each of its requests, the other batch calls are still sent.
+
+        """
+        requests, self._requests = self._requests, []
+        results = []
+        for i in range(0, len(requests), self.max_size):
+            chunk = requests[i:i + self.max_size]
+            try:
+                items = decode_json(self.send(chunk))
+            except Exception as e:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                results.extend(GraphResult(status, {}, None, e) for _ in chunk)
+                continue
+            results.extend(self.parse_result(items[j] if j < len(items) else None, parse) for j, (_, parse) in enumerate(chunk))
+        return results
+
+    def parse_result(self, item, parse=None):
+        if item is None:
+            return GraphResult(None, {}, None, GraphBatchError(None, "Request timed out"))
+        headers = dict((header.get("name"), header.get("value")) for header in item.get("headers") or [])
+        if item.get("code", 0) >= 400:
+            return GraphResult(item.get("code"), headers, None, GraphBatchError(item.get("code"), item.get("body")))
+        try:
+            data = loads(item.get("body")) if item.get("body") else None
+            return GraphResult(item.get("code"), headers, parse(data) if parse else data, None)
+        except Exception as e:
+            return GraphResult(item.get("code"), headers, None, e)
+
+
+class LinkedIn(ProfileMixin, OAuth2Consumer):
+
+    name = 'linkedin'
+    verbose_name = 'LinkedIn'
+    authorization_url = "https://www.linkedin.com/uas/oauth2/authorization"
+    access_token_url = "https://api.linkedin.com/uas/oauth2/accessToken"
+    profile_url = "https://api.linkedin.com/v1/people/~:(id,first-name,last-name,picture-url,email-address)"
+
+    request_extra_params = {"format": "json"}
+
+    def normalize_profile_data(self, data):
+        return {"uid": data.get("id"),
+                "email": data.get("emailAddress"),
+                "username": data.get("emailAddress"),
+                "first_name": data.get("firstName"),
+                "last_name": data.get("lastName"),
+                "gender": None,
+                "birthdate": None,
+                "avatar_url": data.get("pictureUrl"),
+                "is_verified": False}
+
+
+class GitHub(ProfileMixin, OAuth2Consumer):
+
+    name = 'github'
+    verbose_name = 'GitHub'
+    authorization_url = "https://github.com/login/oauth/authorize"
+    access_token_url = "https://github.com/login/oauth/access_token"
+    profile_url = "https://api.github.com/user"
+
+    def normalize_profile_data(self, data):
+        return {"uid": data.get("id"),
+                "email": data.get("email"),
+                "username": data.get("login"),
+                "first_name": None,
+                "last_name": None,
+                "gender": None,
+                "birthdate": None,
+                "avatar_url": data.get("avatar_url"),
+                "is_verified": False}
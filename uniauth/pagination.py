@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import threading
+from six.moves.urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+from .decoding import decode_json
+
+__all__ = ["BasePaginator", "LinkHeaderPaginator", "GraphPaginator", "PageTokenPaginator", "paginate"]
+
+
+class BasePaginator(object):
+    """
+    Follows the pagination of a provider's API
+
+    """
+
+    def get_items(self, data):  # pragma: no cover
+        """
+        Return the items of a page (decoded body)
+
+        """
+        raise NotImplementedError()
+
+    def get_next_page(self, response, data, url, params):  # pragma: no cover
+        """
+        Return (url, params) of the page after the one requested with url and params, or None on the last page
+
+        """
+        raise NotImplementedError()
+
+
+class LinkHeaderPaginator(BasePaginator):
+    """
+    Pagination with Link: <url>; rel="next" headers (RFC 5988), e.g. GitHub
+
+    :items_key: key of the items in pages that aren't lists (e.g. "items" for GitHub search)
+
+    """
+
+    def __init__(self, items_key=None):
+        self.items_key = items_key
+
+    def get_items(self, data):
+        if self.items_key is None or isinstance(data, list):
+            return data
+        return data.get(self.items_key) or []
+
+    def get_next_page(self, response, data, url, params):
+        next_url = response.links.get("next", {}).get("url")
+        return (next_url, None) if next_url else None
+
+
+class GraphPaginator(BasePaginator):
+    """
+    Facebook Graph API cursor pagination (paging.next)
+
+    The access token Facebook adds to next urls is removed, so a token refreshed during the walk is used.
+
+    """
+
+    def get_items(self, data):
+        return data.get("data") or []
+
+    def get_next_page(self, response, data, url, params):
+        next_url = (data.get("paging") or {}).get("next")
+        if not next_url or not self.get_items(data):
+            return None
+        parts = urlparse(next_url)
+        query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != "access_token"]
+        return urlunparse(parts._replace(query=urlencode(query))), None
+
+
+class PageTokenPaginator(BasePaginator):
+    """
+    Pagination with page tokens (nextPageToken in pages, pageToken parameter), e.g. Google APIs
+
+    """
+
+    def __init__(self, items_key="items", token_key="nextPageToken", token_param="pageToken"):
+        self.items_key = items_key
+        self.token_key = token_key
+        self.token_param = token_param
+
+    def get_items(self, data):
+        return data.get(self.items_key) or []
+
+    def get_next_page(self, response, data, url, params):
+        token = data.get(self.token_key)
+        if not token:
+            return None
+        return url, dict(params or {}, **{self.token_param: token})
+
+
+class Prefetch(object):
+    """
+    Calls func(*args) on a background thread, result() blocks until it completes
+
+    """
+
+    def __init__(self, func, *args):
+        self._result = self._error = None
+        self._thread = threading.Thread(target=self._run, args=(func,) + args)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, func, *args):
+        try:
+            self._result = func(*args)
+        except Exception as e:
+            self._error = e
+
+    def result(self):
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def paginate(fetch, paginator, url, params=None, prefetch=True):
+    """
+    Iterate over the items of every page, fetching the next page while the current one is consumed
+
+    At most two pages are held in memory.
+
+    :fetch: callable(url, params) returning the response of a page
+    :paginator: BasePaginator instance
+
+    """
+    response = fetch(url, params)
+    while True:
+        data = decode_json(response)
+        next_page = paginator.get_next_page(response, data, url, params)
+        pending = None
+        if next_page is not None and prefetch:
+            pending = Prefetch(fetch, *next_page)
+        for item in paginator.get_items(data):
+            yield item
+        if next_page is None:
+            return
+        url, params = next_page
+        response = pending.result() if pending is not None else fetch(url, params)
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import hashlib
+import calendar
+import threading
+from collections import namedtuple
+from email.utils import parsedate
+
+from .cache import MemoryCache
+
+__all__ = ["RateLimiter", "RateLimitExceeded", "RateLimitBudget", "TokenBucket", "BLOCK", "FAIL"]
+
+BLOCK = "block"
+FAIL = "fail"
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised in fail-fast mode (or when the wait would exceed max_wait) instead of waiting
+
+    """
+
+    def __init__(self, key, retry_after):
+        super(RateLimitExceeded, self).__init__("Rate limit exceeded for {0}, retry after {1:.1f}s".format(key[0], retry_after))
+        self.key = key
+        self.retry_after = retry_after
+
+
+RateLimitBudget = namedtuple("RateLimitBudget", ["remaining", "limit", "reset_at", "delay"])
+
+
+class TokenBucket(object):
+    """
+    Local token bucket, adjusted by the provider's rate limit headers
+
+    :rate: tokens added per second (None for no local limit)
+    :capacity: maximum burst
+
+    """
+
+    def __init__(self, rate=None, capacity=None, now=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else (rate or 1)
+        self.tokens = float(self.capacity)
+        self.updated = now if now is not None else time.time()
+        self.blocked_until = 0
+        self.remaining = None
+        self.limit = None
+        self.reset_at = None
+
+    def refill(self, now):
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.reset_at is not None and self.reset_at <= now:
+            self.remaining = self.reset_at = None
+
+    def delay(self, now):
+        """
+        Seconds to wait before a request can be sent
+
+        """
+        self.refill(now)
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.remaining is not None and self.remaining <= 0 and self.reset_at is not None:
+            return self.reset_at - now
+        if self.rate and self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return 0
+
+    def consume(self):
+        if self.rate:
+            self.tokens -= 1
+        if self.remaining is not None:
+            self.remaining -= 1
+
+    def update(self, now, remaining=None, limit=None, reset_at=None, retry_after=None):
+        if retry_after is not None:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+        if remaining is not None:
+            self.remaining = remaining
+            self.limit = limit
+            self.reset_at = reset_at
+            if self.rate:
+                self.tokens = min(self.tokens, remaining)
+
+
+class RateLimiter(object):
+    """
+    Client-side throttling per provider and token
+
+    Requests are paced with a local token bucket, and the bucket follows the provider's rate limit headers
+    (X-RateLimit-Remaining/Limit/Reset, RateLimit-*, Retry-After), so requests stop before a 403/429 storm.
+
+    :rate: local limit in requests per second per key (None to only follow the provider's headers)
+    :capacity: maximum burst per key
+    :mode: BLOCK to wait for the budget, FAIL to raise RateLimitExceeded
+    :max_wait: raise RateLimitExceeded instead of waiting longer than max_wait seconds
+    :per_token: one budget per token (e.g. GitHub) rather than one per provider (e.g. Google, per project)
+    :default_retry_after: seconds to back off after a 429 without Retry-After header
+    :max_keys: maximum number of budgets kept, least recently used ones are dropped first (and start afresh)
+
+    """
+
+    def __init__(self, rate=None, capacity=None, mode=BLOCK, max_wait=None, per_token=True, default_retry_after=1, max_keys=10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.mode = mode
+        self.max_wait = max_wait
+        self.per_token = per_token
+        self.default_retry_after = default_retry_after
+        self._buckets = MemoryCache(max_entries=max_keys)
+        self._lock = threading.Lock()
+
+    def get_key(self, consumer):
+        if not self.per_token:
+            return (consumer.name, None)
+        token = consumer.get_token().get("token") or ""
+        return (consumer.name, hashlib.sha256(token.encode("utf-8")).hexdigest())
+
+    def _get_bucket(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.capacity, now)
+            self._buckets.set(key, bucket)
+        return bucket
+
+    def reserve(self, key):
+        """
+        Consume budget and return 0, or return the seconds to wait before trying again
+
+        """
+        now = time.time()
+        with self._lock:
+            bucket = self._get_bucket(key, now)
+            delay = bucket.delay(now)
+            if delay <= 0:
+                bucket.consume()
+                return 0
+            return delay
+
+    def check(self, key, delay, mode=None):
+        """
+        Raise RateLimitExceeded if the caller must not wait delay seconds
+
+        """
+        if (mode or self.mode) == FAIL or (self.max_wait is not None and delay > self.max_wait):
+            raise RateLimitExceeded(key, delay)
+
+    def acquire(self, key, mode=None):
+        """
+        Wait (or fail) until a request can be sent for key
+
+        """
+        while True:
+            delay = self.reserve(key)
+            if not delay:
+                return
+            self.check(key, delay, mode)
+            time.sleep(delay)
+
+    def update(self, key, response):
+        """
+        Adjust budget of key from the rate limit headers of response
+
+        """
+        now = time.time()
+        headers = response.headers
+        remaining = self._parse_number(headers.get("x-ratelimit-remaining", headers.get("ratelimit-remaining")))
+        limit = self._parse_number(headers.get("x-ratelimit-limit", headers.get("ratelimit-limit")))
+        reset_at = self._parse_reset(headers.get("x-ratelimit-reset", headers.get("ratelimit-reset")), now)
+        retry_after = self._parse_retry_after(headers.get("retry-after"), now)
+        if retry_after is None and response.status_code == 429:
+            retry_after = self.default_retry_after
+        if retry_after is None and response.status_code in (403, 429) and remaining == 0 and reset_at is None:
+            retry_after = self.default_retry_after
+        if remaining is None and retry_after is None:
+            return
+        with self._lock:
+            self._get_bucket(key, now).update(now, remaining=remaining, limit=limit, reset_at=reset_at, retry_after=retry_after)
+
+    def budget(self, key):
+        """
+        Current RateLimitBudget of key (remaining and limit are None until the provider reported them)
+
+        """
+        now = time.time()
+        with self._lock:
+            bucket = self._get_bucket(key, now)
+            delay = bucket.delay(now)
+            return RateLimitBudget(bucket.remaining, bucket.limit, bucket.reset_at, delay)
+
+    @staticmethod
+    def _parse_number(value):
+        try:
+            return int(value) if value is not None else None
+        except ValueError:
+            return None
+
+    @classmethod
+    def _parse_reset(cls, value, now):
+        value = cls._parse_number(value)
+        if value is None:
+            return None
+        # epoch timestamp (GitHub) or delay in seconds (RateLimit-Reset)
+        return value if value > 10 ** 9 else now + value
+
+    @classmethod
+    def _parse_retry_after(cls, value, now):
+        if value is None:
+            return None
+        seconds = cls._parse_number(value)
+        if seconds is not None:
+            return seconds
+        date = parsedate(value)
+        return max(0, calendar.timegm(date) - now) if date else None
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import heapq
+import logging
+import hashlib
+import weakref
+import threading
+import itertools
+from six.moves import queue
+
+from .cache import MemoryCache
+
+__all__ = ["RefreshCoordinator", "BaseLockBackend", "RefreshTimeout", "RefreshScheduler",
+           "default_refresh_coordinator", "default_refresh_scheduler"]
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshTimeout(Exception):
+    """
+    Raised when waiting on a concurrent refresh of the same token takes too long
+
+    """
+
+
+class BaseLockBackend(object):
+    """
+    Lock shared by all the processes that can refresh the same token (e.g. redis, memcached, database)
+
+    The refreshed token is published to the backend so that processes that were waiting on the lock
+    can reuse it instead of refreshing an already spent refresh token.
+
+    """
+
+    def acquire(self, key, timeout):  # pragma: no cover
+        """
+        Block until the lock for key is acquired, return False if not acquired within timeout seconds
+
+        """
+        raise NotImplementedError()
+
+    def release(self, key):  # pragma: no cover
+        raise NotImplementedError()
+
+    def get_result(self, key):  # pragma: no cover
+        """
+        Return normalized token published for key, or None
+
+        """
+        raise NotImplementedError()
+
+    def set_result(self, key, token, ttl):  # pragma: no cover
+        """
+        Publish normalized token for key during ttl seconds
+
+        """
+        raise NotImplementedError()
+
+
+class _Flight(object):
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RefreshCoordinator(object):
+    """
+    Runs a single refresh per refresh token
+
+    Concurrent callers wait for the refresh in flight and reuse its result, and callers presenting the same (now spent)
+    refresh token during result_ttl seconds reuse it too. With a lock backend, the refresh is also coordinated across
+    processes.
+
+    :backend: optional BaseLockBackend instance
+    :timeout: maximum seconds to wait for a refresh in flight
+    :result_ttl: seconds during which a refreshed token is reused for its old refresh token
+    :max_results: maximum number of refreshed tokens kept in memory
+
+    """
+
+    def __init__(self, backend=None, timeout=30, result_ttl=60, max_results=10000):
+        self.backend = backend
+        self.timeout = timeout
+        self.result_ttl = result_ttl
+        self._results = MemoryCache(max_entries=max_results)
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(name, refresh_token):
+        return hashlib.sha256("{0}:{1}".format(name, refresh_token).encode("utf-8")).hexdigest()
+
+    def get_result(self, key):
+        """
+        Return the token refreshed in this process for key during the last result_ttl seconds, or None
+
+        """
+        return self._results.get(key)
+
+    def set_result(self, key, token):
+        self._results.set(key, token, self.result_ttl)
+
+    def clear(self):
+        """
+        Forget refreshed tokens kept in memory
+
+        """
+        self._results = MemoryCache(max_entries=self._results.max_entries)
+
+    def refresh(self, key, func):
+        """
+        Return (token, refreshed) where refreshed is True only for the caller that ran func
+
+        """
+        with self._lock:
+            token = self.get_result(key)
+            if token is not None:
+                return token, False
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if not flight.event.wait(self.timeout):
+                raise RefreshTimeout("Timed out waiting for token refresh")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, False
+
+        try:
+            flight.result, refreshed = self._refresh(key, func)
+            return flight.result, refreshed
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    self.set_result(key, flight.result)
+                del self._flights[key]
+            flight.event.set()
+
+    def _refresh(self, key, func):
+        if self.backend is None:
+            return func(), True
+
+        token = self.backend.get_result(key)
+        if token is not None:
+            return token, False
+
+        if not self.backend.acquire(key, self.timeout):
+            raise RefreshTimeout("Timed out acquiring token refresh lock")
+        try:
+            token = self.backend.get_result(key)
+            if token is not None:
+                return token, False
+            token = func()
+            self.backend.set_result(key, token, self.result_ttl)
+            return token, True
+        finally:
+            self.backend.release(key)
+
+
+default_refresh_coordinator = RefreshCoordinator()
+
+
+class RefreshScheduler(object):
+    """
+    Refreshes consumers' tokens in the background shortly before they expire
+
+    Consumers are only weakly referenced. Refreshes go through the consumer's refresh coordinator
+    so they never duplicate a refresh triggered by a request.
+
+    :workers: number of threads running refreshes
+    :retry_delay: seconds before retrying a failed refresh (while the token has not expired)
+
+    """
+
+    def __init__(self, workers=2, retry_delay=30):
+        self.workers = workers
+        self.retry_delay = retry_delay
+        self._heap = []
+        self._due = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def schedule(self, consumer, due):
+        """
+        Refresh consumer's token at due (timestamp), replacing any refresh already scheduled for it
+
+        """
+        with self._condition:
+            self._due[id(consumer)] = due
+            heapq.heappush(self._heap, (due, next(self._counter), id(consumer), weakref.ref(consumer)))
+            self._start()
+            self._condition.notify()
+
+    def cancel(self, consumer):
+        with self._condition:
+            self._due.pop(id(consumer), None)
+
+    def _start(self):
+        if self._threads:
+            return
+        self._threads.append(threading.Thread(target=self._run_timer, name="uniauth-refresh-timer"))
+        self._threads.extend(threading.Thread(target=self._run_worker, name="uniauth-refresh-worker-{0}".format(i)) for i in range(self.workers))
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def _run_timer(self):
+        while True:
+            with self._condition:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                due, _, key, ref = self._heap[0]
+                delay = due - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                if self._due.get(key) != due:
+                    continue
+                del self._due[key]
+            consumer = ref()
+            if consumer is not None:
+                self._queue.put(consumer)
+
+    def _run_worker(self):
+        while True:
+            consumer = self._queue.get()
+            try:
+                consumer.refresh_token_once(consumer.refresh_token_callback)
+            except Exception:
+                logger.warning("Background refresh of %s token failed", consumer.name, exc_info=True)
+                expires_at = consumer.get_token_expiry()
+                retry_at = time.time() + self.retry_delay
+                if expires_at and retry_at < expires_at:
+                    self.schedule(consumer, retry_at)
+            finally:
+                del consumer
+
+
+default_refresh_scheduler = RefreshScheduler()
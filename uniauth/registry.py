@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import threading
+from importlib import import_module
+
+__all__ = ["ConsumerRegistry", "default_registry", "get_consumer", "register_consumer"]
+
+BUILTIN_CONSUMERS = {
+    "google": "uniauth.oauth2_consumers:Google",
+    "facebook": "uniauth.oauth2_consumers:Facebook",
+    "linkedin": "uniauth.oauth2_consumers:LinkedIn",
+    "github": "uniauth.oauth2_consumers:GitHub",
+    "bitbucket": "uniauth.oauth1_consumers:Bitbucket",
+}
+
+
+class ConsumerRegistry(object):
+    """
+    Consumer classes by name (see MetaAuthConsumer), imported on first use
+
+    Importing a consumer imports requests and oauthlib, so processes only pay for them once they use a provider, and
+    only for the OAuth stack (OAuth1 or OAuth2) of the providers they use.
+
+    :consumers: {name: "module:ClassName"}
+
+    """
+
+    def __init__(self, consumers=None):
+        self._paths = dict(consumers or {})
+        self._classes = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        return sorted(set(self._paths) | set(self._classes))
+
+    def register(self, consumer, name=None):
+        """
+        Register a consumer class, or the "module:ClassName" path of one to import it lazily (then name is required)
+
+        """
+        with self._lock:
+            if isinstance(consumer, type):
+                name = name or consumer.name
+                self._classes[name] = consumer
+                self._paths.pop(name, None)
+            else:
+                if name is None:
+                    raise ValueError("name is required to register {0}".format(consumer))
+                self._classes.pop(name, None)
+                self._paths[name] = consumer
+
+    def get(self, name):
+        """
+        Return the consumer class registered as name, raising KeyError for unknown names
+
+        """
+        consumer = self._classes.get(name)
+        if consumer is not None:
+            return consumer
+        with self._lock:
+            if name not in self._classes:
+                module, attribute = self._paths[name].split(":")
+                self._classes[name] = getattr(import_module(module), attribute)
+            return self._classes[name]
+
+
+default_registry = ConsumerRegistry(BUILTIN_CONSUMERS)
+
+
+def get_consumer(name):
+    """
+    Return the consumer class named name from the default registry, e.g. get_consumer("github")
+
+    """
+    return default_registry.get(name)
+
+
+def register_consumer(consumer, name=None):
+    default_registry.register(consumer, name)
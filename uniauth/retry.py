@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import random
+from requests.exceptions import ConnectionError, ConnectTimeout, Timeout
+from requests.packages.urllib3.exceptions import NewConnectionError
+
+__all__ = ["RetryPolicy"]
+
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"])
+
+
+def is_not_sent(error):
+    """
+    True when the request certainly never reached the server (connection could not be established)
+
+    """
+    if isinstance(error, ConnectTimeout):
+        return True
+    if isinstance(error, ConnectionError) and error.args:
+        cause = error.args[0]
+        return isinstance(cause, NewConnectionError) or isinstance(getattr(cause, "reason", None), NewConnectionError)
+    return False
+
+
+class RetryPolicy(object):
+    """
+    Retries with exponential backoff and jitter, applied by the session pool
+
+    Idempotent requests (resource GETs, token refreshes...) are retried on retryable statuses and exceptions.
+    Non-idempotent ones (authorization code and OAuth1 token exchanges) are only retried when the request
+    certainly never reached the server, since a grant can only be exchanged once.
+
+    :total: maximum number of retries
+    :backoff_factor: first backoff in seconds, doubled on every retry
+    :max_backoff: maximum backoff in seconds (a longer Retry-After is not retried)
+    :jitter: randomize backoffs ("full jitter") so that clients don't retry in lockstep
+    :status_forcelist: response statuses to retry
+    :retry_exceptions: exceptions to retry
+    :deadline: total time budget in seconds, no retry is attempted past it
+
+    """
+
+    def __init__(self, total=3, backoff_factor=0.5, max_backoff=30, jitter=True, status_forcelist=(429, 500, 502, 503, 504),
+                 retry_exceptions=(ConnectionError, Timeout), deadline=None):
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.status_forcelist = frozenset(status_forcelist)
+        self.retry_exceptions = tuple(retry_exceptions)
+        self.deadline = deadline
+
+    def start(self, method, idempotent=None):
+        """
+        Return the RetryState of a new call
+
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        return RetryState(self, idempotent)
+
+    def is_retryable(self, idempotent, response=None, error=None):
+        if error is not None:
+            return isinstance(error, self.retry_exceptions) and (idempotent or is_not_sent(error))
+        return idempotent and response.status_code in self.status_forcelist
+
+    def get_backoff(self, retries, response=None):
+        backoff = min(self.max_backoff, self.backoff_factor * (2 ** (retries - 1)))
+        if self.jitter:
+            backoff = random.uniform(0, backoff)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            backoff = max(backoff, int(retry_after))
+        return backoff
+
+
+class RetryState(object):
+
+    def __init__(self, policy, idempotent):
+        self.policy = policy
+        self.idempotent = idempotent
+        self.retries = 0
+        self.started = time.time()
+
+    def next(self, response=None, error=None):
+        """
+        Return seconds to wait before retrying, or None when the call must not be retried
+
+        """
+        policy = self.policy
+        if self.retries >= policy.total or not policy.is_retryable(self.idempotent, response, error):
+            return None
+        backoff = policy.get_backoff(self.retries + 1, response)
+        if backoff > policy.max_backoff:
+            return None
+        if policy.deadline is not None and time.time() - self.started + backoff > policy.deadline:
+            return None
+        self.retries += 1
+        return backoff
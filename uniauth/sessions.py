@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import threading
+import requests
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from six.moves.http_cookiejar import DefaultCookiePolicy
+from oauthlib.common import urlparse
+
+__all__ = ["SessionPool", "default_session_pool", "build_response"]
+
+
+class SessionPool(object):
+    """
+    Keep-alive HTTP sessions, one per provider host
+
+    Safe to share across consumer instances and threads. Cookies are never persisted
+    between requests since the same session serves every user of a provider.
+
+    :pool_maxsize: maximum number of connections kept alive per host
+    :pool_block: block when no connection is available instead of opening a throwaway one
+    :max_retries: retries passed to the underlying urllib3 pools (connection errors only)
+    :timeout: default timeout (seconds or (connect, read) tuple) used when none is given
+    :host_options: per host overrides of pool_maxsize, pool_block and max_retries,
+                   e.g. {"api.github.com": {"pool_maxsize": 50}}
+    :max_hosts: maximum number of hosts with a session (None for no limit), the sessions of the least recently used
+                hosts are closed first (once the requests they are sending complete), so at most
+                max_hosts * pool_maxsize connections are kept alive
+
+    """
+
+    def __init__(self, pool_maxsize=10, pool_block=False, max_retries=0, timeout=None, host_options=None, max_hosts=100):
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.host_options = host_options or {}
+        self.max_hosts = max_hosts
+        self._sessions = OrderedDict()
+        self._in_use = {}
+        self._retired = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_host(url):
+        parsed = urlparse.urlparse(url)
+        return "{0}://{1}".format(parsed.scheme, parsed.netloc).lower()
+
+    def get_session(self, url):
+        """
+        Return the session dedicated to the host of the url
+
+        Sessions obtained this way may be closed when their host is evicted (see max_hosts), request doesn't have
+        that problem.
+
+        """
+        with self._lock:
+            session, evicted = self._get_session(self.get_host(url))
+        self._close(evicted)
+        return session
+
+    def _get_session(self, host):
+        """
+        Return (session of host, sessions to close), with the lock held
+
+        """
+        session = self._sessions.pop(host, None)
+        if session is None:
+            session = self.create_session(host)
+        self._sessions[host] = session
+        evicted = []
+        while self.max_hosts is not None and len(self._sessions) > self.max_hosts:
+            _, evicted_session = self._sessions.popitem(last=False)
+            if evicted_session in self._in_use:
+                self._retired.add(evicted_session)
+            else:
+                evicted.append(evicted_session)
+        return session, evicted
+
+    def _close(self, sessions):
+        for session in sessions:
+            session.close()
+
+    def acquire(self, url):
+        """
+        Return the session of the host of url, not closed on eviction until released
+
+        """
+        with self._lock:
+            session, evicted = self._get_session(self.get_host(url))
+            self._in_use[session] = self._in_use.get(session, 0) + 1
+        self._close(evicted)
+        return session
+
+    def release(self, session):
+        """
+        Release a session returned by acquire, closing it if its host was evicted meanwhile
+
+        """
+        with self._lock:
+            count = self._in_use.pop(session) - 1
+            if count:
+                self._in_use[session] = count
+            retired = not count and session in self._retired
+            self._retired.discard(session)
+        if retired:
+            session.close()
+
+    def get_adapter_options(self, host):
+        options = {"pool_maxsize": self.pool_maxsize,
+                   "pool_block": self.pool_block,
+                   "max_retries": self.max_retries}
+        options.update(self.host_options.get(urlparse.urlparse(host).netloc, {}))
+        return options
+
+    def create_session(self, host):
+        session = requests.Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        session.mount(host, HTTPAdapter(pool_connections=1, **self.get_adapter_options(host)))
+        return session
+
+    def request(self, method, url, retry=None, idempotent=None, on_retry=None, **kwargs):
+        """
+        Send request, retrying according to retry (a uniauth.retry.RetryPolicy) if given
+
+        :idempotent: whether the request can safely be sent again (defaults to True for GET, HEAD, OPTIONS, PUT and DELETE)
+        :on_retry: called with (delay, response, error) before every retry
+
+        """
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        session = self.acquire(url)
+        try:
+            return self._send(session, method, url, retry, idempotent, on_retry, **kwargs)
+        finally:
+            self.release(session)
+
+    def _send(self, session, method, url, retry, idempotent, on_retry, **kwargs):
+        if retry is None:
+            return session.request(method, url, **kwargs)
+
+        state = retry.start(method, idempotent)
+        while True:
+            try:
+                response = session.request(method, url, **kwargs)
+            except requests.RequestException as error:
+                response, failure, delay = None, error, state.next(error=error)
+                if delay is None:
+                    raise
+            else:
+                failure, delay = None, state.next(response=response)
+                if delay is None:
+                    return response
+                response.close()
+            if on_retry is not None:
+                on_retry(delay, response, failure)
+            time.sleep(delay)
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()) + list(self._retired), OrderedDict()
+            self._retired = set()
+        for session in sessions:
+            session.close()
+
+
+default_session_pool = SessionPool()
+
+
+def build_response(url, status, reason, headers, content):
+    """
+    Build a requests.Response from raw parts (e.g. another transport or a cache) so normalisation code applies unchanged
+
+    """
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.reason = reason
+    response.headers = CaseInsensitiveDict()
+    for key, value in headers:
+        response.headers[key] = "{0}, {1}".format(response.headers[key], value) if key in response.headers else value
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = content
+    response._content_consumed = True
+    return response
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import hmac
+import json
+import time
+import base64
+import hashlib
+
+try:
+    from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+except ImportError:  # pragma: no cover
+    Fernet = MultiFernet = InvalidToken = None
+
+__all__ = ["BadSignature", "SignatureExpired", "Signer", "FernetSigner"]
+
+
+class BadSignature(Exception):
+    """
+    Raised when a signed value was tampered with (or signed with another secret)
+
+    """
+
+
+class SignatureExpired(BadSignature):
+    """
+    Raised when a signed value is older than max_age
+
+    """
+
+
+def b64encode(value):
+    return base64.urlsafe_b64encode(value).rstrip(b"=").decode("ascii")
+
+
+def b64decode(value):
+    value = value.encode("ascii")
+    return base64.urlsafe_b64decode(value + b"=" * (-len(value) % 4))
+
+
+class BaseSigner(object):
+
+    def sign(self, value):  # pragma: no cover
+        """
+        Return text value signed (and timestamped)
+
+        """
+        raise NotImplementedError()
+
+    def unsign(self, signed, max_age=None):  # pragma: no cover
+        """
+        Return the text value of signed, raising BadSignature (or SignatureExpired when older than max_age seconds)
+
+        """
+        raise NotImplementedError()
+
+    def digest(self, value):  # pragma: no cover
+        """
+        Keyed SHA256 digest (bytes) of text value, to derive secrets from public values
+
+        """
+        raise NotImplementedError()
+
+    def dumps(self, data):
+        """
+        Sign JSON serialisable data
+
+        """
+        return self.sign(json.dumps(data, separators=(",", ":")))
+
+    def loads(self, signed, max_age=None):
+        return json.loads(self.unsign(signed, max_age))
+
+
+class Signer(BaseSigner):
+    """
+    Timestamped HMAC-SHA256 signatures (values are readable by the client, not encrypted)
+
+    :secret: application secret
+    :salt: namespace, so values signed for one purpose can't be used for another
+
+    """
+
+    def __init__(self, secret, salt="uniauth.signing"):
+        if not isinstance(secret, bytes):
+            secret = secret.encode("utf-8")
+        self.key = hmac.new(secret, salt.encode("utf-8"), hashlib.sha256).digest()
+
+    def get_signature(self, value):
+        return b64encode(hmac.new(self.key, value.encode("ascii"), hashlib.sha256).digest())
+
+    def digest(self, value):
+        key = hmac.new(self.key, b"uniauth.signing.digest", hashlib.sha256).digest()
+        return hmac.new(key, value.encode("utf-8"), hashlib.sha256).digest()
+
+    def sign(self, value):
+        value = "{0}.{1}".format(b64encode(value.encode("utf-8")), int(time.time()))
+        return "{0}.{1}".format(value, self.get_signature(value))
+
+    def unsign(self, signed, max_age=None):
+        try:
+            value, signature = signed.rsplit(".", 1)
+            payload, timestamp = value.split(".")
+            valid = hmac.compare_digest(signature.encode("ascii"), self.get_signature(value).encode("ascii"))
+        except (ValueError, UnicodeError, AttributeError):
+            raise BadSignature("Malformed signed value")
+        if not valid:
+            raise BadSignature("Signature does not match")
+        if max_age is not None and int(timestamp) + max_age < time.time():
+            raise SignatureExpired("Signed value expired")
+        return b64decode(payload).decode("utf-8")
+
+
+class FernetSigner(BaseSigner):
+    """
+    Encrypted and authenticated values (requires the cryptography package)
+
+    :key: Fernet key (see cryptography.fernet.Fernet.generate_key), or a list of keys to rotate them (first one signs)
+
+    """
+
+    def __init__(self, key):
+        if Fernet is None:  # pragma: no cover
+            raise ImportError("FernetSigner requires cryptography")
+        keys = key if isinstance(key, (list, tuple)) else [key]
+        self.fernet = MultiFernet([Fernet(key) for key in keys])
+        secret = keys[0] if isinstance(keys[0], bytes) else keys[0].encode("ascii")
+        self.digest_key = hmac.new(secret, b"uniauth.signing.digest", hashlib.sha256).digest()
+
+    def sign(self, value):
+        return self.fernet.encrypt(value.encode("utf-8")).decode("ascii")
+
+    def unsign(self, signed, max_age=None):
+        try:
+            token = signed.encode("ascii")
+            return self.fernet.decrypt(token, ttl=max_age).decode("utf-8")
+        except (UnicodeError, AttributeError):
+            raise BadSignature("Invalid encrypted value")
+        except InvalidToken:
+            if max_age is not None and self.is_valid(token):
+                raise SignatureExpired("Encrypted value expired")
+            raise BadSignature("Invalid encrypted value")
+
+    def digest(self, value):
+        return hmac.new(self.digest_key, value.encode("utf-8"), hashlib.sha256).digest()
+
+    def is_valid(self, token):
+        try:
+            self.fernet.decrypt(token)
+            return True
+        except InvalidToken:
+            return False
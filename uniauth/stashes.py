@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+
+from .cache import MemoryCache
+from .signing import BadSignature
+
+__all__ = ["BaseStash", "CacheStash", "MemoryStash", "SignedStash"]
+
+
+class BaseStash(object):
+    """
+    Keeps the state of OAuth dances (OAuth2 state, OAuth1 request token) from the authorization redirect to the callback
+
+    Dances only use stash[key] = value and stash.pop(key, default), so a dict or a web session works as well.
+    Values are JSON serialisable.
+
+    """
+
+    def __setitem__(self, key, value):  # pragma: no cover
+        raise NotImplementedError()
+
+    def pop(self, key, default=None):  # pragma: no cover
+        """
+        Remove key and return its value, or default when missing or expired
+
+        """
+        raise NotImplementedError()
+
+
+class CacheStash(BaseStash):
+    """
+    Stash kept in a cache backend shared by all processes (a uniauth.cache.BaseCache, e.g. on top of redis)
+
+    :namespace: identifies the user agent across the round trip, e.g. a random id kept in a cookie
+    :backend: BaseCache instance (its pop should be atomic so a state can't be used twice)
+    :ttl: seconds after which unused states expire
+
+    """
+
+    prefix = "uniauth:stash"
+
+    def __init__(self, namespace, backend, ttl=600):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+
+    def get_key(self, key):
+        return "{0}:{1}:{2}".format(self.prefix, self.namespace, key)
+
+    def __setitem__(self, key, value):
+        self.backend.set(self.get_key(key), value, self.ttl)
+
+    def pop(self, key, default=None):
+        value = self.backend.pop(self.get_key(key))
+        return default if value is None else value
+
+
+default_stash_cache = MemoryCache(max_entries=100000)
+
+
+class MemoryStash(CacheStash):
+    """
+    Stash kept in memory (single process deployments), bounded in size and expiring unused states after ttl
+
+    """
+
+    def __init__(self, namespace, ttl=600, backend=None):
+        super(MemoryStash, self).__init__(namespace, backend if backend is not None else default_stash_cache, ttl)
+
+
+class SignedStash(BaseStash):
+    """
+    Stateless stash kept by the user agent in a signed (or encrypted) value, e.g. a cookie
+
+    Nothing is stored server side: send dumps() to the user agent after the authorization redirect (and again
+    after the callback, to clear it) and build the stash from the value it sends back.
+
+    :signer: uniauth.signing.Signer (readable by the user agent) or uniauth.signing.FernetSigner (encrypted)
+    :value: signed value sent back by the user agent (invalid or expired values give an empty stash)
+    :ttl: seconds after which unused states expire
+
+    """
+
+    def __init__(self, signer, value=None, ttl=600):
+        self.signer = signer
+        self.ttl = ttl
+        self.modified = False
+        self.entries = {}
+        if value:
+            try:
+                entries = signer.loads(value, max_age=ttl)
+            except (BadSignature, ValueError):
+                entries = {}
+            now = time.time()
+            self.entries = dict((key, entry) for key, entry in entries.items() if entry[0] > now)
+
+    def __setitem__(self, key, value):
+        self.entries[key] = [int(time.time() + self.ttl), value]
+        self.modified = True
+
+    def pop(self, key, default=None):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return default
+        self.modified = True
+        return entry[1] if entry[0] > time.time() else default
+
+    def dumps(self):
+        """
+        Signed value to send to the user agent (None when empty, i.e. the cookie can be deleted)
+
+        """
+        if not self.entries:
+            return None
+        return self.signer.dumps(self.entries)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import hmac
+import math
+import binascii
+import time
+import hashlib
+import threading
+from oauthlib.common import generate_token
+from oauthlib.oauth2.rfc6749.errors import MismatchingStateError
+
+from .signing import BadSignature, b64encode
+
+__all__ = ["InvalidState", "StateSigner", "CacheReplayFilter", "BloomReplayFilter"]
+
+
+class InvalidState(MismatchingStateError):
+    """
+    Raised when the state of a callback is forged, expired, issued for another provider, redirect uri or user agent, or
+    replayed
+
+    """
+
+    def __init__(self, description):
+        super(InvalidState, self).__init__(description=description)
+
+
+class StateSigner(object):
+    """
+    Self-contained OAuth2 states, so callbacks can be verified by any process without a stash
+
+    States are signed and timestamped, and carry a nonce, the provider and the redirect uri they were issued for. They
+    are bound to the user agent that started the dance by the hash of a binding: a random value kept by the user agent
+    (e.g. in a cookie) that must be presented with the callback, so a state can't be used from another browser
+    (login CSRF).
+
+    :signer: uniauth.signing.Signer (or FernetSigner to hide the redirect uri from the user agent)
+    :max_age: seconds during which a state is accepted
+    :replay_filter: CacheReplayFilter or BloomReplayFilter, so each state is accepted once (optional)
+
+    """
+
+    def __init__(self, signer, max_age=600, replay_filter=None):
+        self.signer = signer
+        self.max_age = max_age
+        self.replay_filter = replay_filter
+
+    @staticmethod
+    def create_binding():
+        return generate_token()
+
+    @staticmethod
+    def get_binding_hash(binding):
+        return b64encode(hashlib.sha256(binding.encode("utf-8")).digest())
+
+    def dumps(self, provider, redirect_uri, binding):
+        """
+        New state for a dance of provider redirecting to redirect_uri, bound to the user agent keeping binding
+
+        """
+        return self.signer.dumps({"n": generate_token(), "p": provider, "r": redirect_uri, "b": self.get_binding_hash(binding)})
+
+    def loads(self, state, provider, redirect_uri, binding):
+        """
+        Verify state, raise InvalidState unless it was issued for provider, redirect_uri and the user agent keeping
+        binding, and hasn't been used yet
+
+        Returns the nonce of the state.
+
+        """
+        if not state:
+            raise InvalidState("Missing state")
+        try:
+            data = self.signer.loads(state, max_age=self.max_age)
+        except (BadSignature, ValueError):
+            raise InvalidState("Invalid or expired state")
+        if not isinstance(data, dict) or data.get("p") != provider or data.get("r") != redirect_uri:
+            raise InvalidState("State issued for another provider or redirect uri")
+        if not binding or not hmac.compare_digest(self.get_binding_hash(binding).encode("ascii"), data.get("b", "").encode("ascii")):
+            raise InvalidState("State issued to another user agent")
+        if self.replay_filter is not None and not self.replay_filter.add(data["n"], self.max_age):
+            raise InvalidState("State already used")
+        return data["n"]
+
+    def get_code_verifier(self, binding):
+        """
+        PKCE code verifier of a dance, derived from its binding with the signer's key
+
+        The binding is only known to the user agent (unlike the state, which is public in the callback uri), so an
+        intercepted callback can't be redeemed without it.
+
+        """
+        return b64encode(self.signer.digest("pkce:" + binding))
+
+
+class CacheReplayFilter(object):
+    """
+    Remembers used nonces in a cache backend shared by all processes (a uniauth.cache.BaseCache)
+
+    :backend: BaseCache instance (its add should be atomic, e.g. SET NX on redis)
+
+    """
+
+    prefix = "uniauth:nonce"
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def add(self, nonce, ttl):
+        """
+        Remember nonce for ttl seconds, return False when it was already used
+
+        """
+        return self.backend.add("{0}:{1}".format(self.prefix, nonce), 1, ttl)
+
+
+class BloomReplayFilter(object):
+    """
+    Remembers used nonces in a fixed size Bloom filter (single process deployments)
+
+    Two generations of ttl seconds are kept, so nonces are remembered between ttl and twice ttl seconds.
+    A state may be rejected as used with probability error_rate.
+
+    :capacity: nonces expected per ttl
+    :error_rate: false positive rate at capacity
+    :ttl: at least the max_age of the StateSigner
+
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001, ttl=600):
+        self.ttl = ttl
+        self.size = int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, int(round(self.size / float(capacity) * math.log(2))))
+        self._current = bytearray((self.size + 7) // 8)
+        self._previous = bytearray((self.size + 7) // 8)
+        self._rotated_at = time.time()
+        self._lock = threading.Lock()
+
+    def get_positions(self, nonce):
+        digest = hashlib.sha256(nonce.encode("utf-8")).digest()
+        first, second = int(binascii.hexlify(digest[:8]), 16), int(binascii.hexlify(digest[8:16]), 16)
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def rotate(self, now):
+        elapsed = now - self._rotated_at
+        if elapsed < self.ttl:
+            return
+        self._previous = self._current if elapsed < 2 * self.ttl else bytearray(len(self._current))
+        self._current = bytearray(len(self._current))
+        self._rotated_at = now
+
+    def add(self, nonce, ttl=None):
+        """
+        Remember nonce, return False when it was (probably) already used
+
+        """
+        positions = self.get_positions(nonce)
+        with self._lock:
+            self.rotate(time.time())
+            for bits in (self._current, self._previous):
+                if all(bits[position >> 3] & (1 << (position & 7)) for position in positions):
+                    return False
+            for position in positions:
+                self._current[position >> 3] |= 1 << (position & 7)
+            return True
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import time
+import bisect
+import sqlite3
+import threading
+
+from .tokens import Token
+
+__all__ = ["BaseTokenStore", "MemoryTokenStore", "SQLiteTokenStore"]
+
+
+class BaseTokenStore(object):
+    """
+    Normalised tokens keyed by application defined keys (e.g. "github:42"), indexed by expiry
+
+    Consumers bound to a store (token_store and token_key) load their token from it and write refreshed tokens back.
+    Implement get, set_many, delete and expiring to store tokens elsewhere (e.g. redis or the application database).
+
+    """
+
+    def get(self, key):
+        """
+        Return the Token stored for key, or None
+
+        """
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):  # pragma: no cover
+        """
+        Return a dict of the Tokens stored for keys (missing keys are left out)
+
+        """
+        raise NotImplementedError()
+
+    def set(self, key, token):
+        self.set_many([(key, token)])
+
+    def set_many(self, items):  # pragma: no cover
+        """
+        Store many (key, token) pairs (or a dict) at once
+
+        """
+        raise NotImplementedError()
+
+    def delete(self, key):  # pragma: no cover
+        raise NotImplementedError()
+
+    def expiring(self, within=0, limit=None):  # pragma: no cover
+        """
+        Return (key, token) pairs expiring in the next within seconds (or already expired), soonest first
+
+        Tokens without expiry are never returned.
+
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    def get_items(items):
+        if hasattr(items, "items"):
+            items = items.items()
+        return [(key, Token.coerce(token)) for key, token in items]
+
+
+class MemoryTokenStore(BaseTokenStore):
+    """
+    Thread-safe in-memory token store, expiry index kept sorted
+
+    """
+
+    def __init__(self, tokens=None):
+        self._tokens = {}
+        self._index = []
+        self._lock = threading.Lock()
+        if tokens:
+            self.set_many(tokens)
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def get_many(self, keys):
+        with self._lock:
+            tokens = self._tokens
+            return dict((key, tokens[key]) for key in keys if key in tokens)
+
+    def set_many(self, items):
+        items = self.get_items(items)
+        with self._lock:
+            for key, token in items:
+                self._unindex(key)
+                self._tokens[key] = token
+                expires_at = token.expires_at_timestamp
+                if expires_at is not None:
+                    bisect.insort(self._index, (expires_at, key))
+
+    def delete(self, key):
+        with self._lock:
+            self._unindex(key)
+            self._tokens.pop(key, None)
+
+    def expiring(self, within=0, limit=None):
+        deadline = int(time.time() + within)
+        with self._lock:
+            entries = self._index[:bisect.bisect_left(self._index, (deadline + 1,))]
+            if limit is not None:
+                entries = entries[:limit]
+            return [(key, self._tokens[key]) for _, key in entries]
+
+    def _unindex(self, key):
+        token = self._tokens.get(key)
+        expires_at = token.expires_at_timestamp if token is not None else None
+        if expires_at is not None:
+            position = bisect.bisect_left(self._index, (expires_at, key))
+            del self._index[position]
+
+
+class SQLiteTokenStore(BaseTokenStore):
+    """
+    Token store in a SQLite table indexed on expires_at (reference implementation for database backed stores)
+
+    Tokens are stored in their compact serialisation (see uniauth.tokens.Token.dumps).
+
+    :path: database file (":memory:" for a private in-memory database)
+    :table: name of the table, created if missing
+
+    """
+
+    max_variables = 500
+
+    def __init__(self, path=":memory:", table="uniauth_tokens"):
+        self.table = table
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS {0} (key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at INTEGER)".format(table))
+            self._connection.execute("CREATE INDEX IF NOT EXISTS {0}_expires_at ON {0} (expires_at)".format(table))
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM {0}".format(self.table)).fetchone()[0]
+
+    def get_many(self, keys):
+        keys = list(keys)
+        tokens = {}
+        with self._lock:
+            for start in range(0, len(keys), self.max_variables):
+                chunk = keys[start:start + self.max_variables]
+                query = "SELECT key, token FROM {0} WHERE key IN ({1})".format(self.table, ", ".join("?" * len(chunk)))
+                tokens.update((key, Token.loads(token)) for key, token in self._connection.execute(query, chunk))
+        return tokens
+
+    def set_many(self, items):
+        rows = [(key, token.dumps(), token.expires_at_timestamp) for key, token in self.get_items(items)]
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO {0} (key, token, expires_at) VALUES (?, ?, ?)".format(self.table), rows)
+
+    def delete(self, key):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM {0} WHERE key = ?".format(self.table), (key,))
+
+    def expiring(self, within=0, limit=None):
+        query = "SELECT key, token FROM {0} WHERE expires_at <= ? ORDER BY expires_at LIMIT ?".format(self.table)
+        with self._lock:
+            rows = self._connection.execute(query, (int(time.time() + within), -1 if limit is None else limit)).fetchall()
+        return [(key, Token.loads(token)) for key, token in rows]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import, print_function
+
+import six
+import time
+import json
+from datetime import datetime
+from pytz import utc
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # pragma: no cover
+    from collections import Mapping
+
+__all__ = ["Token"]
+
+KEYS = ("token", "extra", "expires_at", "scope")
+EPOCH = datetime(1970, 1, 1, tzinfo=utc)
+MAX_SHARED_SCOPES = 1024
+
+_scopes = {}
+
+
+def share_scope(scope):
+    """
+    Return an equal scope string shared by every token (most tokens of an application have the same scopes)
+
+    """
+    if scope is None or len(_scopes) >= MAX_SHARED_SCOPES:
+        return _scopes.get(scope, scope)
+    return _scopes.setdefault(scope, scope)
+
+
+def to_timestamp(value):
+    """
+    Integer UTC timestamp of a datetime (naive datetimes are taken as UTC), cheaper than calendar.timegm
+
+    """
+    delta = (value if value.tzinfo is not None else value.replace(tzinfo=utc)) - EPOCH
+    return delta.days * 86400 + delta.seconds
+
+
+class Token(Mapping):
+    """
+    Immutable normalised token, a read-only mapping of token, extra, expires_at and scope
+
+    Compares equal to the equivalent dict and converts lazily to and from the OAuth1 and OAuth2 shapes.
+    Expiry is kept as given (a timestamp from providers, a datetime from callers) until another form is asked for.
+
+    :token: access token (OAuth2) or oauth token (OAuth1)
+    :extra: refresh token (OAuth2) or oauth token secret (OAuth1)
+    :expires_at: aware datetime, naive UTC datetime or UTC timestamp (None if unknown)
+    :scope: space separated scopes or list of scopes
+
+    """
+
+    __slots__ = ("_token", "_extra", "_expires", "_scope")
+
+    def __init__(self, token=None, extra=None, expires_at=None, scope=None):
+        if scope is not None and not isinstance(scope, six.string_types):
+            scope = " ".join(scope)
+        set_slot = object.__setattr__
+        set_slot(self, "_token", token)
+        set_slot(self, "_extra", extra)
+        set_slot(self, "_expires", expires_at or None)
+        set_slot(self, "_scope", share_scope(scope))
+
+    @classmethod
+    def coerce(cls, data):
+        """
+        Return data as a Token (data is a Token or a mapping with the normalised keys)
+
+        """
+        if data is None or isinstance(data, cls):
+            return data
+        return cls(data.get("token"), data.get("extra"), data.get("expires_at"), data.get("scope"))
+
+    @classmethod
+    def from_oauth1(cls, data):
+        return cls(data.get("oauth_token"), data.get("oauth_token_secret"))
+
+    @classmethod
+    def from_oauth2(cls, data):
+        expires_at = data.get("expires_at") or None
+        if data.get("expires_in"):
+            expires_at = time.time() + int(data.get("expires_in"))
+        return cls(data.get("access_token"), data.get("refresh_token"), expires_at, data.get("scope") or "")
+
+    def to_oauth1(self):
+        return {"oauth_token": self._token, "oauth_token_secret": self._extra}
+
+    def to_oauth2(self):
+        return {"access_token": self._token,
+                "refresh_token": self._extra,
+                "expires_at": self.expires_at_timestamp or 0,
+                "scope": self._scope.split(" ") if self._scope else []}
+
+    @property
+    def token(self):
+        return self._token
+
+    @property
+    def extra(self):
+        return self._extra
+
+    @property
+    def scope(self):
+        return self._scope
+
+    @property
+    def expires_at(self):
+        """
+        Expiry as an aware datetime (None if unknown)
+
+        """
+        expires = self._expires
+        if expires is None or isinstance(expires, datetime):
+            return expires
+        return datetime.fromtimestamp(expires, tz=utc)
+
+    @property
+    def expires_at_timestamp(self):
+        """
+        Expiry as an integer UTC timestamp (None if unknown)
+
+        """
+        expires = self._expires
+        if expires is None:
+            return None
+        return to_timestamp(expires) if isinstance(expires, datetime) else int(expires)
+
+    def is_expired(self, leeway=0):
+        expires_at = self.expires_at_timestamp
+        return expires_at is not None and expires_at - leeway <= time.time()
+
+    def replace(self, **values):
+        """
+        Return a copy with values replaced, e.g. token.replace(extra=refresh_token)
+
+        """
+        return Token(values.get("token", self._token), values.get("extra", self._extra),
+                     values.get("expires_at", self._expires), values.get("scope", self._scope))
+
+    def dumps(self):
+        """
+        Compact JSON serialisation, see loads
+
+        """
+        expires = self._expires
+        if isinstance(expires, datetime):
+            expires = to_timestamp(expires)
+        elif expires is not None and expires == int(expires):
+            expires = int(expires)
+        return json.dumps([self._token, self._extra, expires, self._scope], separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, value):
+        return cls(*json.loads(value))
+
+    def __getitem__(self, key):
+        if key not in KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(KEYS)
+
+    def __len__(self):
+        return len(KEYS)
+
+    def __contains__(self, key):
+        return key in KEYS
+
+    def __eq__(self, other):
+        if isinstance(other, Token):
+            return (self._token, self._extra, self.expires_at, self._scope) == (other._token, other._extra, other.expires_at, other._scope)
+        return Mapping.__eq__(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash((self._token, self._extra, self.expires_at_timestamp, self._scope))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Token is immutable, use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("Token is immutable")
+
+    def __reduce__(self):
+        return Token, (self._token, self._extra, self._expires, self._scope)
+
+    def __repr__(self):
+        return "<Token expires_at={0!r} scope={1!r}>".format(self.expires_at, self._scope)